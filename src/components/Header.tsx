@@ -1,7 +1,17 @@
 import React from 'react';
 import { TrendingUp, Bot, Settings } from 'lucide-react';
+import { useTradingContext } from '../context/TradingContext';
+
+const STATUS_LABELS = {
+  demo: 'Demo Data',
+  connecting: 'Connecting...',
+  live: 'Bot Active'
+};
 
 export const Header: React.FC = () => {
+  const { liveStatus } = useTradingContext();
+  const active = liveStatus === 'live';
+  
   return (
     <header className="bg-slate-800 border-b border-slate-700 shadow-lg">
       <div className="container mx-auto px-4 py-4">
@@ -17,9 +27,11 @@ export const Header: React.FC = () => {
           </div>
           
           <div className="flex items-center space-x-4">
-            <div className="flex items-center space-x-2 bg-emerald-500/10 px-3 py-2 rounded-lg">
-              <TrendingUp className="h-4 w-4 text-emerald-400" />
-              <span className="text-emerald-400 font-medium text-sm">Bot Active</span>
+            <div className={`flex items-center space-x-2 px-3 py-2 rounded-lg ${active ? 'bg-emerald-500/10' : 'bg-slate-700'}`}>
+              <TrendingUp className={`h-4 w-4 ${active ? 'text-emerald-400' : 'text-slate-400'}`} />
+              <span className={`font-medium text-sm ${active ? 'text-emerald-400' : 'text-slate-400'}`}>
+                {STATUS_LABELS[liveStatus]}
+              </span>
             </div>
             
             <button className="p-2 text-slate-400 hover:text-white transition-colors rounded-lg hover:bg-slate-700">
@@ -3,7 +3,7 @@ import { Activity, TrendingUp } from 'lucide-react';
 import { useTradingContext } from '../context/TradingContext';
 
 export const MarketData: React.FC = () => {
-  const { marketData } = useTradingContext();
+  const { marketData, selectedSymbol, selectSymbol, liveStatus } = useTradingContext();
   
   return (
     <div className="bg-slate-800 rounded-lg p-6 border border-slate-700">
@@ -14,7 +14,13 @@ export const MarketData: React.FC = () => {
       
       <div className="grid grid-cols-1 md:grid-cols-2 xl:grid-cols-4 gap-4">
         {marketData.map((coin) => (
-          <div key={coin.symbol} className="bg-slate-900 p-4 rounded-lg border border-slate-600 hover:border-blue-500 transition-colors">
+          <div
+            key={coin.symbol}
+            onClick={() => selectSymbol(coin.symbol)}
+            className={`bg-slate-900 p-4 rounded-lg border cursor-pointer hover:border-blue-500 transition-colors ${
+              coin.symbol === selectedSymbol ? 'border-blue-500' : 'border-slate-600'
+            }`}
+          >
             <div className="flex items-center justify-between mb-2">
               <div className="flex items-center">
                 <div className="w-8 h-8 bg-gradient-to-br from-blue-400 to-purple-500 rounded-full flex items-center justify-center mr-2">
@@ -70,6 +76,12 @@ export const MarketData: React.FC = () => {
           </div>
         ))}
       </div>
+      
+      {marketData.length === 0 && (
+        <p className="text-center py-8 text-slate-500">
+          {liveStatus === 'connecting' ? 'Подключение к боту...' : 'Нет данных по парам'}
+        </p>
+      )}
     </div>
   );
 };
\ No newline at end of file
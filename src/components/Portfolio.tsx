@@ -3,7 +3,7 @@ import { TrendingUp, TrendingDown, DollarSign, Percent } from 'lucide-react';
 import { useTradingContext } from '../context/TradingContext';
 
 export const Portfolio: React.FC = () => {
-  const { portfolio, totalValue, dailyPnL } = useTradingContext();
+  const { portfolio, totalValue, dailyPnL, liveStatus } = useTradingContext();
   
   return (
     <div className="bg-slate-800 rounded-lg p-6 border border-slate-700">
@@ -53,12 +53,19 @@ export const Portfolio: React.FC = () => {
                 <div className="text-right">
                   <p className="text-white font-medium">${asset.value.toLocaleString()}</p>
                   <div className="flex items-center">
-                    <Percent className="h-3 w-3 mr-1 text-emerald-400" />
-                    <span className="text-emerald-400 text-sm">+{asset.change}%</span>
+                    <Percent className={`h-3 w-3 mr-1 ${asset.change >= 0 ? 'text-emerald-400' : 'text-red-400'}`} />
+                    <span className={`text-sm ${asset.change >= 0 ? 'text-emerald-400' : 'text-red-400'}`}>
+                      {asset.change >= 0 ? '+' : ''}{asset.change}%
+                    </span>
                   </div>
                 </div>
               </div>
             ))}
+            {portfolio.length === 0 && (
+              <p className="text-slate-400 text-sm text-center py-4">
+                {liveStatus === 'connecting' ? 'Подключение к боту...' : 'Нет открытых позиций'}
+              </p>
+            )}
           </div>
         </div>
       </div>
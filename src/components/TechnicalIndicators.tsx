@@ -10,6 +10,7 @@ export const TechnicalIndicators: React.FC = () => {
       <h2 className="text-lg font-semibold text-white mb-4 flex items-center">
         <BarChart3 className="h-5 w-5 mr-2 text-purple-400" />
         Технические индикаторы
+        <span className="ml-2 text-sm font-normal text-slate-400">{indicators.symbol}</span>
       </h2>
       
       <div className="space-y-6">
@@ -22,15 +23,15 @@ export const TechnicalIndicators: React.FC = () => {
           
           <div className="grid grid-cols-3 gap-4">
             <div className="text-center">
-              <p className="text-slate-400 text-sm">MA 7</p>
+              <p className="text-slate-400 text-sm">MA {indicators.maPeriods[0]}</p>
               <p className="text-blue-400 font-mono">${indicators.ma7}</p>
             </div>
             <div className="text-center">
-              <p className="text-slate-400 text-sm">MA 25</p>
+              <p className="text-slate-400 text-sm">MA {indicators.maPeriods[1]}</p>
               <p className="text-blue-400 font-mono">${indicators.ma25}</p>
             </div>
             <div className="text-center">
-              <p className="text-slate-400 text-sm">MA 50</p>
+              <p className="text-slate-400 text-sm">MA {indicators.maPeriods[2]}</p>
               <p className="text-blue-400 font-mono">${indicators.ma50}</p>
             </div>
           </div>
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useMemo } from 'react';
 
 interface Portfolio {
   symbol: string;
@@ -18,6 +18,8 @@ interface MarketData {
 }
 
 interface TechnicalIndicators {
+  symbol: string;
+  maPeriods: number[];
   ma7: string;
   ma25: string;
   ma50: string;
@@ -39,6 +41,178 @@ interface Trade {
   timestamp: string;
 }
 
+// Ответы API бота (api_server.py)
+interface ApiPosition {
+  symbol: string;
+  amount: number;
+  entry_price: number;
+  price: number;
+  value: number;
+  change: number;
+  timestamp: number | null;
+}
+
+interface ApiTrade {
+  id: number;
+  symbol: string;
+  exit_time: number;
+  entry_price: number;
+  exit_price: number;
+  pnl: number;
+}
+
+interface ApiSummary {
+  trades: number;
+  pnl: number;
+}
+
+// Поток живого состояния /api/live (live_state.py): snapshot при подключении, затем diff
+interface LiveSymbol {
+  price: number;
+  trend: 'UPTREND' | 'DOWNTREND' | 'SIDEWAYS';
+  signal: 'BUY' | 'SELL' | 'HOLD';
+  buy_score: number;
+  sell_score: number;
+  rsi: number;
+  ma_periods: number[];
+  ma: number[];
+  macd: number;
+  macd_signal: number;
+  change_24h?: number;
+  volume_24h?: number;
+}
+
+interface LiveBalance {
+  free: number;
+  used: number;
+  total: number;
+}
+
+interface LiveState {
+  symbols: Record<string, LiveSymbol>;
+  positions: Record<string, ApiPosition>;
+  balance: Record<string, LiveBalance>;
+}
+
+interface LiveEvent {
+  version: number;
+  set: Partial<LiveState>;
+  del: Partial<Record<keyof LiveState, string[]>>;
+}
+
+// Адрес API бота; без него панель показывает демо-данные
+const API_URL = import.meta.env.VITE_API_URL;
+const API_POLL_INTERVAL = 5000;
+const DAY_MS = 24 * 60 * 60 * 1000;
+// Число условий покупки/продажи в оценке сигнала бота
+const SIGNAL_CONDITIONS = 4;
+
+const EMPTY_LIVE_STATE: LiveState = { symbols: {}, positions: {}, balance: {} };
+
+// Индикаторы до первых данных бота (в режиме API демо-данные не показываются)
+const EMPTY_INDICATORS: TechnicalIndicators = {
+  symbol: '',
+  maPeriods: [7, 25, 50],
+  ma7: '-',
+  ma25: '-',
+  ma50: '-',
+  maTrend: '-',
+  rsi: 0,
+  macd: 0,
+  macdSignal: 0,
+  macdTrend: '-'
+};
+
+// demo - без API_URL, connecting - поток бота еще не подключен или оборван, live - данные бота
+export type LiveStatus = 'demo' | 'connecting' | 'live';
+
+const formatPrice = (price: number) =>
+  price.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 8 });
+
+const formatTime = (timestamp: number | null) =>
+  timestamp ? new Date(timestamp).toLocaleTimeString('ru-RU') : '-';
+
+const formatVolume = (volume: number) => {
+  if (volume >= 1e9) return `${(volume / 1e9).toFixed(1)}B`;
+  if (volume >= 1e6) return `${(volume / 1e6).toFixed(1)}M`;
+  if (volume >= 1e3) return `${(volume / 1e3).toFixed(1)}K`;
+  return volume.toFixed(0);
+};
+
+// Незатронутые разделы сохраняют ссылку, чтобы мемоизированные представления не пересчитывались
+const mergeSection = <T,>(entries: Record<string, T>, updates?: Record<string, T>, removed?: string[]) => {
+  if (!updates && !removed) return entries;
+  const next = { ...entries, ...updates };
+  removed?.forEach(key => delete next[key]);
+  return next;
+};
+
+const applyLiveEvent = (state: LiveState, event: LiveEvent): LiveState => ({
+  symbols: mergeSection(state.symbols, event.set.symbols, event.del.symbols),
+  positions: mergeSection(state.positions, event.set.positions, event.del.positions),
+  balance: mergeSection(state.balance, event.set.balance, event.del.balance)
+});
+
+const parseLiveEvent = (data: string): LiveEvent | null => {
+  try {
+    return JSON.parse(data);
+  } catch (error) {
+    console.error('Malformed bot live event', error);
+    return null;
+  }
+};
+
+const toMarketData = (symbol: string, data: LiveSymbol): MarketData => {
+  const score = data.signal === 'BUY' ? data.buy_score :
+    data.signal === 'SELL' ? data.sell_score : Math.max(data.buy_score, data.sell_score);
+  return {
+    symbol,
+    price: formatPrice(data.price),
+    change24h: +(data.change_24h ?? 0).toFixed(2),
+    volume: formatVolume(data.volume_24h ?? 0),
+    trend: data.trend === 'UPTREND' ? 'up' : data.trend === 'DOWNTREND' ? 'down' : 'sideways',
+    signal: data.signal,
+    signalStrength: Math.round(score / SIGNAL_CONDITIONS * 100)
+  };
+};
+
+const toIndicators = (symbol: string, data: LiveSymbol): TechnicalIndicators => ({
+  symbol,
+  maPeriods: data.ma_periods,
+  ma7: formatPrice(data.ma[0]),
+  ma25: formatPrice(data.ma[1]),
+  ma50: formatPrice(data.ma[2]),
+  maTrend: data.trend === 'UPTREND' ? 'Восходящий' : data.trend === 'DOWNTREND' ? 'Нисходящий' : 'Боковой',
+  rsi: +data.rsi.toFixed(1),
+  macd: +data.macd.toFixed(4),
+  macdSignal: +data.macd_signal.toFixed(4),
+  macdTrend: data.macd > data.macd_signal ? 'Бычий' : 'Медвежий'
+});
+
+const toPortfolio = (position: ApiPosition): Portfolio => ({
+  symbol: position.symbol,
+  amount: position.amount,
+  value: +position.value.toFixed(2),
+  change: +position.change.toFixed(2)
+});
+
+const toOpenTrade = (position: ApiPosition): Trade => ({
+  id: `open-${position.symbol}`,
+  symbol: position.symbol,
+  type: 'BUY',
+  entryPrice: formatPrice(position.entry_price),
+  status: 'OPEN',
+  timestamp: formatTime(position.timestamp)
+});
+
+const fetchJson = async <T,>(path: string): Promise<T> => {
+  const response = await fetch(`${API_URL}${path}`);
+  if (!response.ok) {
+    throw new Error(`${path}: ${response.status}`);
+  }
+  return response.json();
+};
+
 interface TradingContextType {
   portfolio: Portfolio[];
   marketData: MarketData[];
@@ -46,6 +220,9 @@ interface TradingContextType {
   trades: Trade[];
   totalValue: number;
   dailyPnL: number;
+  liveStatus: LiveStatus;
+  selectedSymbol: string;
+  selectSymbol: (symbol: string) => void;
 }
 
 const TradingContext = createContext<TradingContextType | undefined>(undefined);
@@ -116,6 +293,8 @@ export const TradingProvider: React.FC<{ children: React.ReactNode }> = ({ child
   ]);
   
   const [indicators] = useState<TechnicalIndicators>({
+    symbol: 'BTC/USDT',
+    maPeriods: [7, 25, 50],
     ma7: '44,650.30',
     ma25: '44,200.80',
     ma50: '43,800.15',
@@ -165,11 +344,73 @@ export const TradingProvider: React.FC<{ children: React.ReactNode }> = ({ child
     }
   ]);
   
-  const totalValue = portfolio.reduce((sum, asset) => sum + asset.value, 0);
-  const dailyPnL = 1.85;
+  const [live, setLive] = useState<LiveState | null>(null);
+  const [connected, setConnected] = useState(false);
+  const [closedTrades, setClosedTrades] = useState<Trade[]>([]);
+  const [realizedPnL, setRealizedPnL] = useState<number | null>(null);
+  const [selectedSymbol, selectSymbol] = useState('');
+  
+  // Живые сигналы, индикаторы, позиции и баланс бота
+  useEffect(() => {
+    if (!API_URL) return;
+    const source = new EventSource(`${API_URL}/api/live`);
+    // Браузер переподключается с Last-Event-ID и получает только пропущенные diff
+    source.addEventListener('snapshot', (message) => {
+      const event = parseLiveEvent(message.data);
+      if (event) setLive(applyLiveEvent(EMPTY_LIVE_STATE, event));
+    });
+    source.addEventListener('diff', (message) => {
+      const event = parseLiveEvent(message.data);
+      if (event) setLive(prev => applyLiveEvent(prev ?? EMPTY_LIVE_STATE, event));
+    });
+    source.addEventListener('busy', () => console.warn('Bot live stream is at its client limit, retrying'));
+    source.onopen = () => setConnected(true);
+    source.onerror = () => {
+      setConnected(false);
+      console.warn('Bot live stream disconnected, reconnecting');
+    };
+    return () => source.close();
+  }, []);
+  
+  // Закрытые сделки и реализованный P&L за 24 часа из API бота
+  useEffect(() => {
+    if (!API_URL) return;
+    let cancelled = false;
+    
+    const load = async () => {
+      try {
+        const [closed, summary] = await Promise.all([
+          fetchJson<ApiTrade[]>('/api/trades?limit=50'),
+          fetchJson<ApiSummary>(`/api/stats/summary?since=${Date.now() - DAY_MS}`)
+        ]);
+        if (cancelled) return;
+        setRealizedPnL(summary.pnl);
+        setClosedTrades(closed.map(trade => ({
+          id: String(trade.id),
+          symbol: trade.symbol,
+          type: 'SELL' as const,
+          entryPrice: formatPrice(trade.entry_price),
+          exitPrice: formatPrice(trade.exit_price),
+          pnl: +trade.pnl.toFixed(2),
+          status: 'CLOSED' as const,
+          timestamp: formatTime(trade.exit_time)
+        })));
+      } catch (error) {
+        console.error('Bot API is unavailable', error);
+      }
+    };
+    
+    load();
+    const interval = setInterval(load, API_POLL_INTERVAL);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, []);
   
-  // Simulate real-time updates
+  // Имитация обновлений в реальном времени (только демо-режим)
   useEffect(() => {
+    if (API_URL) return;
     const interval = setInterval(() => {
       setMarketData(prevData => 
         prevData.map(coin => ({
@@ -183,14 +424,54 @@ export const TradingProvider: React.FC<{ children: React.ReactNode }> = ({ child
     return () => clearInterval(interval);
   }, []);
   
+  const liveSymbols = live?.symbols;
+  const livePositions = live?.positions;
+  
+  const liveMarketData = useMemo(
+    () => liveSymbols && Object.entries(liveSymbols).map(([symbol, data]) => toMarketData(symbol, data)),
+    [liveSymbols]
+  );
+  
+  const liveIndicators = useMemo(() => {
+    if (!liveSymbols) return undefined;
+    const symbol = selectedSymbol in liveSymbols ? selectedSymbol : Object.keys(liveSymbols)[0];
+    return symbol ? toIndicators(symbol, liveSymbols[symbol]) : undefined;
+  }, [liveSymbols, selectedSymbol]);
+  
+  const livePortfolio = useMemo(
+    () => livePositions && Object.values(livePositions).map(toPortfolio),
+    [livePositions]
+  );
+  
+  const liveTrades = useMemo(
+    () => livePositions && [...Object.values(livePositions).map(toOpenTrade), ...closedTrades],
+    [livePositions, closedTrades]
+  );
+  
+  // Демо-данные только без API; в режиме API до подключения - пустое состояние
+  const demo = !API_URL;
+  const liveStatus: LiveStatus = demo ? 'demo' : connected ? 'live' : 'connecting';
+  const currentPortfolio = livePortfolio ?? (demo ? portfolio : []);
+  const positionsValue = currentPortfolio.reduce((sum, asset) => sum + asset.value, 0);
+  const cash = live?.balance.USDT?.total ?? 0;
+  const totalValue = +(positionsValue + cash).toFixed(2);
+  
+  // Реализованный P&L сделок, закрытых за 24 часа, к стоимости счета до них
+  const dayStartValue = totalValue - (realizedPnL ?? 0);
+  const dailyPnL = demo ? 1.85 : realizedPnL !== null && dayStartValue > 0
+    ? +(realizedPnL / dayStartValue * 100).toFixed(2) : 0;
+  
   return (
     <TradingContext.Provider value={{
-      portfolio,
-      marketData,
-      indicators,
-      trades,
+      portfolio: currentPortfolio,
+      marketData: liveMarketData ?? (demo ? marketData : []),
+      indicators: liveIndicators ?? (demo ? indicators : EMPTY_INDICATORS),
+      trades: liveTrades ?? (demo ? trades : closedTrades),
       totalValue,
-      dailyPnL
+      dailyPnL,
+      liveStatus,
+      selectedSymbol: liveIndicators?.symbol ?? (demo ? indicators.symbol : ''),
+      selectSymbol
     }}>
       {children}
     </TradingContext.Provider>
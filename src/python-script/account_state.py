@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+
+from config import TradingConfig
+
+# Кэш состояния аккаунта.
+# Баланс запрашивается у биржи не чаще одного раза за TTL, а между запросами
+# обновляется локально по ответам биржи на собственные ордера бота.
+# Исполнения, о которых бот узнает позже (stop-loss, take-profit), сбрасывают
+# кэш: их резерв и комиссия известны только бирже.
+
+
+class AccountState:
+    def __init__(self, exchange, ttl=None, clock=time.monotonic):
+        self.exchange = exchange
+        self.ttl = TradingConfig.BALANCE_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        self._balance = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return self._balance is not None and self.clock() - self._fetched_at < self.ttl
+
+    def get_balance(self, force=False):
+        """
+        Баланс из кэша или с биржи, если кэш устарел
+        """
+        with self._lock:
+            if force or not self.is_fresh():
+                self._balance = self.exchange.fetch_balance()
+                self._fetched_at = self.clock()
+            return self._balance
+
+    def cached(self):
+        """
+        Последний известный баланс без запроса к бирже (None, если не загружался)
+        """
+        with self._lock:
+            return self._balance
+
+    def invalidate(self):
+        """
+        Сброс кэша: следующий запрос баланса пойдет на биржу
+        """
+        with self._lock:
+            self._balance = None
+
+    def _adjust(self, currency, free_delta, total_delta):
+        entry = self._balance.setdefault(currency, {'free': 0.0, 'used': 0.0, 'total': 0.0})
+        entry['free'] = (entry.get('free') or 0.0) + free_delta
+        entry['total'] = (entry.get('total') or 0.0) + total_delta
+        for key in ('free', 'total'):
+            if isinstance(self._balance.get(key), dict):
+                self._balance[key][currency] = entry[key]
+
+    def apply_fill(self, symbol, side, amount, price, fee=0.0):
+        """
+        Локальное обновление баланса по исполненной сделке.
+        fee указывается в валюте котировки.
+        """
+        with self._lock:
+            if self._balance is None:
+                return
+            base, quote = symbol.split('/')
+            cost = amount * price
+            if side == 'buy':
+                self._adjust(quote, -(cost + fee), -(cost + fee))
+                self._adjust(base, amount, amount)
+            else:
+                self._adjust(base, -amount, -amount)
+                self._adjust(quote, cost - fee, cost - fee)
+
+    def on_order(self, symbol, side, order, amount=None, price=None):
+        """
+        Учет ответа биржи на ордер.
+        Если биржа вернула данные об исполнении - баланс обновляется локально,
+        иначе используется ожидаемое исполнение (amount, price). Если оценить
+        исполнение нельзя, кэш сбрасывается.
+        """
+        order = order or {}
+        filled = order.get('filled') or amount
+        average = order.get('average') or order.get('price') or price
+        fee = (order.get('fee') or {}).get('cost') or 0.0
+
+        if not filled or not average:
+            logging.debug(f"Нет данных об исполнении ордера {symbol}, кэш баланса сброшен")
+            self.invalidate()
+            return
+
+        self.apply_fill(symbol, side, filled, average, fee)
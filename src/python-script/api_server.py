@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import TradingConfig
+from live_state import LiveStream, position_view
+
+# JSON API для панели (TradeHistory, Portfolio): сделки и агрегаты из TradeStore
+# и открытые позиции бота. Запросы только на чтение.
+#
+# GET /api/trades?symbol=&limit=&before=    последние закрытые сделки
+# GET /api/fills?symbol=&limit=             последние исполнения ордеров
+# GET /api/portfolio                        открытые позиции бота
+# GET /api/stats/summary?since=&until=      итоги (since/until - мс)
+# GET /api/stats/symbols                    прибыль по парам
+# GET /api/stats/equity?initial=            кривая капитала по дням
+# GET /api/stats/hours                      win rate по часу входа (UTC)
+# GET /api/stats/regimes                    win rate по тренду при входе
+# GET /api/live?symbols=&interval=          поток изменений состояния (SSE, live_state.py)
+#
+# Без хранилища сделок (TRADE_STORE_PATH пустой) доступны только /api/portfolio и /api/live.
+
+MAX_LIMIT = 1000
+
+
+def _int(params, name, default=None):
+    values = params.get(name)
+    return int(values[0]) if values and values[0] != '' else default
+
+
+def _str(params, name):
+    values = params.get(name)
+    return values[0] if values and values[0] else None
+
+
+def _symbols(params):
+    value = _str(params, 'symbols')
+    return [symbol for symbol in value.split(',') if symbol] if value else None
+
+
+class ApiServer:
+    def __init__(self, store, bot=None, live=None):
+        self.store = store
+        self.bot = bot
+        self._server = None
+        # Поток живого состояния панели (LiveState бота)
+        self.stream = LiveStream(live) if live is not None else None
+        self.routes = {'/api/portfolio': lambda p: self.portfolio()}
+        if store is not None:
+            self.routes.update(self.store_routes())
+
+    def store_routes(self):
+        return {
+            '/api/trades': lambda p: self.store.recent_trades(
+                min(_int(p, 'limit', 50), MAX_LIMIT), _str(p, 'symbol'), _int(p, 'before')
+            ),
+            '/api/fills': lambda p: self.store.recent_fills(min(_int(p, 'limit', 50), MAX_LIMIT), _str(p, 'symbol')),
+            '/api/stats/summary': lambda p: self.store.summary(_int(p, 'since'), _int(p, 'until')),
+            '/api/stats/symbols': lambda p: self.store.pnl_by_symbol(_int(p, 'since'), _int(p, 'until')),
+            '/api/stats/equity': lambda p: self.store.equity_curve(
+                float(_str(p, 'initial') or 0), _int(p, 'since'), _int(p, 'until')
+            ),
+            '/api/stats/hours': lambda p: self.store.win_rate_by_hour(_int(p, 'since'), _int(p, 'until')),
+            '/api/stats/regimes': lambda p: self.store.win_rate_by_regime(_int(p, 'since'), _int(p, 'until')),
+        }
+
+    def portfolio(self):
+        """
+        Открытые позиции бота с последней известной ценой (без запросов к бирже)
+        """
+        if not self.bot:
+            return []
+        result = []
+        for symbol, position in list(self.bot.positions.items()):
+            series = self.bot.candle_series.get((symbol, TradingConfig.TIMEFRAME))
+            price = float(series.close[-1]) if series is not None and len(series) else position['entry_price']
+            result.append(position_view(symbol, position, price))
+        return result
+
+    def handle(self, path, params):
+        """
+        Ответ на запрос: (код, данные)
+        """
+        route = self.routes.get(path.rstrip('/'))
+        if not route:
+            return 404, {'error': 'not found'}
+        try:
+            return 200, route(params)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+    def start(self, port, host='127.0.0.1'):
+        """
+        Запуск HTTP-сервера в фоновом потоке
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip('/') == '/api/live' and api.stream:
+                    self.stream_live(parse_qs(url.query))
+                    return
+                try:
+                    status, data = api.handle(url.path, parse_qs(url.query))
+                except Exception as e:
+                    logging.error(f"Ошибка API {url.path}: {e}")
+                    status, data = 500, {'error': 'internal error'}
+                body = json.dumps(data, default=str).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                # Панель запускается dev-сервером Vite на другом порту
+                self.send_header('Access-Control-Allow-Origin', TradingConfig.API_CORS_ORIGIN)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def stream_live(self, params):
+                try:
+                    interval = _int(params, 'interval')
+                except ValueError:
+                    interval = None
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Access-Control-Allow-Origin', TradingConfig.API_CORS_ORIGIN)
+                self.end_headers()
+
+                def write(data):
+                    self.wfile.write(data)
+                    self.wfile.flush()
+
+                try:
+                    served = api.stream.serve(
+                        write, self.headers.get('Last-Event-ID'),
+                        _symbols(params), interval / 1000 if interval else None
+                    )
+                    if not served:
+                        # Предел клиентов: браузер переподключится через retry мс
+                        write(b'retry: 10000\nevent: busy\ndata: {}\n\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if self.stream:
+            self.stream.start()
+        if self.store is not None:
+            # Столбцы сделок загружаются заранее, чтобы первый запрос панели не ждал загрузки
+            threading.Thread(target=self.store.columns, daemon=True).start()
+        logging.info(f"API панели доступно на http://{host}:{self._server.server_port}/api")
+        return self._server
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+        if self._server:
+            self._server.shutdown()
+            self._server = None
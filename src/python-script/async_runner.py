@@ -0,0 +1,162 @@
+import asyncio
+import logging
+
+import ccxt.async_support as ccxt_async
+
+from candle_series import CandleSeries
+from config import TradingConfig
+from metrics import metrics, instrument_exchange
+from market_cache import apply_cached_markets
+from scheduler import install_scheduler, lane, LANE_POSITION
+
+# Асинхронный режим работы бота.
+# Рыночные данные для всех пар загружаются параллельно через ccxt.async_support,
+# в кольцевые буферы CandleSeries бота, а анализ (инкрементальные индикаторы)
+# и логика торговли переиспользуют методы MexcTrendBot.
+
+
+class AsyncBotRunner:
+    def __init__(self, bot, max_concurrency=None):
+        """
+        Обертка над MexcTrendBot для параллельной загрузки данных.
+        max_concurrency ограничивает число одновременных запросов к бирже,
+        а лимиты MEXC выдерживает общий планировщик запросов бота (или enableRateLimit ccxt).
+        """
+        self.bot = bot
+        self.max_concurrency = max_concurrency or TradingConfig.ASYNC_MAX_CONCURRENCY
+        self.exchange = ccxt_async.mexc({
+            'apiKey': bot.api_key,
+            'secret': bot.secret_key,
+            'sandbox': bot.sandbox,
+            'enableRateLimit': True,
+        })
+        # Рынки уже загружены синхронным клиентом (run_bot_async) и лежат в кэше
+        apply_cached_markets(self.exchange)
+        # Общий с синхронным клиентом планировщик: лимит биржи один на оба клиента
+        if bot.scheduler:
+            install_scheduler(self.exchange, bot.scheduler)
+        instrument_exchange(self.exchange)
+        self.semaphore = None
+
+    async def fetch_candles(self, symbol, timeframe, limit, since=None):
+        async with self.semaphore, metrics.async_timer('fetch_ohlcv'):
+            if self.bot.candle_store:
+                return await self.bot.candle_store.sync_async(self.exchange, symbol, timeframe, limit)
+            return await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+    async def get_candle_series(self, symbol, timeframe=None, limit=None):
+        """
+        Асинхронный вариант MexcTrendBot.get_candle_series: те же кольцевые буферы бота,
+        после первой загрузки запрашиваются только свечи начиная с последней известной
+        """
+        timeframe = timeframe or TradingConfig.TIMEFRAME
+        limit = limit or self.bot.base_history_limit()
+        key = (symbol, timeframe)
+
+        try:
+            series = self.bot.candle_series.get(key)
+            if series is None or series.capacity < limit:
+                series = self.bot.candle_series[key] = CandleSeries(limit)
+
+            since = series.last_timestamp
+            candles = await self.fetch_candles(symbol, timeframe, limit, since)
+            if since is not None and not self.bot.candle_store:
+                first = candles[0][0] if len(candles) else None
+                if first != since or len(candles) >= limit:
+                    # Разрыв в данных - загружаем окно заново
+                    series.clear()
+                    candles = await self.fetch_candles(symbol, timeframe, limit)
+            series.extend(candles)
+            return series
+        except Exception as e:
+            logging.error(f"Ошибка получения данных для {symbol}: {e}")
+            return None
+
+    async def analyze_trend(self, symbol):
+        """
+        Анализ тренда для пары с асинхронной загрузкой данных
+        """
+        candles = await self.get_candle_series(symbol)
+        if not self.bot.higher_timeframes:
+            return self.bot.analyze_dataframe(symbol, candles)
+        # Начальная история старших таймфреймов загружается синхронным клиентом
+        return await asyncio.to_thread(self.bot.analyze_candles, symbol, candles)
+
+    async def check_and_execute_strategy(self):
+        """
+        Параллельный анализ всех пар и выполнение стратегии
+        """
+        symbols = self.bot.strategy_symbols()
+        results = await asyncio.gather(
+            *(self.analyze_trend(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+
+        for symbol, analysis in zip(symbols, results):
+            if isinstance(analysis, Exception):
+                logging.error(f"Ошибка анализа {symbol}: {analysis}")
+                continue
+            if not analysis or symbol not in self.bot.symbols:
+                continue
+            try:
+                # Ордера размещаются синхронным клиентом бота в отдельном потоке
+                await asyncio.to_thread(self.bot.execute_signal, symbol, analysis)
+            except Exception as e:
+                logging.error(f"Ошибка исполнения сигнала {symbol}: {e}")
+
+    async def fetch_ticker(self, symbol):
+        async with self.semaphore, metrics.async_timer('fetch_ticker'):
+            with lane(LANE_POSITION):
+                return await self.exchange.fetch_ticker(symbol)
+
+    async def monitor_positions(self):
+        """
+        Параллельный мониторинг открытых позиций
+        """
+        positions = list(self.bot.positions.items())
+        tickers = await asyncio.gather(
+            *(self.fetch_ticker(symbol) for symbol, _ in positions),
+            return_exceptions=True
+        )
+
+        for (symbol, position), ticker in zip(positions, tickers):
+            if isinstance(ticker, Exception):
+                logging.error(f"Ошибка мониторинга позиции {symbol}: {ticker}")
+                continue
+            self.bot.log_position(symbol, position, ticker['last'])
+
+    async def run_bot(self):
+        """
+        Основной асинхронный цикл работы бота
+        """
+        logging.info(f"Запуск торгового бота в асинхронном режиме (до {self.max_concurrency} запросов одновременно)...")
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.bot.start_metrics()
+
+        try:
+            while True:
+                try:
+                    async with metrics.async_timer('cycle'):
+                        if self.bot.scanner:
+                            await asyncio.to_thread(self.bot.scanner.maybe_refresh)
+                        # Позиции, закрытые на бирже stop-loss / take-profit
+                        await asyncio.to_thread(self.bot.check_brackets)
+                        await self.check_and_execute_strategy()
+                        await self.monitor_positions()
+
+                        balance = await asyncio.to_thread(self.bot.get_balance)
+                        if balance:
+                            usdt_balance = balance.get('USDT', {}).get('free', 0)
+                            logging.info(f"Баланс USDT: {usdt_balance:.2f}")
+                    metrics.set_gauge('open_positions', len(self.bot.positions))
+                    await asyncio.to_thread(self.bot.save_state)
+
+                    await asyncio.sleep(TradingConfig.CHECK_INTERVAL)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Ошибка в основном цикле: {e}")
+                    await asyncio.sleep(30)
+        finally:
+            await self.exchange.close()
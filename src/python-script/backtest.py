@@ -0,0 +1,208 @@
+import numpy as np
+
+from indicators import compute_indicators, SIGNAL_BUY, SIGNAL_SELL
+from tick_kernel import bracket_exit, CROSS_BELOW
+
+# Векторизованное ядро бэктеста.
+# Индикаторы считаются один раз по всей истории, а поиск выхода из сделки
+# выполняется поблочно по массивам, без пересчета индикаторов на каждом баре.
+
+EXIT_STOP_LOSS = 'STOP_LOSS'
+EXIT_TAKE_PROFIT = 'TAKE_PROFIT'
+EXIT_SIGNAL = 'SELL_SIGNAL'
+EXIT_END = 'END_OF_DATA'
+
+_SEARCH_CHUNK = 256
+
+
+def ohlcv_to_arrays(ohlcv):
+    """
+    Преобразование списка свечей ccxt в словарь массивов
+    """
+    data = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+    return {
+        'timestamp': data[:, 0].astype(np.int64),
+        'open': data[:, 1],
+        'high': data[:, 2],
+        'low': data[:, 3],
+        'close': data[:, 4],
+        'volume': data[:, 5],
+    }
+
+
+def data_version(data):
+    """
+    Версия набора свечей для ключа кэша индикаторов
+    """
+    timestamps = data['timestamp']
+    if len(timestamps) == 0:
+        return (0, 0, 0)
+    return (len(timestamps), int(timestamps[0]), int(timestamps[-1]))
+
+
+def compute_signals(close, params, series=None):
+    """
+    Маски входа и выхода по правилам analyze_trend / check_and_execute_strategy
+    """
+    ind = compute_indicators(close, params, series)
+    valid = np.zeros(len(close), dtype=bool)
+    valid[params['ma_long'] - 1:] = True
+    buy_mask = valid & (ind['signal'] == SIGNAL_BUY) & (ind['rsi'] < params['rsi_overbought'])
+    sell_mask = valid & (ind['signal'] == SIGNAL_SELL) & (ind['rsi'] > params['rsi_oversold'])
+    return buy_mask, sell_mask
+
+
+def _find_exit(start, high, low, sell_mask, stop_price, take_price):
+    """
+    Первый бар начиная со start, на котором срабатывает stop-loss,
+    take-profit или сигнал на продажу. Поиск идет блоками растущего размера.
+    """
+    n = len(high)
+    chunk = _SEARCH_CHUNK
+    while start < n:
+        end = min(start + chunk, n)
+        hits = (low[start:end] <= stop_price) | (high[start:end] >= take_price) | sell_mask[start:end]
+        pos = int(np.argmax(hits))
+        if hits[pos]:
+            return start + pos
+        start = end
+        chunk *= 2
+    return -1
+
+
+def bar_duration(timestamps):
+    """
+    Длительность бара (мс) по минимальному шагу времени
+    """
+    steps = np.diff(timestamps)
+    steps = steps[steps > 0]
+    return int(steps.min()) if len(steps) else 0
+
+
+def _tick_exit(ticks, data, bar_ms, i, sell_exit, stop_price, take_price, slippage):
+    """
+    Выход по тикам от закрытия бара входа i до закрытия бара сигнала SELL
+    (или конца данных). Возвращает (бар, время, цена, причина) либо None,
+    если тики закончились раньше - тогда поиск продолжается по свечам.
+    """
+    timestamps, tick_time = data['timestamp'], ticks['timestamp']
+    last = sell_exit if sell_exit >= 0 else len(timestamps) - 1
+    start = int(tick_time.searchsorted(timestamps[i] + bar_ms, side='left'))
+    end = int(tick_time.searchsorted(timestamps[last] + bar_ms, side='left'))
+    index, price, code = bracket_exit(ticks, start, end, stop_price, take_price, slippage)
+    if index >= 0:
+        exit_time = int(tick_time[index])
+        j = int(timestamps.searchsorted(exit_time, side='right')) - 1
+        return j, exit_time, price, EXIT_STOP_LOSS if code == CROSS_BELOW else EXIT_TAKE_PROFIT
+    if not len(tick_time) or tick_time[-1] < timestamps[last]:
+        return None
+    return last, int(timestamps[last]), data['close'][last], EXIT_SIGNAL if sell_exit >= 0 else EXIT_END
+
+
+def simulate_trades(data, buy_mask, sell_mask, params, initial_capital=10000, fee_rate=0.0,
+                    ticks=None, slippage=0.0):
+    """
+    Симуляция сделок: вход по закрытию бара с сигналом BUY,
+    выход по stop-loss / take-profit внутри бара или по сигналу SELL.
+    Если в одном баре задеты оба уровня, считается что первым сработал stop-loss.
+    С тиками (TICK_DTYPE) уровни проверяются по каждому тику: известно, какой
+    уровень сработал первым, stop-loss исполняется по цене тика (с гэпом и slippage),
+    take-profit - по своей цене. После конца тиковых данных используются свечи.
+    """
+    opens, high, low, close = data['open'], data['high'], data['low'], data['close']
+    timestamps = data['timestamp']
+    n = len(close)
+    entries = np.flatnonzero(buy_mask)
+    if ticks is not None:
+        bar_ms = bar_duration(timestamps)
+        sells = np.flatnonzero(sell_mask)
+
+    capital = float(initial_capital)
+    trades = []
+    idx = 0
+    while idx < len(entries):
+        i = int(entries[idx])
+        entry_price = close[i]
+        stop_price = entry_price * (1 - params['stop_loss_pct'])
+        take_price = entry_price * (1 + params['take_profit_pct'])
+
+        risk_amount = capital * params['risk_per_trade']
+        size = risk_amount / (entry_price - stop_price)
+        size = min(size, capital / (entry_price * (1 + fee_rate)))
+        if size <= 0:
+            break
+
+        exit = None
+        search_from = i + 1
+        if ticks is not None:
+            position = int(sells.searchsorted(i, side='right'))
+            sell_exit = int(sells[position]) if position < len(sells) else -1
+            exit = _tick_exit(ticks, data, bar_ms, i, sell_exit, stop_price, take_price, slippage)
+            if exit is None and len(ticks):
+                # Бар с последним тиком проверяется заново по свечам
+                search_from = max(i + 1, int(timestamps.searchsorted(ticks['timestamp'][-1], side='right')) - 1)
+
+        if exit is not None:
+            j, exit_time, exit_price, reason = exit
+        else:
+            j = _find_exit(search_from, high, low, sell_mask, stop_price, take_price)
+            if j < 0:
+                j = n - 1
+                exit_price, reason = close[j], EXIT_END
+            elif low[j] <= stop_price:
+                exit_price, reason = min(opens[j], stop_price), EXIT_STOP_LOSS
+            elif high[j] >= take_price:
+                exit_price, reason = max(opens[j], take_price), EXIT_TAKE_PROFIT
+            else:
+                exit_price, reason = close[j], EXIT_SIGNAL
+            exit_time = int(timestamps[j])
+
+        fees = size * (entry_price + exit_price) * fee_rate
+        pnl = size * (exit_price - entry_price) - fees
+        capital += pnl
+        trades.append({
+            'entry_time': int(timestamps[i]),
+            'exit_time': exit_time,
+            'entry_price': float(entry_price),
+            'exit_price': float(exit_price),
+            'size': float(size),
+            'pnl': float(pnl),
+            'pnl_pct': float((exit_price - entry_price) / entry_price * 100),
+            'reason': reason,
+            'capital': capital,
+        })
+        idx = int(np.searchsorted(entries, j, side='right'))
+
+    return trades, capital
+
+
+def summarize_trades(trades, initial_capital):
+    """
+    Итоговая статистика бэктеста
+    """
+    pnl = np.array([t['pnl'] for t in trades], dtype=np.float64)
+    equity = np.concatenate(([initial_capital], initial_capital + np.cumsum(pnl)))
+    peaks = np.maximum.accumulate(equity)
+    drawdown = (peaks - equity) / peaks
+    wins = int((pnl > 0).sum())
+    return {
+        'total_trades': len(trades),
+        'winning_trades': wins,
+        'win_rate': (wins / len(trades) * 100) if trades else 0,
+        'total_pnl': float(pnl.sum()),
+        'final_capital': float(equity[-1]),
+        'return_pct': float((equity[-1] - initial_capital) / initial_capital * 100),
+        'max_drawdown_pct': float(drawdown.max() * 100),
+    }
+
+
+def run_backtest(data, params, initial_capital=10000, fee_rate=0.0, series=None, ticks=None, slippage=0.0):
+    """
+    Полный прогон стратегии по словарю массивов OHLCV.
+    series - IndicatorSeries из IndicatorCache для переиспользования индикаторов
+    между прогонами с разными параметрами; ticks - тики для точного исполнения
+    stop-loss / take-profit внутри свечи.
+    """
+    buy_mask, sell_mask = compute_signals(data['close'], params, series)
+    trades, _ = simulate_trades(data, buy_mask, sell_mask, params, initial_capital, fee_rate, ticks, slippage)
+    return trades, summarize_trades(trades, initial_capital)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки горячего пути анализа: построение DataFrame, индикаторы,
+analyze_trend и полный цикл check_and_execute_strategy.
+Биржа подменяется локальной заглушкой (синтетические или записанные свечи),
+поэтому результаты не зависят от сети. Результаты сохраняются в JSON
+и сравниваются с предыдущим прогоном для поиска регрессий.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import TradingConfig
+from candle_series import CandleSeries
+
+DEFAULT_SYMBOL_COUNTS = (1, 10, 50)
+DEFAULT_HISTORY_LENGTHS = (100, 500, 1000)
+DEFAULT_THRESHOLD = 0.2
+RESULTS_DIR = 'benchmark_results'
+
+
+class SyntheticExchange:
+    """
+    Заглушка клиента ccxt с детерминированными свечами.
+    advance() добавляет по одной новой свече для каждой пары, имитируя ход времени.
+    """
+    def __init__(self, candles, timeframe_ms=3_600_000, seed=0):
+        self.candles = {symbol: [list(c) for c in rows] for symbol, rows in candles.items()}
+        self.timeframe_ms = timeframe_ms
+        self.rng = np.random.default_rng(seed)
+        self.has = {'createOrders': False, 'cancelOrders': False, 'fetchClosedOrders': False}
+        self.orders = {}
+        self.requests = 0
+
+    @classmethod
+    def synthetic(cls, symbols, length, timeframe_ms=3_600_000, seed=0):
+        """
+        Случайное блуждание цены для каждой пары
+        """
+        rng = np.random.default_rng(seed)
+        start = 1_699_920_000_000  # начало суток UTC
+        candles = {}
+        for symbol in symbols:
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+            opens = np.concatenate(([close[0]], close[:-1]))
+            spread = np.abs(rng.normal(0, 0.005, length)) * close
+            rows = np.column_stack([
+                start + np.arange(length) * timeframe_ms,
+                opens,
+                np.maximum(opens, close) + spread,
+                np.minimum(opens, close) - spread,
+                close,
+                rng.uniform(1, 100, length),
+            ])
+            candles[symbol] = rows.tolist()
+        return cls(candles, timeframe_ms, seed)
+
+    @classmethod
+    def from_candle_store(cls, store, symbols, timeframe, length):
+        """
+        Записанные свечи из CandleStore (последние length на пару)
+        """
+        from utils import TradingUtils
+
+        candles = {}
+        for symbol in symbols:
+            records = store.tail(symbol, timeframe, length)
+            if len(records):
+                candles[symbol] = [list(row) for row in records.tolist()]
+        return cls(candles, TradingUtils.timeframe_to_ms(timeframe))
+
+    def advance(self):
+        for rows in self.candles.values():
+            last = rows[-1]
+            close = last[4] * float(np.exp(self.rng.normal(0, 0.01)))
+            rows.append([last[0] + self.timeframe_ms, last[4], max(last[4], close), min(last[4], close), close, 1.0])
+
+    def milliseconds(self):
+        return int(time.time() * 1000)
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=None, params=None):
+        self.requests += 1
+        rows = self.candles[symbol]
+        if since is not None:
+            rows = [row for row in rows if row[0] >= since]
+        return [list(row) for row in (rows[-limit:] if limit else rows)]
+
+    def fetch_ticker(self, symbol, params=None):
+        self.requests += 1
+        last = self.candles[symbol][-1][4]
+        return {'symbol': symbol, 'last': last, 'bid': last, 'ask': last}
+
+    def fetch_balance(self, params=None):
+        self.requests += 1
+        return {'USDT': {'free': 10000.0, 'used': 0.0, 'total': 10000.0}}
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self.requests += 1
+        order_id = str(len(self.orders) + 1)
+        fill_price = price or self.candles[symbol][-1][4]
+        order = {
+            'id': order_id, 'symbol': symbol, 'type': type, 'side': side, 'amount': amount,
+            'price': fill_price, 'average': fill_price if type == 'market' else None,
+            'filled': amount if type == 'market' else 0, 'status': 'closed' if type == 'market' else 'open',
+            'clientOrderId': (params or {}).get('clientOrderId'),
+        }
+        self.orders[order_id] = order
+        return order
+
+    def cancel_order(self, order_id, symbol=None, params=None):
+        self.requests += 1
+        order = self.orders.get(order_id, {'id': order_id})
+        order['status'] = 'canceled'
+        return order
+
+    def fetch_order(self, order_id, symbol=None, params=None):
+        self.requests += 1
+        return self.orders[order_id]
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self.requests += 1
+        return [o for o in self.orders.values() if o['status'] == 'open' and o['symbol'] == symbol]
+
+
+def measure(func, repeat, setup=None):
+    """
+    Время выполнения func (секунды) по repeat запускам.
+    setup вызывается перед каждым запуском и в замер не входит.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'runs': repeat,
+    }
+
+
+def make_bot(exchange, symbols):
+    from mexc_trading_bot import MexcTrendBot
+
+    bot = MexcTrendBot(exchange=exchange, persist=False)
+    bot.symbols = list(symbols)
+    return bot
+
+
+def bench_case(symbol_count, length, repeat):
+    """
+    Все замеры для одного сочетания числа пар и длины истории
+    """
+    symbols = [f'SYM{i}/USDT' for i in range(symbol_count)]
+    exchange = SyntheticExchange.synthetic(symbols, length + repeat * 2 + 10)
+    bot = make_bot(exchange, symbols)
+    symbol = symbols[0]
+    candles = exchange.fetch_ohlcv(symbol, limit=length)
+    df = bot.candles_to_dataframe(candles)
+    series = CandleSeries(length)
+    series.extend(candles)
+    periods = [bot.ma_short, bot.ma_medium, bot.ma_long]
+
+    cases = {
+        'candles_to_dataframe': lambda: bot.candles_to_dataframe(candles),
+        'get_historical_data': lambda: bot.get_historical_data(symbol, limit=length),
+        'candle_series_extend': lambda: CandleSeries(length).extend(candles),
+        'calculate_ma': lambda: bot.calculate_ma(df, periods),
+        'calculate_ma[series]': lambda: bot.calculate_ma(series, periods),
+        'calculate_ma[cached]': lambda: bot.calculate_ma(df, periods, symbol=symbol),
+        'calculate_rsi': lambda: bot.calculate_rsi(df, bot.rsi_period),
+        'calculate_rsi[series]': lambda: bot.calculate_rsi(series, bot.rsi_period),
+        'calculate_rsi[cached]': lambda: bot.calculate_rsi(df, bot.rsi_period, symbol=symbol),
+        'calculate_macd': lambda: bot.calculate_macd(df, bot.macd_fast, bot.macd_slow, bot.macd_signal),
+        'calculate_macd[series]': lambda: bot.calculate_macd(series, bot.macd_fast, bot.macd_slow, bot.macd_signal),
+        'calculate_macd[cached]': lambda: bot.calculate_macd(
+            df, bot.macd_fast, bot.macd_slow, bot.macd_signal, symbol=symbol
+        ),
+    }
+    results = {}
+    # Замеры для одной пары не зависят от числа пар
+    if symbol_count == 1:
+        for name, func in cases.items():
+            results[name] = measure(func, repeat)
+
+    # Холодный анализ: состояние индикаторов строится по всей истории
+    def reset_states():
+        bot.indicator_states.clear()
+
+    original_limit = TradingConfig.HISTORICAL_PERIODS
+    TradingConfig.HISTORICAL_PERIODS = length
+    try:
+        if symbol_count == 1:
+            results['analyze_trend[cold]'] = measure(lambda: bot.analyze_trend(symbol), repeat, reset_states)
+            bot.analyze_trend(symbol)
+            results['analyze_trend[warm]'] = measure(lambda: bot.analyze_trend(symbol), repeat, exchange.advance)
+
+        # Полный цикл по всем парам, между циклами появляется новая свеча
+        bot.check_and_execute_strategy()
+        results['check_and_execute_strategy'] = measure(bot.check_and_execute_strategy, repeat, exchange.advance)
+    finally:
+        TradingConfig.HISTORICAL_PERIODS = original_limit
+        bot.executor.pool.shutdown(wait=False)
+
+    return [
+        dict(stats, name=name, symbols=symbol_count, history=length)
+        for name, stats in results.items()
+    ]
+
+
+def run_benchmarks(symbol_counts, history_lengths, repeat):
+    results = []
+    for length in history_lengths:
+        for count in symbol_counts:
+            for row in bench_case(count, length, repeat):
+                print(f"{row['name']:<30} symbols={count:<4} history={length:<6} "
+                      f"median={row['median_s'] * 1000:9.3f}ms min={row['min_s'] * 1000:9.3f}ms")
+                results.append(row)
+    return results
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Поиск регрессий: медианное время выросло больше чем на threshold (доля)
+    относительно базового прогона. Возвращает список строк отчета.
+    """
+    key = lambda row: (row['name'], row['symbols'], row['history'])
+    previous = {key(row): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = previous.get(key(row))
+        if not old or old['median_s'] <= 0:
+            continue
+        change = row['median_s'] / old['median_s'] - 1
+        if change > threshold:
+            regressions.append(
+                f"{row['name']} symbols={row['symbols']} history={row['history']}: "
+                f"{old['median_s'] * 1000:.3f}ms -> {row['median_s'] * 1000:.3f}ms (+{change * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки анализа рынка')
+    parser.add_argument('--symbols', default=','.join(map(str, DEFAULT_SYMBOL_COUNTS)),
+                        help='Количество пар через запятую')
+    parser.add_argument('--history', default=','.join(map(str, DEFAULT_HISTORY_LENGTHS)),
+                        help='Длины истории (свечей) через запятую')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=None, help='JSON с результатами')
+    parser.add_argument('--compare', default=None, help='JSON предыдущего прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое замедление (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # Логирование по каждой паре не должно попадать в замеры
+    logging.disable(logging.WARNING)
+
+    results = run_benchmarks(
+        [int(v) for v in args.symbols.split(',')],
+        [int(v) for v in args.history.split(',')],
+        args.repeat,
+    )
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'results': results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nРезультаты сохранены в {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии (> {args.threshold * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nРегрессий не обнаружено")
+
+
+if __name__ == "__main__":
+    main()
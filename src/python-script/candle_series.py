@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+from candle_store import CANDLE_DTYPE
+
+# Колоночное представление свечей.
+# Кольцевой буфер фиксированной емкости на предвыделенных массивах NumPy:
+# новые свечи записываются на место без создания DataFrame на каждом цикле.
+# Каждое значение пишется в буфер двойной длины дважды (i и i + capacity),
+# поэтому последние len свечей всегда доступны непрерывным срезом без копирования.
+
+_FIELDS = CANDLE_DTYPE.names
+
+
+class CandleSeries:
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("Емкость ряда свечей должна быть положительной")
+        self.capacity = int(capacity)
+        self._buffers = {
+            field: np.zeros(2 * self.capacity, dtype=CANDLE_DTYPE[field]) for field in _FIELDS
+        }
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def _end(self):
+        """Конец окна последних свечей во второй половине буфера"""
+        return (self._count - 1) % self.capacity + self.capacity + 1 if self._count else self.capacity
+
+    def column(self, field):
+        """
+        Последние len значений поля - представление буфера только для чтения.
+        Представление действительно до следующего добавления свечи.
+        """
+        end = self._end()
+        view = self._buffers[field][end - len(self):end]
+        view.flags.writeable = False
+        return view
+
+    def __getitem__(self, field):
+        return self.column(field)
+
+    @property
+    def timestamp(self):
+        return self.column('timestamp')
+
+    @property
+    def open(self):
+        return self.column('open')
+
+    @property
+    def high(self):
+        return self.column('high')
+
+    @property
+    def low(self):
+        return self.column('low')
+
+    @property
+    def close(self):
+        return self.column('close')
+
+    @property
+    def volume(self):
+        return self.column('volume')
+
+    @property
+    def last_timestamp(self):
+        """Время открытия последней свечи (мс) или None"""
+        if not self._count:
+            return None
+        return int(self._buffers['timestamp'][self._end() - 1])
+
+    def _write(self, position, values):
+        for field, value in zip(_FIELDS, values):
+            buffer = self._buffers[field]
+            buffer[position] = value
+            buffer[position + self.capacity] = value
+
+    def append(self, timestamp, open, high, low, close, volume):
+        """
+        Добавление свечи. Свеча с тем же временем, что и последняя,
+        обновляет ее на месте (незакрытая свеча), более старые игнорируются.
+        Возвращает True, если ряд изменился.
+        """
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            return False
+        if last is None or timestamp > last:
+            self._count += 1
+        self._write((self._count - 1) % self.capacity, (timestamp, open, high, low, close, volume))
+        return True
+
+    def extend(self, candles):
+        """
+        Добавление пачки свечей (список ccxt, массив CANDLE_DTYPE или матрица N x 6).
+        Учитываются только свечи не старше последней сохраненной.
+        Возвращает количество новых свечей.
+        """
+        if isinstance(candles, np.ndarray) and candles.dtype.names:
+            columns = [np.asarray(candles[field]) for field in _FIELDS]
+        else:
+            data = np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+            columns = [data[:, 0].astype(np.int64)] + [data[:, i] for i in range(1, 6)]
+        if len(columns[0]) == 0:
+            return 0
+
+        last = self.last_timestamp
+        start = 0 if last is None else int(np.searchsorted(columns[0], last, side='left'))
+        if start < len(columns[0]) and last is not None and columns[0][start] == last:
+            # Обновление последней (незакрытой) свечи
+            self._write((self._count - 1) % self.capacity, [column[start] for column in columns])
+            start += 1
+        columns = [column[start:][-self.capacity:] for column in columns]
+        added = len(columns[0])
+        if added == 0:
+            return 0
+
+        positions = (self._count + np.arange(added)) % self.capacity
+        for field, column in zip(_FIELDS, columns):
+            buffer = self._buffers[field]
+            buffer[positions] = column
+            buffer[positions + self.capacity] = column
+        self._count += added
+        return added
+
+    def clear(self):
+        self._count = 0
+
+    def to_records(self):
+        """
+        Копия свечей в формате CANDLE_DTYPE
+        """
+        records = np.empty(len(self), dtype=CANDLE_DTYPE)
+        for field in _FIELDS:
+            records[field] = self.column(field)
+        return records
+
+    def to_dataframe(self):
+        """
+        DataFrame в формате get_historical_data (для совместимости)
+        """
+        df = pd.DataFrame(self.to_records())
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+
+def candle_timestamps(candles):
+    """
+    Время открытия свечей в миллисекундах для CandleSeries или DataFrame
+    """
+    timestamps = np.asarray(candles['timestamp'])
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype('datetime64[ms]').astype(np.int64)
+    return timestamps.astype(np.int64, copy=False)
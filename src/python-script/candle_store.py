@@ -0,0 +1,218 @@
+import os
+import logging
+
+import numpy as np
+
+from utils import TradingUtils
+
+# Локальное хранилище свечей.
+# Каждая пара (symbol, timeframe) хранится в отдельном бинарном файле с записями
+# фиксированного размера. Файл только дополняется в конец и читается через memmap,
+# поэтому загрузка длинной истории не требует парсинга и копирования.
+
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Максимальное количество свечей за один запрос к MEXC
+FETCH_LIMIT = 1000
+
+
+def to_records(ohlcv):
+    """
+    Преобразование списка свечей ccxt в массив записей CANDLE_DTYPE
+    """
+    records = np.empty(len(ohlcv), dtype=CANDLE_DTYPE)
+    if len(ohlcv):
+        data = np.asarray(ohlcv, dtype=np.float64)
+        records['timestamp'] = data[:, 0].astype(np.int64)
+        for i, field in enumerate(CANDLE_DTYPE.names[1:], start=1):
+            records[field] = data[:, i]
+    return records
+
+
+class CandleStore:
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._last_timestamps = {}
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, symbol, timeframe):
+        name = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.root_dir, f"{name}_{timeframe}.bin")
+
+    def load(self, symbol, timeframe):
+        """
+        Все сохраненные свечи пары (memmap только для чтения)
+        """
+        path = self._path(symbol, timeframe)
+        count = os.path.getsize(path) // CANDLE_DTYPE.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r', shape=(count,))
+
+    def tail(self, symbol, timeframe, count):
+        """
+        Последние count сохраненных свечей (копия)
+        """
+        if count <= 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.array(self.load(symbol, timeframe)[-count:])
+
+    def load_range(self, symbol, timeframe, since, until=None):
+        """
+        Свечи в интервале [since, until)
+        """
+        data = self.load(symbol, timeframe)
+        start = int(np.searchsorted(data['timestamp'], since, side='left'))
+        end = len(data) if until is None else int(np.searchsorted(data['timestamp'], until, side='left'))
+        return np.array(data[start:end])
+
+    def last_timestamp(self, symbol, timeframe):
+        """
+        Время открытия последней сохраненной свечи или None
+        """
+        key = (symbol, timeframe)
+        if key not in self._last_timestamps:
+            data = self.load(symbol, timeframe)
+            self._last_timestamps[key] = int(data['timestamp'][-1]) if len(data) else None
+        return self._last_timestamps[key]
+
+    def append(self, symbol, timeframe, records):
+        """
+        Дописывание закрытых свечей новее последней сохраненной
+        """
+        last = self.last_timestamp(symbol, timeframe)
+        if last is not None:
+            records = records[records['timestamp'] > last]
+        if len(records) == 0:
+            return 0
+        with open(self._path(symbol, timeframe), 'ab') as f:
+            f.write(records.tobytes())
+        self._last_timestamps[(symbol, timeframe)] = int(records['timestamp'][-1])
+        return len(records)
+
+    def replace(self, symbol, timeframe, records):
+        """
+        Атомарная перезапись файла пары (используется при догрузке старой истории)
+        """
+        path = self._path(symbol, timeframe)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(records, dtype=CANDLE_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+        self._last_timestamps[(symbol, timeframe)] = int(records['timestamp'][-1]) if len(records) else None
+
+    def next_since(self, symbol, timeframe):
+        """
+        Начало следующего запроса свечей (None - хранилище пустое)
+        """
+        last = self.last_timestamp(symbol, timeframe)
+        if last is None:
+            return None
+        return last + TradingUtils.timeframe_to_ms(timeframe)
+
+    def ingest(self, symbol, timeframe, ohlcv, now):
+        """
+        Сохранение загруженных свечей. Закрытые свечи пишутся в файл,
+        незакрытая (текущая) возвращается отдельно.
+        """
+        records = to_records(ohlcv)
+        timeframe_ms = TradingUtils.timeframe_to_ms(timeframe)
+        closed = records['timestamp'] + timeframe_ms <= now
+        self.append(symbol, timeframe, records[closed])
+        live = records[~closed]
+        return live[-1:] if len(live) else live
+
+    def sync(self, exchange, symbol, timeframe, limit):
+        """
+        Догрузка только новых свечей с биржи.
+        Возвращает последние limit свечей (включая текущую незакрытую).
+        """
+        now = exchange.milliseconds()
+        since = self.next_since(symbol, timeframe)
+
+        if since is None:
+            batch = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            live = self.ingest(symbol, timeframe, batch, now)
+        else:
+            live = np.empty(0, dtype=CANDLE_DTYPE)
+            while since <= now:
+                batch = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=FETCH_LIMIT)
+                if not batch:
+                    break
+                live = self.ingest(symbol, timeframe, batch, now)
+                if len(live) or len(batch) < FETCH_LIMIT:
+                    break
+                since = batch[-1][0] + TradingUtils.timeframe_to_ms(timeframe)
+
+        closed = self.tail(symbol, timeframe, limit - len(live))
+        return np.concatenate((closed, live))
+
+    async def sync_async(self, exchange, symbol, timeframe, limit):
+        """
+        То же, что sync(), для асинхронного клиента ccxt.async_support
+        """
+        now = exchange.milliseconds()
+        since = self.next_since(symbol, timeframe)
+
+        if since is None:
+            batch = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            live = self.ingest(symbol, timeframe, batch, now)
+        else:
+            live = np.empty(0, dtype=CANDLE_DTYPE)
+            while since <= now:
+                batch = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=FETCH_LIMIT)
+                if not batch:
+                    break
+                live = self.ingest(symbol, timeframe, batch, now)
+                if len(live) or len(batch) < FETCH_LIMIT:
+                    break
+                since = batch[-1][0] + TradingUtils.timeframe_to_ms(timeframe)
+
+        closed = self.tail(symbol, timeframe, limit - len(live))
+        return np.concatenate((closed, live))
+
+    def fetch_range(self, exchange, symbol, timeframe, since, until):
+        """
+        Постраничная загрузка закрытых свечей в интервале [since, until)
+        """
+        timeframe_ms = TradingUtils.timeframe_to_ms(timeframe)
+        now = exchange.milliseconds()
+        chunks = []
+        while since < until:
+            batch = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=FETCH_LIMIT)
+            if not batch:
+                break
+            records = to_records(batch)
+            records = records[(records['timestamp'] < until) & (records['timestamp'] + timeframe_ms <= now)]
+            chunks.append(records)
+            since = batch[-1][0] + timeframe_ms
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=CANDLE_DTYPE)
+
+    def backfill(self, exchange, symbol, timeframe, since):
+        """
+        Загрузка истории начиная с since: догрузка более старых свечей
+        перед первой сохраненной и новых после последней
+        """
+        data = self.load(symbol, timeframe)
+        now = exchange.milliseconds()
+
+        if len(data) == 0:
+            self.append(symbol, timeframe, self.fetch_range(exchange, symbol, timeframe, since, now))
+            return
+
+        first = int(data['timestamp'][0])
+        if since < first:
+            older = self.fetch_range(exchange, symbol, timeframe, since, first)
+            if len(older):
+                logging.info(f"Догрузка {len(older)} свечей {symbol} {timeframe} в локальное хранилище")
+                self.replace(symbol, timeframe, np.concatenate((older, np.array(data))))
+
+        newer = self.fetch_range(exchange, symbol, timeframe, self.next_since(symbol, timeframe), now)
+        self.append(symbol, timeframe, newer)
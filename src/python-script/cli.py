@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Точка входа бота: python cli.py <команда>.
+  validate  - проверка настроек (без загрузки ccxt и pandas)
+  health    - проверка запущенного бота по эндпоинту метрик или API панели
+  run       - запуск бота (обычный, асинхронный, потоковый режим или супервизор)
+  backtest  - бэктест стратегии по парам
+  scan      - один проход сканера рынка
+Тяжелые зависимости импортируются только командами, которым они нужны,
+поэтому validate и health подходят для проверок оркестратора контейнеров.
+"""
+
+import argparse
+import sys
+
+
+def cmd_validate(args):
+    from env_validator import validate_env_file
+    return 0 if validate_env_file() else 1
+
+
+def cmd_health(args):
+    """
+    Код 0, если эндпоинт /metrics (или API панели) бота отвечает
+    """
+    from urllib.request import urlopen
+    from config import TradingConfig
+
+    if args.url:
+        url = args.url
+    elif TradingConfig.METRICS_PORT:
+        url = f"http://127.0.0.1:{TradingConfig.METRICS_PORT}/metrics"
+    elif TradingConfig.API_PORT:
+        url = f"http://{TradingConfig.API_HOST}:{TradingConfig.API_PORT}/api/stats/summary"
+    else:
+        print("Не задан METRICS_PORT или API_PORT", file=sys.stderr)
+        return 2
+    try:
+        with urlopen(url, timeout=args.timeout) as response:
+            healthy = response.status == 200
+    except OSError as e:
+        print(f"{url}: {e}", file=sys.stderr)
+        return 1
+    return 0 if healthy else 1
+
+
+def cmd_run(args):
+    if args.supervisor:
+        from config import TradingConfig, configure_logging
+        from supervisor import BotSupervisor, load_accounts
+        from metrics import metrics
+
+        configure_logging()
+        supervisor = BotSupervisor(load_accounts(), args.workers)
+        if TradingConfig.METRICS_PORT:
+            metrics.start_http_server(TradingConfig.METRICS_PORT)
+        supervisor.run()
+        return 0
+
+    from mexc_trading_bot import MexcTrendBot
+
+    bot = MexcTrendBot()
+    if args.mode == 'async':
+        bot.run_bot_async()
+    elif args.mode == 'stream':
+        bot.run_bot_stream()
+    else:
+        bot.run_bot()
+    return 0
+
+
+def cmd_backtest(args):
+    from config import TradingConfig
+    from mexc_trading_bot import BacktestEngine
+
+    ticks = {}
+    if args.ticks:
+        from tick_kernel import load_ticks
+        ticks = {symbol: load_ticks(path) for symbol, path in (item.split('=', 1) for item in args.ticks)}
+
+    engine = BacktestEngine(initial_capital=args.capital)
+    symbols = args.symbols.split(',') if args.symbols else TradingConfig.TRADING_PAIRS
+    for symbol in symbols:
+        try:
+            result = engine.backtest_strategy(symbol, args.days, args.timeframe, ticks=ticks.get(symbol))
+        except Exception as e:
+            print(f"{symbol}: ошибка бэктеста: {e}", file=sys.stderr)
+            continue
+        if result:
+            stats = result['stats']
+            print(
+                f"{symbol:<14} сделок {stats['total_trades']:>5}  win rate {stats['win_rate']:6.1f}%  "
+                f"доходность {stats['return_pct']:8.2f}%  просадка {stats['max_drawdown_pct']:6.2f}%"
+            )
+    return 0
+
+
+def cmd_scan(args):
+    import ccxt
+    from mexc_trading_bot import MexcTrendBot
+    from market_cache import load_markets
+    from scanner import MarketScanner
+
+    # Сканеру нужны только публичные данные: ключи API не требуются
+    exchange = ccxt.mexc({'enableRateLimit': True})
+    load_markets(exchange)
+    bot = MexcTrendBot(exchange=exchange, persist=False)
+    scanner = MarketScanner(bot, shortlist_size=args.shortlist)
+    selected = scanner.scan()
+    for row in scanner.last_ranking[:args.limit]:
+        print(
+            f"{row['symbol']:<14} {row['signal']:<5} {row['trend']:<10} балл {row['score']:>3}  "
+            f"объем {row['volume']:>16,.0f}  волатильность {row['volatility']:6.2f}%"
+        )
+    print(f"Выбрано: {', '.join(selected) or '-'}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='MEXC Trading Bot')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    validate = commands.add_parser('validate', help='проверка настроек')
+    validate.set_defaults(handler=cmd_validate)
+
+    health = commands.add_parser('health', help='проверка запущенного бота')
+    health.add_argument('--url', default=None, help='адрес проверки (по умолчанию /metrics на METRICS_PORT)')
+    health.add_argument('--timeout', type=float, default=2.0)
+    health.set_defaults(handler=cmd_health)
+
+    run = commands.add_parser('run', help='запуск бота')
+    run.add_argument('--mode', choices=['loop', 'async', 'stream'], default='loop')
+    run.add_argument('--supervisor', action='store_true', help='пары и аккаунты в нескольких процессах')
+    run.add_argument('--workers', type=int, default=None, help='процессов на аккаунт в режиме супервизора')
+    run.set_defaults(handler=cmd_run)
+
+    backtest = commands.add_parser('backtest', help='бэктест стратегии')
+    backtest.add_argument('--symbols', default=None, help='пары через запятую (по умолчанию TRADING_PAIRS)')
+    backtest.add_argument('--days', type=int, default=30)
+    backtest.add_argument('--timeframe', default=None, help='по умолчанию TIMEFRAME')
+    backtest.add_argument('--capital', type=float, default=10000)
+    backtest.add_argument('--ticks', nargs='*', default=None, help='тики в виде ПАРА=путь')
+    backtest.set_defaults(handler=cmd_backtest)
+
+    scan = commands.add_parser('scan', help='один проход сканера рынка')
+    scan.add_argument('--shortlist', type=int, default=None, help='размер короткого списка')
+    scan.add_argument('--limit', type=int, default=20, help='строк рейтинга в выводе')
+    scan.set_defaults(handler=cmd_scan)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +19,15 @@ class TradingConfig:
     TAKE_PROFIT_PCT = float(os.getenv('TAKE_PROFIT_PCT', '0.10'))
     MAX_OPEN_POSITIONS = int(os.getenv('MAX_OPEN_POSITIONS', '5'))
     
+    # Риск портфеля: суммарный риск открытых позиций (доля баланса)
+    # и максимальная корреляция доходностей новой пары с открытыми позициями
+    MAX_TOTAL_RISK = float(os.getenv('MAX_TOTAL_RISK', '0.10'))
+    MAX_CORRELATION = float(os.getenv('MAX_CORRELATION', '0.8'))
+    CORRELATION_WINDOW = int(os.getenv('CORRELATION_WINDOW', '50'))
+    
+    # Время жизни кэша баланса (секунды)
+    BALANCE_CACHE_TTL = int(os.getenv('BALANCE_CACHE_TTL', '30'))
+    
     # Параметры технических индикаторов
     MA_SHORT_PERIOD = int(os.getenv('MA_SHORT_PERIOD', '7'))
     MA_MEDIUM_PERIOD = int(os.getenv('MA_MEDIUM_PERIOD', '25'))
@@ -32,15 +42,101 @@ class TradingConfig:
     # Торгуемые пары
     TRADING_PAIRS = os.getenv('TRADING_PAIRS', 'BTC/USDT,ETH/USDT,BNB/USDT,ADA/USDT,SOL/USDT,XRP/USDT').split(',')
     
+    # Сканер рынка: выбор пар из всех пар биржи вместо фиксированного TRADING_PAIRS
+    SCANNER_ENABLED = os.getenv('SCANNER_ENABLED', 'false').lower() == 'true'
+    SCANNER_QUOTE = os.getenv('SCANNER_QUOTE', 'USDT')
+    SCANNER_MIN_VOLUME = float(os.getenv('SCANNER_MIN_VOLUME', '1000000'))
+    SCANNER_MIN_VOLATILITY = float(os.getenv('SCANNER_MIN_VOLATILITY', '3'))
+    SCANNER_SHORTLIST = int(os.getenv('SCANNER_SHORTLIST', '30'))
+    SCANNER_MAX_SYMBOLS = int(os.getenv('SCANNER_MAX_SYMBOLS', '10'))
+    SCANNER_INTERVAL = int(os.getenv('SCANNER_INTERVAL', '3600'))
+    
     # Настройки времени
     TIMEFRAME = os.getenv('TIMEFRAME', '1h')
     CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '60'))
     HISTORICAL_PERIODS = int(os.getenv('HISTORICAL_PERIODS', '100'))
     
+    # Старшие таймфреймы для подтверждения сигнала (собираются из свечей TIMEFRAME)
+    HIGHER_TIMEFRAMES = [tf for tf in os.getenv('HIGHER_TIMEFRAMES', '').split(',') if tf]
+    MTF_CONFIRMATION = os.getenv('MTF_CONFIRMATION', 'false').lower() == 'true'
+    
+    # Асинхронный режим: максимум одновременных запросов к бирже
+    ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', '10'))
+    
+    # Планировщик запросов к бирже: размер ведра токенов (вес запросов), доля ведра,
+    # недоступная запросам рыночных данных, и максимальная пауза после ответа 429 (секунды)
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_BURST = int(os.getenv('SCHEDULER_BURST', '20'))
+    SCHEDULER_RESERVE = float(os.getenv('SCHEDULER_RESERVE', '0.25'))
+    SCHEDULER_MAX_BACKOFF = float(os.getenv('SCHEDULER_MAX_BACKOFF', '60'))
+    
+    # Режим супервизора: число процессов (0 - по числу ядер, не больше числа пар),
+    # JSON-файл с аккаунтами и стратегиями, максимальная пауза перед перезапуском упавшего
+    # процесса и время без сигналов, после которого процесс считается зависшим (секунды),
+    # доля лимита запросов IP для общего потока свечей (остальное делится между процессами)
+    SUPERVISOR_WORKERS = int(os.getenv('SUPERVISOR_WORKERS', '0'))
+    SUPERVISOR_ACCOUNTS = os.getenv('SUPERVISOR_ACCOUNTS', '')
+    SUPERVISOR_MAX_RESTART_DELAY = float(os.getenv('SUPERVISOR_MAX_RESTART_DELAY', '300'))
+    SUPERVISOR_HEARTBEAT_TIMEOUT = float(os.getenv('SUPERVISOR_HEARTBEAT_TIMEOUT', '600'))
+    SUPERVISOR_FEED_RATE_SHARE = float(os.getenv('SUPERVISOR_FEED_RATE_SHARE', '0.3'))
+    
+    # Потоковый режим: пауза перед переподключением WebSocket (секунды)
+    STREAM_RECONNECT_DELAY = int(os.getenv('STREAM_RECONNECT_DELAY', '5'))
+    
+    # Локальное хранилище свечей (пустое значение отключает кэш)
+    CANDLE_CACHE_DIR = os.getenv('CANDLE_CACHE_DIR', 'candle_cache')
+    
+    # Объем кэша рассчитанных индикаторов (МБ)
+    INDICATOR_CACHE_MB = int(os.getenv('INDICATOR_CACHE_MB', '256'))
+    
+    # Журнал позиций и ордеров (пустое значение отключает журнал)
+    JOURNAL_PATH = os.getenv('JOURNAL_PATH', 'state/journal.db')
+    JOURNAL_BATCH_SIZE = int(os.getenv('JOURNAL_BATCH_SIZE', '50'))
+    JOURNAL_FLUSH_INTERVAL = float(os.getenv('JOURNAL_FLUSH_INTERVAL', '1.0'))
+    JOURNAL_SNAPSHOT_EVERY = int(os.getenv('JOURNAL_SNAPSHOT_EVERY', '1000'))
+    
+    # Кэш рынков биржи на диске и его время жизни (секунды); пустое значение отключает кэш
+    MARKETS_CACHE_PATH = os.getenv('MARKETS_CACHE_PATH', 'state/markets.json')
+    MARKETS_CACHE_TTL = int(os.getenv('MARKETS_CACHE_TTL', '86400'))
+    
+    # Хранилище исполнений и закрытых сделок (пустое значение отключает)
+    TRADE_STORE_PATH = os.getenv('TRADE_STORE_PATH', 'state/trades.db')
+    
     # Настройки логирования
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'trading_bot.log')
     
+    # Метрики: порт HTTP-эндпоинта /metrics (0 - отключен) и интервал сводки в логе (секунды)
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    METRICS_SUMMARY_INTERVAL = int(os.getenv('METRICS_SUMMARY_INTERVAL', '300'))
+    
+    # JSON API для панели: порт (0 - отключен), адрес и разрешенный источник запросов (CORS)
+    API_PORT = int(os.getenv('API_PORT', '0'))
+    API_HOST = os.getenv('API_HOST', '127.0.0.1')
+    API_CORS_ORIGIN = os.getenv('API_CORS_ORIGIN', '*')
+    
+    # Поток состояния панели /api/live: минимальный интервал рассылки (секунды) и предел клиентов
+    LIVE_MIN_INTERVAL = float(os.getenv('LIVE_MIN_INTERVAL', '0.5'))
+    LIVE_MAX_CLIENTS = int(os.getenv('LIVE_MAX_CLIENTS', '50'))
+    
+    @classmethod
+    def strategy_params(cls):
+        """Параметры стратегии в виде словаря (для бэктеста и оптимизации)"""
+        return {
+            'ma_short': cls.MA_SHORT_PERIOD,
+            'ma_medium': cls.MA_MEDIUM_PERIOD,
+            'ma_long': cls.MA_LONG_PERIOD,
+            'rsi_period': cls.RSI_PERIOD,
+            'rsi_oversold': cls.RSI_OVERSOLD,
+            'rsi_overbought': cls.RSI_OVERBOUGHT,
+            'macd_fast': cls.MACD_FAST,
+            'macd_slow': cls.MACD_SLOW,
+            'macd_signal': cls.MACD_SIGNAL,
+            'stop_loss_pct': cls.STOP_LOSS_PCT,
+            'take_profit_pct': cls.TAKE_PROFIT_PCT,
+            'risk_per_trade': cls.RISK_PER_TRADE,
+        }
+    
     @classmethod
     def validate_config(cls):
         """Проверка корректности конфигурации"""
@@ -53,4 +149,22 @@ class TradingConfig:
         if cls.SECRET_KEY == "your_mexc_secret_key_here":
             raise ValueError("Замените SECRET_KEY в .env файле на настоящий ключ")
         
-        return True
\ No newline at end of file
+        return True
+
+
+def configure_logging():
+    """
+    Логирование в LOG_FILE и консоль. Вызывается при создании бота и точками входа,
+    а не при импорте модулей; повторный вызов ничего не меняет.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    logging.basicConfig(
+        level=getattr(logging, TradingConfig.LOG_LEVEL),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(TradingConfig.LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
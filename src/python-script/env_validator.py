@@ -5,35 +5,39 @@
 """
 
 import os
-from dotenv import load_dotenv
 import sys
 
 def validate_env_file():
-    """Проверка .env файла на корректность"""
+    """Проверка настроек бота (значения берутся из TradingConfig, .env читается один раз)"""
+    
+    errors = []
+    warnings = []
     
-    # Загрузка .env файла
     if not os.path.exists('.env'):
-        print("❌ Файл .env не найден!")
-        print("📝 Создайте .env файл на основе .env.example:")
-        print("   cp .env.example .env")
-        return False
+        if not os.getenv('MEXC_API_KEY'):
+            print("❌ Файл .env не найден!")
+            print("📝 Создайте .env файл на основе .env.example:")
+            print("   cp .env.example .env")
+            return False
+        # В контейнере настройки обычно передаются переменными окружения
+        warnings.append("⚠️  Файл .env не найден, используются переменные окружения")
     
-    load_dotenv()
+    try:
+        from config import TradingConfig
+    except ValueError as e:
+        print(f"❌ Некорректное значение в настройках: {e}")
+        return False
     
     print("🔍 Проверка конфигурации...")
     print("-" * 40)
     
-    errors = []
-    warnings = []
-    
     # Проверка обязательных параметров
     required_vars = {
-        'MEXC_API_KEY': 'API ключ MEXC',
-        'MEXC_SECRET_KEY': 'Секретный ключ MEXC'
+        'MEXC_API_KEY': (TradingConfig.API_KEY, 'API ключ MEXC'),
+        'MEXC_SECRET_KEY': (TradingConfig.SECRET_KEY, 'Секретный ключ MEXC')
     }
     
-    for var, description in required_vars.items():
-        value = os.getenv(var)
+    for var, (value, description) in required_vars.items():
         if not value:
             errors.append(f"❌ {var} не установлен ({description})")
         elif value in ['your_mexc_api_key_here', 'your_mexc_secret_key_here']:
@@ -41,33 +45,27 @@ def validate_env_file():
         else:
             print(f"✅ {var}: {'*' * 8}{value[-4:]} ({description})")
     
-    # Проверка опциональных параметров
+    # Основные параметры
     optional_vars = {
-        'SANDBOX_MODE': ('true', 'Режим песочницы'),
-        'RISK_PER_TRADE': ('0.02', 'Риск на сделку'),
-        'STOP_LOSS_PCT': ('0.05', 'Stop-Loss %'),
-        'TAKE_PROFIT_PCT': ('0.10', 'Take-Profit %'),
-        'TRADING_PAIRS': ('BTC/USDT,ETH/USDT', 'Торгуемые пары')
+        'SANDBOX_MODE': (TradingConfig.SANDBOX_MODE, 'Режим песочницы'),
+        'RISK_PER_TRADE': (TradingConfig.RISK_PER_TRADE, 'Риск на сделку'),
+        'STOP_LOSS_PCT': (TradingConfig.STOP_LOSS_PCT, 'Stop-Loss %'),
+        'TAKE_PROFIT_PCT': (TradingConfig.TAKE_PROFIT_PCT, 'Take-Profit %'),
+        'TRADING_PAIRS': (','.join(TradingConfig.TRADING_PAIRS), 'Торгуемые пары')
     }
     
-    for var, (default, description) in optional_vars.items():
-        value = os.getenv(var, default)
+    for var, (value, description) in optional_vars.items():
         print(f"📋 {var}: {value} ({description})")
     
     # Проверка числовых значений
-    numeric_vars = ['RISK_PER_TRADE', 'STOP_LOSS_PCT', 'TAKE_PROFIT_PCT']
-    for var in numeric_vars:
-        try:
-            value = float(os.getenv(var, '0'))
-            if value <= 0 or value > 1:
-                warnings.append(f"⚠️  {var} = {value} (рекомендуется 0.01-0.20)")
-        except ValueError:
-            errors.append(f"❌ {var} должен быть числом")
+    for var in ['RISK_PER_TRADE', 'STOP_LOSS_PCT', 'TAKE_PROFIT_PCT']:
+        value = optional_vars[var][0]
+        if value <= 0 or value > 1:
+            warnings.append(f"⚠️  {var} = {value} (рекомендуется 0.01-0.20)")
     
     # Проверка торгуемых пар
-    pairs = os.getenv('TRADING_PAIRS', '').split(',')
-    valid_pairs = [pair.strip() for pair in pairs if '/' in pair]
-    if len(valid_pairs) == 0:
+    valid_pairs = [pair.strip() for pair in TradingConfig.TRADING_PAIRS if '/' in pair]
+    if len(valid_pairs) == 0 and not TradingConfig.SCANNER_ENABLED:
         errors.append("❌ Не указаны корректные торгуемые пары")
     else:
         print(f"📈 Торгуемые пары: {len(valid_pairs)} шт.")
@@ -88,7 +86,7 @@ def validate_env_file():
         print()
     
     if not errors:
-        sandbox_status = "SANDBOX" if os.getenv('SANDBOX_MODE', 'true').lower() == 'true' else "LIVE"
+        sandbox_status = "SANDBOX" if TradingConfig.SANDBOX_MODE else "LIVE"
         print(f"✅ Конфигурация корректна! Режим: {sandbox_status}")
         return True
     else:
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Проверка устойчивости параметров стратегии вне выборки.
+Walk-forward: история делится на скользящие окна, параметры подбираются
+на обучающем отрезке и проверяются на следующем за ним тестовом.
+Monte Carlo: последовательность сделок перемешивается с возвратом,
+по тысячам вариантов строятся распределения доходности и просадки.
+Обе процедуры выполняются параллельно в процессах и сохраняют готовые
+части в файл контрольной точки, поэтому прерванный прогон продолжается с места остановки.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import optimizer
+from config import TradingConfig
+from backtest import compute_signals, simulate_trades, summarize_trades, data_version
+from optimizer import SharedCandles, DEFAULT_SEARCH_SPACE, LOWER_IS_BETTER, evaluate_params, random_search_space
+from utils import PerformanceTracker
+
+DAY_MS = 24 * 60 * 60 * 1000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class Checkpoint:
+    """
+    Готовые части прогона в JSON-файле. Файл от прогона с другими
+    настройками (другой отпечаток) не используется.
+    """
+    def __init__(self, path, settings):
+        self.path = path
+        self.fingerprint = hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('fingerprint') == self.fingerprint:
+                self.results = saved['results']
+                logging.info(f"Контрольная точка {path}: готово {len(self.results)} частей")
+            else:
+                logging.warning(f"Контрольная точка {path} от другого прогона и будет перезаписана")
+
+    def __contains__(self, key):
+        return str(key) in self.results
+
+    def get(self, key):
+        return self.results[str(key)]
+
+    def save(self, key, value):
+        self.results[str(key)] = value
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Запись через временный файл: прерывание не портит контрольную точку
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'results': self.results}, f, default=str)
+        os.replace(tmp, self.path)
+
+
+def walk_forward_windows(start, end, train_ms, test_ms, step_ms=None):
+    """
+    Границы окон (train_start, train_end, test_end) в миллисекундах.
+    Тестовый отрезок начинается сразу после обучающего, окна сдвигаются на step_ms
+    (по умолчанию на длину тестового отрезка).
+    """
+    step_ms = step_ms or test_ms
+    windows = []
+    train_start = start
+    while train_start + train_ms + test_ms <= end:
+        windows.append((train_start, train_start + train_ms, train_start + train_ms + test_ms))
+        train_start += step_ms
+    return windows
+
+
+def slice_data(data, start, end):
+    """
+    Свечи пар в интервале [start, end) - представления массивов без копирования
+    """
+    sliced = {}
+    for symbol, arrays in data.items():
+        lo, hi = np.searchsorted(arrays['timestamp'], [start, end])
+        sliced[symbol] = {field: values[lo:hi] for field, values in arrays.items()}
+    return sliced
+
+
+def out_of_sample_trades(arrays, params, start, end, initial_capital, fee_rate):
+    """
+    Сделки с входом в интервале [start, end). Для прогрева индикаторов
+    используются ma_long свечей перед start, входы на прогреве запрещены.
+    """
+    timestamps = arrays['timestamp']
+    lo, hi = np.searchsorted(timestamps, [start, end])
+    warmup = max(0, lo - params['ma_long'])
+    window = {field: values[warmup:hi] for field, values in arrays.items()}
+    if hi - lo == 0 or len(window['close']) < params['ma_long']:
+        return []
+    buy_mask, sell_mask = compute_signals(window['close'], params)
+    buy_mask[:lo - warmup] = False
+    trades, _ = simulate_trades(window, buy_mask, sell_mask, params, initial_capital, fee_rate)
+    return trades
+
+
+def _run_window(task):
+    """
+    Одно окно walk-forward в процессе-исполнителе: подбор параметров
+    на обучающем отрезке и сделки с лучшими параметрами на тестовом.
+    Капитал окна делится поровну между парами, сделки считаются от
+    initial_capital (масштабируются к капиталу окна в walk_forward).
+    """
+    index, (train_start, train_end, test_end), combinations, sort_by = task
+    data = optimizer._worker_data
+    initial_capital = optimizer._worker_settings['initial_capital']
+    fee_rate = optimizer._worker_settings['fee_rate']
+
+    train = slice_data(data, train_start, train_end)
+    ranked = sorted(
+        (evaluate_params(params, train, initial_capital, fee_rate, optimizer._worker_cache) for params in combinations),
+        key=lambda result: result[sort_by], reverse=sort_by not in LOWER_IS_BETTER
+    )
+    best = ranked[0]
+    params = {key: best[key] for key in combinations[0]}
+
+    share = initial_capital / len(data)
+    trades = []
+    for symbol, arrays in data.items():
+        for trade in out_of_sample_trades(arrays, params, train_end, test_end, share, fee_rate):
+            trade['symbol'] = symbol
+            trades.append(trade)
+    trades.sort(key=lambda t: t['exit_time'])
+    test_stats = summarize_trades(trades, initial_capital)
+    return index, {
+        'train_start': train_start,
+        'train_end': train_end,
+        'test_end': test_end,
+        'params': params,
+        'in_sample': {key: best[key] for key in ('return_pct', 'max_drawdown_pct', 'total_trades', 'win_rate')},
+        'out_of_sample': test_stats,
+        'trades': trades,
+    }
+
+
+def walk_forward(data, combinations, train_days, test_days, step_days=None, initial_capital=10000,
+                 fee_rate=0.001, workers=None, checkpoint=None, sort_by='return_pct'):
+    """
+    Walk-forward по словарю {пара: массивы OHLCV}.
+    Окна обрабатываются параллельно, свечи передаются процессам через общую память.
+    Тестовые отрезки идут подряд на одном капитале: каждое окно начинается с капиталом
+    на конец предыдущего, поделенным поровну между парами.
+    Возвращает окна, сделки всех тестовых отрезков и их статистику (PerformanceTracker).
+    """
+    combinations = list(combinations)
+    starts = [arrays['timestamp'][0] for arrays in data.values() if len(arrays['timestamp'])]
+    ends = [arrays['timestamp'][-1] for arrays in data.values() if len(arrays['timestamp'])]
+    if not combinations or not starts:
+        return None
+    windows = walk_forward_windows(
+        int(min(starts)), int(max(ends)) + 1, train_days * DAY_MS, test_days * DAY_MS,
+        step_days * DAY_MS if step_days else None
+    )
+    if not windows:
+        logging.warning("Истории недостаточно ни для одного окна walk-forward")
+        return None
+
+    state = Checkpoint(checkpoint, {
+        'mode': 'walk_forward', 'windows': windows, 'combinations': combinations, 'sort_by': sort_by,
+        'initial_capital': initial_capital, 'fee_rate': fee_rate, 'allocation': 'equal',
+        'data': {symbol: data_version(arrays) for symbol, arrays in data.items()},
+    })
+    pending = [i for i in range(len(windows)) if i not in state]
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    logging.info(f"Walk-forward: {len(windows)} окон, осталось {len(pending)}, {workers} процессов")
+
+    if pending:
+        shared = SharedCandles(data)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=optimizer._init_worker,
+                initargs=(shared.descriptors, initial_capital, fee_rate)
+            ) as executor:
+                futures = [executor.submit(_run_window, (i, windows[i], combinations, sort_by)) for i in pending]
+                for future in as_completed(futures):
+                    index, result = future.result()
+                    state.save(index, result)
+                    logging.info(
+                        f"Окно {index + 1}/{len(windows)}: обучение {result['in_sample']['return_pct']:.2f}%, "
+                        f"тест {result['out_of_sample']['return_pct']:.2f}%"
+                    )
+        finally:
+            shared.close()
+
+    results = [state.get(i) for i in range(len(windows))]
+    trades = chain_windows(results, initial_capital)
+    tracker = PerformanceTracker(initial_capital)
+    tracker.add_trades(trades)
+    return {
+        'windows': [{key: value for key, value in result.items() if key != 'trades'} for result in results],
+        'trades': trades,
+        'stats': tracker.get_statistics(),
+    }
+
+
+def chain_windows(results, initial_capital):
+    """
+    Сделки окон на общем капитале: размер позиции пропорционален капиталу,
+    поэтому сделки окна, посчитанные от initial_capital, масштабируются
+    к капиталу на начало окна
+    """
+    capital = float(initial_capital)
+    trades = []
+    for result in results:
+        scale = capital / initial_capital
+        for trade in result['trades']:
+            trades.append(dict(trade, size=trade['size'] * scale, pnl=trade['pnl'] * scale,
+                               capital=trade['capital'] * scale))
+        capital += result['out_of_sample']['total_pnl'] * scale
+    return trades
+
+
+def trade_returns(trades, initial_capital):
+    """
+    Доходность сделок в долях капитала перед сделкой
+    """
+    tracker = PerformanceTracker(initial_capital)
+    tracker.add_trades(trades)
+    return tracker.get_returns()
+
+
+def simulate_paths(returns, simulations, seed, replace=True):
+    """
+    simulations вариантов последовательности сделок: итоговая доходность
+    и максимальная просадка (в процентах) по каждому варианту
+    """
+    rng = np.random.default_rng(seed)
+    n = len(returns)
+    if replace:
+        samples = returns[rng.integers(0, n, size=(simulations, n))]
+    else:
+        samples = returns[rng.permuted(np.tile(np.arange(n), (simulations, 1)), axis=1)]
+    equity = np.cumprod(1 + samples, axis=1)
+    equity = np.hstack([np.ones((simulations, 1)), equity])
+    peaks = np.maximum.accumulate(equity, axis=1)
+    drawdown = ((peaks - equity) / peaks).max(axis=1)
+    return (equity[:, -1] - 1) * 100, drawdown * 100
+
+
+def _run_paths(task):
+    index, returns, simulations, seed, replace = task
+    final, drawdown = simulate_paths(returns, simulations, seed, replace)
+    return index, {'return_pct': final.tolist(), 'max_drawdown_pct': drawdown.tolist()}
+
+
+def _distribution(values):
+    return dict(
+        {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        mean=float(values.mean()),
+    )
+
+
+def monte_carlo(trades, simulations=10000, initial_capital=10000, seed=None, replace=True,
+                workers=None, checkpoint=None, chunk_size=1000):
+    """
+    Monte Carlo по последовательности сделок. replace=False - только перестановка
+    сделок (итоговая доходность не меняется, меняется путь и просадка).
+    Варианты считаются блоками по chunk_size параллельно в процессах.
+    """
+    returns = trade_returns(trades, initial_capital)
+    if len(returns) == 0:
+        return None
+
+    chunks = [min(chunk_size, simulations - start) for start in range(0, simulations, chunk_size)]
+    # Отдельная последовательность случайных чисел на блок: результат не зависит
+    # от числа процессов и от того, какие блоки были посчитаны до прерывания
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    state = Checkpoint(checkpoint, {
+        'mode': 'monte_carlo', 'returns': returns.tolist(), 'simulations': simulations,
+        'seed': seed, 'replace': replace, 'chunk_size': chunk_size,
+    })
+    pending = [i for i in range(len(chunks)) if i not in state]
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    logging.info(f"Monte Carlo: {simulations} вариантов по {len(returns)} сделкам, {workers} процессов")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_paths, (i, returns, chunks[i], seeds[i], replace)) for i in pending]
+            for future in as_completed(futures):
+                state.save(*future.result())
+
+    parts = [state.get(i) for i in range(len(chunks))]
+    final = np.concatenate([part['return_pct'] for part in parts])
+    drawdown = np.concatenate([part['max_drawdown_pct'] for part in parts])
+    return {
+        'simulations': simulations,
+        'trades': len(returns),
+        'return_pct': _distribution(final),
+        'max_drawdown_pct': _distribution(drawdown),
+        'probability_of_loss': float((final < 0).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward и Monte Carlo проверка стратегии')
+    parser.add_argument('--symbols', default=','.join(TradingConfig.TRADING_PAIRS))
+    parser.add_argument('--timeframe', default=TradingConfig.TIMEFRAME)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--train-days', type=int, default=90)
+    parser.add_argument('--test-days', type=int, default=30)
+    parser.add_argument('--samples', type=int, default=200, help='Комбинаций параметров на окно')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--simulations', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=os.path.join('state', 'evaluation'),
+                        help='Префикс файлов контрольных точек (пусто - без них)')
+    parser.add_argument('--output', default='evaluation_results.json')
+    args = parser.parse_args()
+
+    from mexc_trading_bot import BacktestEngine
+
+    engine = BacktestEngine()
+    symbols = args.symbols.split(',')
+    combinations = list(random_search_space(DEFAULT_SEARCH_SPACE, args.samples, args.seed))
+    checkpoint = args.checkpoint or None
+    report = engine.walk_forward(
+        symbols, args.train_days, args.test_days, combinations, days=args.days, timeframe=args.timeframe,
+        workers=args.workers, checkpoint=checkpoint and checkpoint + '_wf.json'
+    )
+    if not report:
+        return
+    report['monte_carlo'] = engine.monte_carlo(
+        report['trades'], args.simulations, seed=args.seed, workers=args.workers,
+        checkpoint=checkpoint and checkpoint + '_mc.json'
+    )
+    report.pop('trades')
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(json.dumps({'stats': report['stats'], 'monte_carlo': report['monte_carlo']}, indent=2))
+    print(f"\nРезультаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
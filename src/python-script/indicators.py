@@ -0,0 +1,471 @@
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+# Векторизованные индикаторы стратегии.
+# Все функции работают с массивами NumPy по последней оси и повторяют
+# формулы calculate_ma / calculate_rsi / calculate_macd из MexcTrendBot.
+# Вместо массива цен можно передать CandleSeries или DataFrame со столбцом close.
+
+TREND_SIDEWAYS = 0
+TREND_UP = 1
+TREND_DOWN = -1
+
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+
+
+def _prices(close):
+    """
+    Массив цен закрытия из массива, CandleSeries или DataFrame
+    """
+    return np.asarray(getattr(close, 'close', close), dtype=np.float64)
+
+
+def _window_mean(csum, period):
+    """
+    Скользящее среднее по готовой кумулятивной сумме (NaN до заполнения окна)
+    """
+    result = np.full(csum.shape, np.nan)
+    n = csum.shape[-1]
+    if period <= 0 or n < period:
+        return result
+    window_sum = csum[..., period - 1:].copy()
+    window_sum[..., 1:] -= csum[..., :n - period]
+    result[..., period - 1:] = window_sum / period
+    return result
+
+
+def _rolling_mean(values, period):
+    """
+    Скользящее среднее через кумулятивную сумму
+    """
+    return _window_mean(np.cumsum(_prices(values), axis=-1), period)
+
+
+def _gains_losses(close):
+    """
+    Приросты и потери цены (первое приращение считается нулевым, как в pandas-расчете)
+    """
+    close = _prices(close)
+    delta = np.zeros(close.shape)
+    delta[..., 1:] = np.diff(close, axis=-1)
+    return np.where(delta > 0, delta, 0.0), np.where(delta < 0, -delta, 0.0)
+
+
+def _rsi_from_means(gain, loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def sma(close, period):
+    """
+    Простая скользящая средняя
+    """
+    return _rolling_mean(close, period)
+
+
+def rsi(close, period=14):
+    """
+    RSI по простому скользящему среднему приростов и потерь
+    """
+    gain, loss = _gains_losses(close)
+    return _rsi_from_means(_rolling_mean(gain, period), _rolling_mean(loss, period))
+
+
+def ema(close, span):
+    """
+    EMA, совпадающая с pandas ewm(span=span).mean()
+    """
+    close = _prices(close)
+    if close.ndim == 1:
+        return pd.Series(close).ewm(span=span).mean().to_numpy()
+    flat = close.reshape(-1, close.shape[-1])
+    result = pd.DataFrame(flat.T).ewm(span=span).mean().to_numpy().T
+    return result.reshape(close.shape)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    MACD: линия, сигнальная линия и гистограмма
+    """
+    macd_line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def classify_trend(ma_short, ma_medium, ma_long):
+    """
+    Классификация тренда по взаимному расположению MA
+    """
+    up = (ma_short > ma_medium) & (ma_medium > ma_long)
+    down = (ma_short < ma_medium) & (ma_medium < ma_long)
+    return np.where(up, TREND_UP, np.where(down, TREND_DOWN, TREND_SIDEWAYS)).astype(np.int8)
+
+
+def score_signals(close, trend, ma_short, rsi_values, macd_line, signal_line,
+                  rsi_oversold=30, rsi_overbought=70):
+    """
+    Подсчет баллов покупки/продажи и итогового сигнала (правила analyze_trend)
+    """
+    buy_score = ((trend == TREND_UP).astype(np.int8)
+                 + (close > ma_short)
+                 + (rsi_values < rsi_overbought)
+                 + (macd_line > signal_line)).astype(np.int8)
+    sell_score = ((trend == TREND_DOWN).astype(np.int8)
+                  + (close < ma_short)
+                  + (rsi_values > rsi_oversold)
+                  + (macd_line < signal_line)).astype(np.int8)
+    signal = np.where(buy_score >= 3, SIGNAL_BUY,
+                      np.where(sell_score >= 3, SIGNAL_SELL, SIGNAL_HOLD)).astype(np.int8)
+    return buy_score, sell_score, signal
+
+
+def compute_indicators(close, params, series=None):
+    """
+    Расчет всех индикаторов стратегии за один проход по массиву цен.
+    series - IndicatorSeries для повторного использования промежуточных
+    результатов (например, CachedIndicatorSeries из IndicatorCache).
+    """
+    series = series or IndicatorSeries(close)
+    close = series.close
+    ma_short = series.sma(params['ma_short'])
+    ma_medium = series.sma(params['ma_medium'])
+    ma_long = series.sma(params['ma_long'])
+    rsi_values = series.rsi(params['rsi_period'])
+    macd_line, signal_line, histogram = series.macd(
+        params['macd_fast'], params['macd_slow'], params['macd_signal']
+    )
+    trend = classify_trend(ma_short, ma_medium, ma_long)
+    buy_score, sell_score, signal = score_signals(
+        close, trend, ma_short, rsi_values, macd_line, signal_line,
+        params['rsi_oversold'], params['rsi_overbought']
+    )
+    return {
+        'ma_short': ma_short,
+        'ma_medium': ma_medium,
+        'ma_long': ma_long,
+        'rsi': rsi_values,
+        'macd': macd_line,
+        'signal_line': signal_line,
+        'histogram': histogram,
+        'trend': trend,
+        'buy_score': buy_score,
+        'sell_score': sell_score,
+        'signal': signal,
+    }
+
+
+class IndicatorSeries:
+    """
+    Индикаторы одного ряда цен с общими промежуточными данными:
+    все SMA строятся по одной кумулятивной сумме, все RSI - по общим
+    кумулятивным суммам приростов и потерь, EMA переиспользуются в MACD.
+    """
+    def __init__(self, close):
+        self.close = _prices(close)
+        self._local = {}
+
+    def _memo(self, indicator, period, compute):
+        key = (indicator, period)
+        if key not in self._local:
+            self._local[key] = compute()
+        return self._local[key]
+
+    def cumsum(self):
+        return self._memo('cumsum', 0, lambda: np.cumsum(self.close, axis=-1))
+
+    def gain_loss_cumsum(self):
+        def compute():
+            gain, loss = _gains_losses(self.close)
+            return np.cumsum(gain, axis=-1), np.cumsum(loss, axis=-1)
+        return self._memo('gain_loss_cumsum', 0, compute)
+
+    def sma(self, period):
+        return self._memo('sma', period, lambda: _window_mean(self.cumsum(), period))
+
+    def rsi(self, period):
+        def compute():
+            gain_csum, loss_csum = self.gain_loss_cumsum()
+            return _rsi_from_means(_window_mean(gain_csum, period), _window_mean(loss_csum, period))
+        return self._memo('rsi', period, compute)
+
+    def ema(self, span):
+        return self._memo('ema', span, lambda: ema(self.close, span))
+
+    def macd(self, fast, slow, signal):
+        def compute():
+            macd_line = self.ema(fast) - self.ema(slow)
+            signal_line = ema(macd_line, signal)
+            return macd_line, signal_line, macd_line - signal_line
+        return self._memo('macd', (fast, slow, signal), compute)
+
+
+class CachedIndicatorSeries(IndicatorSeries):
+    def __init__(self, cache, close, symbol, timeframe, version):
+        super().__init__(close)
+        self.cache = cache
+        self.key = (symbol, timeframe, version)
+
+    def _memo(self, indicator, period, compute):
+        symbol, timeframe, version = self.key
+        return self.cache.get((symbol, timeframe, indicator, period, version), compute)
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, 'nbytes', 64)
+
+
+class IndicatorCache:
+    """
+    Общий LRU-кэш индикаторов с ключом (symbol, timeframe, indicator, period, data version).
+    Объем ограничен max_bytes, при переполнении вытесняются давно не использованные записи.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = value
+                self.size += _nbytes(value)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= _nbytes(evicted)
+        return value
+
+    def series(self, close, symbol, timeframe, version):
+        """
+        Ряд индикаторов, промежуточные результаты которого хранятся в кэше
+        """
+        return CachedIndicatorSeries(self, close, symbol, timeframe, version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# Компактный результат пакетного анализа: одна запись на пару
+SIGNAL_DTYPE = np.dtype([
+    ('price', '<f8'),
+    ('ma_short', '<f8'),
+    ('ma_medium', '<f8'),
+    ('ma_long', '<f8'),
+    ('rsi', '<f8'),
+    ('macd', '<f8'),
+    ('macd_signal', '<f8'),
+    ('histogram', '<f8'),
+    ('trend', 'i1'),
+    ('buy_score', 'i1'),
+    ('sell_score', 'i1'),
+    ('signal', 'i1'),
+])
+
+
+def _last_mean(values, period):
+    """Среднее последних period значений по последней оси"""
+    if values.shape[-1] < period:
+        return np.full(values.shape[:-1], np.nan)
+    return values[..., -period:].mean(axis=-1)
+
+
+def analyze_batch(closes, params):
+    """
+    Пакетный анализ: closes - матрица цен закрытия (пары x бары), выровненная по времени.
+    Все индикаторы, тренд и баллы сигналов считаются для всех пар одним векторным проходом.
+    Возвращает массив SIGNAL_DTYPE длиной в число пар.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    price = closes[:, -1]
+
+    ma_short = _last_mean(closes, params['ma_short'])
+    ma_medium = _last_mean(closes, params['ma_medium'])
+    ma_long = _last_mean(closes, params['ma_long'])
+
+    # RSI нужен только на последнем баре: достаточно последних rsi_period приращений
+    gain, loss = _gains_losses(closes)
+    rsi_values = _rsi_from_means(_last_mean(gain, params['rsi_period']), _last_mean(loss, params['rsi_period']))
+
+    macd_line, signal_line, histogram = macd(
+        closes, params['macd_fast'], params['macd_slow'], params['macd_signal']
+    )
+    macd_line, signal_line, histogram = macd_line[:, -1], signal_line[:, -1], histogram[:, -1]
+
+    trend = classify_trend(ma_short, ma_medium, ma_long)
+    buy_score, sell_score, signal = score_signals(
+        price, trend, ma_short, rsi_values, macd_line, signal_line,
+        params['rsi_oversold'], params['rsi_overbought']
+    )
+
+    result = np.empty(len(closes), dtype=SIGNAL_DTYPE)
+    result['price'] = price
+    result['ma_short'] = ma_short
+    result['ma_medium'] = ma_medium
+    result['ma_long'] = ma_long
+    result['rsi'] = rsi_values
+    result['macd'] = macd_line
+    result['macd_signal'] = signal_line
+    result['histogram'] = histogram
+    result['trend'] = trend
+    result['buy_score'] = buy_score
+    result['sell_score'] = sell_score
+    result['signal'] = signal
+    return result
+
+# Потоковые индикаторы: обновление за O(1) на каждую новую свечу.
+# Значения совпадают с pandas-расчетом по всей накопленной истории.
+
+class StreamingSMA:
+    # Как часто пересчитывать сумму окна заново, чтобы не накапливать ошибку округления
+    RESYNC_INTERVAL = 10000
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        """Добавление нового значения"""
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        self.updates += 1
+        if self.updates % self.RESYNC_INTERVAL == 0:
+            self.total = math.fsum(self.window)
+        return self.value
+
+    def peek(self, value):
+        """Значение с учетом еще не закрытой свечи, без изменения состояния"""
+        if len(self.window) + 1 < self.period:
+            return np.nan
+        total = self.total + value
+        if len(self.window) == self.period:
+            total -= self.window[0]
+        return total / self.period
+
+    @property
+    def value(self):
+        if len(self.window) < self.period:
+            return np.nan
+        return self.total / self.period
+
+
+class StreamingRSI:
+    def __init__(self, period=14):
+        self.prev_close = None
+        self.gain = StreamingSMA(period)
+        self.loss = StreamingSMA(period)
+
+    def _split(self, close):
+        # Первое приращение у pandas равно NaN и превращается в 0 в where()
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return float(100 - (100 / (1 + rs)))
+
+    def update(self, close):
+        """Добавление закрытой свечи"""
+        gain, loss = self._split(close)
+        self.prev_close = close
+        return self._rsi(self.gain.update(gain), self.loss.update(loss))
+
+    def peek(self, close):
+        """RSI с учетом незакрытой свечи"""
+        gain, loss = self._split(close)
+        return self._rsi(self.gain.peek(gain), self.loss.peek(loss))
+
+
+class StreamingEMA:
+    def __init__(self, span):
+        # Рекурсивная форма ewm(span, adjust=True): числитель и знаменатель весов
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+
+    def update(self, value):
+        """Добавление нового значения"""
+        self.numerator = value + self.decay * self.numerator
+        self.denominator = 1 + self.decay * self.denominator
+        return self.numerator / self.denominator
+
+    def peek(self, value):
+        """Значение EMA без изменения состояния"""
+        return (value + self.decay * self.numerator) / (1 + self.decay * self.denominator)
+
+
+class StreamingMACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    @staticmethod
+    def _result(macd_line, signal_line):
+        return {'macd': macd_line, 'signal': signal_line, 'histogram': macd_line - signal_line}
+
+    def update(self, close):
+        """Добавление закрытой свечи"""
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        return self._result(macd_line, self.signal.update(macd_line))
+
+    def peek(self, close):
+        """MACD с учетом незакрытой свечи"""
+        macd_line = self.fast.peek(close) - self.slow.peek(close)
+        return self._result(macd_line, self.signal.peek(macd_line))
+
+
+class IndicatorState:
+    """
+    Состояние всех индикаторов стратегии для одной пары.
+    Закрытые свечи добавляются через update(), текущая (незакрытая) свеча
+    учитывается через snapshot() без изменения состояния.
+    """
+    def __init__(self, ma_periods, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9):
+        self.ma = {period: StreamingSMA(period) for period in ma_periods}
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self.last_timestamp = None
+        self.count = 0
+
+    def update(self, close, timestamp=None):
+        """Добавление закрытой свечи"""
+        for sma_state in self.ma.values():
+            sma_state.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.last_timestamp = timestamp
+        self.count += 1
+
+    def snapshot(self, close):
+        """Значения индикаторов с учетом текущей цены"""
+        return {
+            'ma_values': {f'ma_{period}': sma_state.peek(close) for period, sma_state in self.ma.items()},
+            'rsi': self.rsi.peek(close),
+            'macd': self.macd.peek(close),
+        }
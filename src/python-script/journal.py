@@ -0,0 +1,339 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from order_execution import (CLIENT_ID_PREFIX, ORDER_CANCEL, ORDER_FILL, ROLE_ENTRY, ROLE_EXIT, ROLE_STOP, ROLE_TAKE,
+                             OrderExecutor)
+
+# Журнал состояния позиций и ордеров.
+# Каждое изменение позиции дописывается событием в SQLite (режим WAL).
+# Записи копятся в памяти и фиксируются пачками; открытие и закрытие позиции
+# фиксируются сразу, как и создание и исполнение ордеров. Каждая фиксация
+# сбрасывается на диск (synchronous=FULL), поэтому эти события переживают сбой питания.
+# При сбое теряются только отмены ордеров, еще не зафиксированные пачкой:
+# не старше JOURNAL_FLUSH_INTERVAL или конца текущего цикла.
+# Периодический снимок состояния позволяет при перезапуске читать только снимок
+# и хвост журнала после него.
+# Если бот упал после входа, но до записи об открытии позиции, позиция
+# восстанавливается по событиям ее ордеров (вход, stop-loss, take-profit).
+
+EVENT_OPEN = 'open'
+EVENT_CLOSE = 'close'
+EVENT_ORDER = 'order'
+
+# Причины закрытия позиции защитным ордером на бирже
+REASON_STOP_LOSS = 'STOP_LOSS'
+REASON_TAKE_PROFIT = 'TAKE_PROFIT'
+
+_ORDER_FIELDS = ('id', 'clientOrderId', 'symbol', 'type', 'side', 'amount', 'price',
+                 'stopPrice', 'status', 'filled', 'average')
+_ORDER_KEYS = ('entry_order', 'stop_order', 'limit_order')
+_INACTIVE_STATUSES = ('canceled', 'rejected', 'expired')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+"""
+
+
+def _compact_order(order):
+    if not order:
+        return None
+    return {key: order.get(key) for key in _ORDER_FIELDS if order.get(key) is not None}
+
+
+def serialize_position(position):
+    """
+    Позиция бота в JSON-совместимом виде (ордера - только ключевые поля)
+    """
+    data = {}
+    for key, value in position.items():
+        if key in _ORDER_KEYS:
+            data[key] = _compact_order(value)
+        elif isinstance(value, datetime):
+            data[key] = value.isoformat()
+        else:
+            data[key] = value
+    return data
+
+
+def recover_position(orders, ts):
+    """
+    Позиция по журналу ордеров одной операции {роль: ордер}, если вход исполнен
+    """
+    entry, stop, take = orders.get(ROLE_ENTRY), orders.get(ROLE_STOP), orders.get(ROLE_TAKE)
+    entry_price = entry and (entry.get('average') or entry.get('price'))
+    if not entry or not entry.get('filled') or not entry_price:
+        return None
+    return {
+        'entry_order': entry,
+        'stop_order': stop,
+        'limit_order': take,
+        'entry_price': entry_price,
+        'stop_loss': stop and stop.get('stopPrice'),
+        'take_profit': take and take.get('price'),
+        'size': entry['filled'],
+        'nonce': orders['nonce'],
+        'timestamp': datetime.fromtimestamp(ts / 1000),
+        'regime': None,
+    }
+
+
+def deserialize_position(data):
+    position = dict(data)
+    if isinstance(position.get('timestamp'), str):
+        position['timestamp'] = datetime.fromisoformat(position['timestamp'])
+    return position
+
+
+class TradeJournal:
+    def __init__(self, path, batch_size=50, flush_interval=1.0, snapshot_every=1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # fsync на каждой фиксации: с NORMAL в режиме WAL последние транзакции
+        # могут пропасть при сбое питания до контрольной точки
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(_SCHEMA)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+
+    # --- Запись ---
+
+    def record(self, event, symbol, data, durable=False):
+        """
+        Добавление события. durable - зафиксировать немедленно вместе с накопленными.
+        """
+        with self._lock:
+            self._pending.append((int(time.time() * 1000), event, symbol, json.dumps(data, default=str)))
+            due = (durable or len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def record_open(self, symbol, position):
+        self.record(EVENT_OPEN, symbol, serialize_position(position), durable=True)
+
+    def record_close(self, symbol, reason, order=None):
+        self.record(EVENT_CLOSE, symbol, {'reason': reason, 'order': _compact_order(order)}, durable=True)
+
+    def record_order(self, symbol, action, order):
+        """
+        Создание, исполнение или отмена ордера (action: ORDER_CREATE, ORDER_FILL, ORDER_CANCEL).
+        Создание и исполнение фиксируются сразу: по ним восстанавливается позиция,
+        если бот упал до record_open.
+        """
+        self.record(EVENT_ORDER, symbol, {'action': action, 'order': _compact_order(order)},
+                    durable=action != ORDER_CANCEL)
+
+    def flush(self):
+        """
+        Фиксация накопленных событий одной транзакцией
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return 0
+            with self._conn:
+                self._conn.executemany('INSERT INTO events (ts, event, symbol, data) VALUES (?, ?, ?, ?)', pending)
+            self._since_snapshot += len(pending)
+        return len(pending)
+
+    def snapshot(self, positions):
+        """
+        Снимок текущих позиций. События до снимка больше не нужны и удаляются.
+        """
+        self.flush()
+        state = json.dumps({symbol: serialize_position(p) for symbol, p in positions.items()}, default=str)
+        with self._lock, self._conn:
+            seq = self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+            self._conn.execute('INSERT OR REPLACE INTO snapshots (seq, ts, state) VALUES (?, ?, ?)',
+                               (seq, int(time.time() * 1000), state))
+            self._conn.execute('DELETE FROM events WHERE seq <= ?', (seq,))
+            self._conn.execute('DELETE FROM snapshots WHERE seq < ?', (seq,))
+            self._since_snapshot = 0
+
+    def maybe_snapshot(self, positions):
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot(positions)
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # --- Восстановление ---
+
+    def load_state(self):
+        """
+        Позиции из последнего снимка и событий после него
+        """
+        self.flush()
+        with self._lock:
+            row = self._conn.execute('SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1').fetchone()
+            seq, state = (row[0], json.loads(row[1])) if row else (0, {})
+            events = self._conn.execute(
+                'SELECT ts, event, symbol, data FROM events WHERE seq > ? ORDER BY seq', (seq,)
+            ).fetchall()
+
+        positions = {symbol: deserialize_position(data) for symbol, data in state.items()}
+        # Ордера входа без записи об открытии позиции: пара -> (время, {роль: ордер, 'nonce': ...})
+        unopened = {}
+        for ts, event, symbol, data in events:
+            data = json.loads(data)
+            if event == EVENT_OPEN:
+                positions[symbol] = deserialize_position(data)
+                unopened.pop(symbol, None)
+            elif event == EVENT_CLOSE:
+                positions.pop(symbol, None)
+                unopened.pop(symbol, None)
+            elif event == EVENT_ORDER and symbol in positions:
+                order = data.get('order') or {}
+                for key in _ORDER_KEYS:
+                    current = positions[symbol].get(key)
+                    if current and current.get('id') == order.get('id'):
+                        positions[symbol][key] = order
+            elif event == EVENT_ORDER:
+                order = data.get('order') or {}
+                parsed = OrderExecutor.parse_client_order_id(order.get('clientOrderId'))
+                if not parsed:
+                    continue
+                role, nonce = parsed
+                if role == ROLE_ENTRY:
+                    unopened[symbol] = (ts, {'nonce': nonce, ROLE_ENTRY: order})
+                elif role == ROLE_EXIT:
+                    unopened.pop(symbol, None)
+                elif role in (ROLE_STOP, ROLE_TAKE) and symbol in unopened and unopened[symbol][1]['nonce'] == nonce:
+                    unopened[symbol][1][role] = order
+
+        for symbol, (ts, orders) in unopened.items():
+            position = recover_position(orders, ts)
+            if position:
+                logging.warning(f"Позиция {symbol} восстановлена по ордерам: запись об открытии не успела сохраниться")
+                positions[symbol] = position
+        self._since_snapshot = len(events)
+        return positions
+
+
+def fetch_open_orders_bulk(exchange, symbols, pool=None):
+    """
+    Все открытые ордера одним запросом; если биржа требует пару -
+    по одному запросу на пару (параллельно, если передан пул потоков)
+    """
+    try:
+        return exchange.fetch_open_orders()
+    except Exception as e:
+        logging.debug(f"Общий запрос открытых ордеров недоступен: {e}")
+
+    symbols = list(symbols)
+    if pool:
+        results = list(pool.map(exchange.fetch_open_orders, symbols))
+    else:
+        results = [exchange.fetch_open_orders(symbol) for symbol in symbols]
+    return [order for orders in results for order in orders]
+
+
+def bracket_exit_reason(position, order):
+    """
+    Причина закрытия по исполненному защитному ордеру
+    """
+    stop_order = position.get('stop_order') or {}
+    return REASON_STOP_LOSS if order.get('id') == stop_order.get('id') else REASON_TAKE_PROFIT
+
+
+def check_brackets(positions, exchange, executor, open_orders, journal=None):
+    """
+    Позиции, закрытые на бирже защитным ордером.
+    Защитные ордера, которых нет среди открытых, запрашиваются у биржи:
+    - ордер исполнен -> второй ордер отменяется, позиция удаляется из positions;
+    - ордер отменен -> позиция остается, в лог пишется предупреждение (один раз).
+    Возвращает {пара: (позиция, исполненный ордер, причина)}.
+    """
+    open_ids = {order['id'] for order in open_orders}
+    closed = {}
+    for symbol, position in list(positions.items()):
+        protective = [position.get('stop_order'), position.get('limit_order')]
+        inactive = {}
+        filled = None
+        for key in _ORDER_KEYS[1:]:
+            order = position.get(key)
+            if (not order or not order.get('id') or order['id'] in open_ids
+                    or order.get('status') in _INACTIVE_STATUSES):
+                continue
+            try:
+                current = exchange.fetch_order(order['id'], symbol)
+            except Exception as e:
+                logging.warning(f"Не удалось проверить ордер {order['id']} ({symbol}): {e}")
+                continue
+            status = current.get('status')
+            if status == 'open':
+                continue
+            if journal:
+                journal.record_order(symbol, ORDER_FILL if status == 'closed' else ORDER_CANCEL,
+                                     dict(order, status=status))
+            if status == 'closed':
+                filled = current
+                break
+            inactive[order['id']] = status
+            position[key] = dict(order, status=status)
+
+        if filled:
+            executor.cancel_orders(
+                symbol, [o for o in protective if o and o.get('id') != filled.get('id') and o.get('id') in open_ids]
+            )
+            closed[symbol] = (positions.pop(symbol), filled, bracket_exit_reason(position, filled))
+        elif inactive:
+            logging.warning(f"Позиция {symbol} без защитных ордеров: {inactive}")
+    return closed
+
+
+def reconcile_positions(positions, exchange, executor, symbols, journal=None, client_prefix=CLIENT_ID_PREFIX,
+                        owned_symbols=None):
+    """
+    Сверка восстановленных позиций с биржей.
+    - позиции, закрытые защитным ордером, пока бот был остановлен, удаляются (check_brackets);
+    - открытые ордера бота, не относящиеся ни к одной позиции, отменяются
+      (только по парам owned_symbols, если аккаунт делят несколько процессов).
+    Возвращает (позиции, {закрытая пара: (позиция, исполненный защитный ордер, причина)}).
+    """
+    open_orders = fetch_open_orders_bulk(exchange, set(symbols) | set(positions), executor.pool)
+    known_ids = {
+        position[key]['id'] for position in positions.values()
+        for key in _ORDER_KEYS[1:] if position.get(key) and position[key].get('id')
+    }
+    closed = check_brackets(positions, exchange, executor, open_orders, journal)
+
+    orphans = {}
+    for order in open_orders:
+        client_id = order.get('clientOrderId') or ''
+        if owned_symbols is not None and order['symbol'] not in owned_symbols:
+            continue
+        if order['id'] not in known_ids and client_id.startswith(client_prefix):
+            orphans.setdefault(order['symbol'], []).append(order)
+    for symbol, orders in orphans.items():
+        logging.warning(f"Отмена {len(orders)} осиротевших ордеров {symbol}")
+        executor.cancel_orders(symbol, orders)
+
+    return positions, closed
@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import TradingConfig
+from metrics import metrics
+from trade_store import to_ms
+
+# Живое состояние бота для панели: сигналы и индикаторы по парам, позиции, баланс.
+# Торговый цикл только записывает последнее значение ключа с номером версии
+# (словарь под короткой блокировкой, без сериализации и сетевых вызовов).
+# Рассылку ведет отдельный поток: раз в LIVE_MIN_INTERVAL он собирает ключи,
+# изменившиеся с прошлой рассылки, один раз кодирует их в событие SSE и будит
+# потоки клиентов. Несколько обновлений ключа между рассылками схлопываются
+# в последнее значение. Клиент, отставший или запросивший больший интервал,
+# получает один diff от своей последней версии.
+#
+# GET /api/live?symbols=&interval=    поток text/event-stream
+#   event: snapshot - полное состояние (при подключении или после перезапуска бота)
+#   event: diff     - {"version", "set": {раздел: {ключ: значение}}, "del": {раздел: [ключи]}}
+# id события - "<эпоха>:<версия>": браузер передает его в Last-Event-ID при
+# переподключении и получает только пропущенные изменения. Эпоха своя у каждого
+# процесса бота, поэтому после перезапуска (версия снова с нуля) клиент получает snapshot.
+
+SECTION_SYMBOLS = 'symbols'
+SECTION_POSITIONS = 'positions'
+SECTION_BALANCE = 'balance'
+
+# Разделы, ключ которых - торговая пара (к ним применяется фильтр ?symbols=)
+SYMBOL_SECTIONS = (SECTION_SYMBOLS, SECTION_POSITIONS)
+
+KEEPALIVE_INTERVAL = 15
+
+
+def position_view(symbol, position, price):
+    """
+    Позиция в виде для панели по последней известной цене
+    """
+    entry_price = position['entry_price']
+    return {
+        'symbol': symbol,
+        'amount': position['size'],
+        'entry_price': entry_price,
+        'price': price,
+        'value': position['size'] * price,
+        'change': (price - entry_price) / entry_price * 100,
+        'stop_loss': position.get('stop_loss'),
+        'take_profit': position.get('take_profit'),
+        'timestamp': to_ms(position.get('timestamp')),
+    }
+
+
+def finite(value):
+    """
+    Копия значения, где NaN и бесконечности заменены на None (JSON.parse их не принимает)
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite(item) for item in value]
+    return value
+
+
+def event_id(epoch, version):
+    return f"{epoch}:{version}"
+
+
+def parse_event_id(value, epoch):
+    """
+    Версия из Last-Event-ID или None, если id от другого процесса бота или некорректен
+    """
+    event_epoch, _, version = (value or '').partition(':')
+    if event_epoch != epoch or not version.isdigit():
+        return None
+    return int(version)
+
+
+def encode_event(event, epoch, version, changes):
+    payload = dict(changes, version=version)
+    try:
+        body = json.dumps(payload, separators=(',', ':'), default=str, allow_nan=False)
+    except ValueError:
+        # Индикаторы на короткой истории бывают NaN - кодируются как null
+        body = json.dumps(finite(payload), separators=(',', ':'), default=str, allow_nan=False)
+    return f"id: {event_id(epoch, version)}\nevent: {event}\ndata: {body}\n\n".encode()
+
+
+class LiveState:
+    """
+    Последние значения по разделам и ключам с монотонной версией
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (раздел, ключ) -> (версия, значение); последний измененный ключ в конце
+        self._entries = OrderedDict()
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:12]
+
+    def update(self, section, key, value):
+        """
+        Новое значение ключа (None - удаление). Равное текущему значение пропускается.
+        Переданный объект не должен изменяться после вызова.
+        """
+        entry_key = (section, key)
+        with self._lock:
+            current = self._entries.get(entry_key)
+            if current is not None and current[1] == value:
+                return
+            self.version += 1
+            self._entries[entry_key] = (self.version, value)
+            self._entries.move_to_end(entry_key)
+
+    def remove(self, section, key):
+        self.update(section, key, None)
+
+    def get(self, section, key):
+        entry = self._entries.get((section, key))
+        return entry[1] if entry else None
+
+    def changes(self, since=0, symbols=None):
+        """
+        Изменения после версии since: (версия, {'set': {...}, 'del': {...}}).
+        Просматриваются только измененные ключи (с конца упорядоченного словаря).
+        """
+        with self._lock:
+            version = self.version
+            changed = []
+            for entry_key in reversed(self._entries):
+                entry_version, value = self._entries[entry_key]
+                if entry_version <= since:
+                    break
+                changed.append((entry_key, value))
+        updates, removed = {}, {}
+        for (section, key), value in changed:
+            if symbols is not None and section in SYMBOL_SECTIONS and key not in symbols:
+                continue
+            if value is not None:
+                updates.setdefault(section, {})[key] = value
+            elif since:
+                removed.setdefault(section, []).append(key)
+        return version, {'set': updates, 'del': removed}
+
+
+class LiveClient:
+    def __init__(self, version, symbols=None, interval=0.0):
+        self.version = version
+        self.symbols = symbols
+        self.interval = interval
+        self.next_send = 0.0
+        self.wake = threading.Event()
+
+
+class LiveStream:
+    """
+    Подписчики SSE и общая рассылка изменений LiveState
+    """
+
+    def __init__(self, state, interval=None, max_clients=None, keepalive=KEEPALIVE_INTERVAL):
+        self.state = state
+        self.interval = TradingConfig.LIVE_MIN_INTERVAL if interval is None else interval
+        self.max_clients = TradingConfig.LIVE_MAX_CLIENTS if max_clients is None else max_clients
+        self.keepalive = keepalive
+        self._clients = set()
+        self._lock = threading.Lock()
+        # Последняя общая рассылка: (версия начала, версия конца, закодированное событие)
+        self._frame = (0, 0, b'')
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def start(self):
+        if self._thread is None:
+            self._frame = (self.state.version, self.state.version, b'')
+            self._thread = threading.Thread(target=self._run, name='live-stream', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        for client in list(self._clients):
+            client.wake.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.broadcast()
+            except Exception as e:
+                logging.error(f"Ошибка рассылки состояния панели: {e}")
+
+    def broadcast(self):
+        """
+        Один diff с прошлой рассылки для всех клиентов без фильтра
+        """
+        since = self._frame[1]
+        if self.state.version == since:
+            return
+        version, changes = self.state.changes(since)
+        self._frame = (since, version, encode_event('diff', self.state.epoch, version, changes))
+        for client in list(self._clients):
+            client.wake.set()
+
+    def next_event(self, client):
+        """
+        Событие для клиента: общее, если клиент успевает за рассылкой, иначе свой diff.
+        Общее событие может повторить уже отправленные ключи - значения в нем не старее.
+        """
+        since, version, data = self._frame
+        if client.version >= version:
+            return None
+        if client.symbols is None and since <= client.version:
+            client.version = version
+            return data
+        version, changes = self.state.changes(client.version, client.symbols)
+        client.version = version
+        if not changes['set'] and not changes['del']:
+            return None
+        return encode_event('diff', self.state.epoch, version, changes)
+
+    def serve(self, write, last_event_id=None, symbols=None, interval=None):
+        """
+        Отправка потока клиенту до разрыва соединения или остановки.
+        write - запись байтов в соединение (исключение OSError - клиент отключился);
+        last_event_id - заголовок Last-Event-ID переподключившегося клиента.
+        Возвращает False, если достигнут предел LIVE_MAX_CLIENTS.
+        """
+        with self._lock:
+            if self.max_clients and len(self._clients) >= self.max_clients:
+                return False
+            client = LiveClient(0, set(symbols) if symbols else None, max(interval or 0.0, self.interval))
+            self._clients.add(client)
+            metrics.set_gauge('live_clients', len(self._clients))
+        try:
+            # Переподключение к тому же процессу - только пропущенные изменения
+            last_version = parse_event_id(last_event_id, self.state.epoch)
+            resume = last_version is not None and last_version <= self.state.version
+            client.version = last_version if resume else 0
+            version, changes = self.state.changes(client.version, client.symbols)
+            client.version = version
+            write(encode_event('diff' if resume else 'snapshot', self.state.epoch, version, changes))
+            client.next_send = time.monotonic() + client.interval
+            while not self._stopped.is_set():
+                if not client.wake.wait(self.keepalive):
+                    write(b': keepalive\n\n')
+                    continue
+                client.wake.clear()
+                delay = client.next_send - time.monotonic()
+                if delay > 0 and self._stopped.wait(delay):
+                    break
+                data = self.next_event(client)
+                if data:
+                    write(data)
+                    metrics.inc('live_events_total')
+                    metrics.inc('live_bytes_total', len(data))
+                    client.next_send = time.monotonic() + client.interval
+            return True
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+                metrics.set_gauge('live_clients', len(self._clients))
@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+import time
+
+from config import TradingConfig
+
+# Кэш рынков биржи на диске.
+# load_markets MEXC - несколько мегабайт JSON по сети при каждом запуске.
+# Рынки и валюты сохраняются в файл и подставляются в новый клиент ccxt
+# без запроса, пока файл не старше MARKETS_CACHE_TTL.
+
+
+def _fresh(path, ttl):
+    return bool(path) and os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl
+
+
+def apply_cached_markets(exchange, path=None, ttl=None):
+    """
+    Подстановка рынков из файла (синхронный или асинхронный клиент).
+    Возвращает True, если кэш свежий и рынки подставлены.
+    """
+    path = TradingConfig.MARKETS_CACHE_PATH if path is None else path
+    ttl = TradingConfig.MARKETS_CACHE_TTL if ttl is None else ttl
+    if not _fresh(path, ttl):
+        return False
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+        return True
+    except Exception as e:
+        logging.warning(f"Кэш рынков {path} не прочитан: {e}")
+        return False
+
+
+def save_markets(exchange, path=None):
+    path = TradingConfig.MARKETS_CACHE_PATH if path is None else path
+    if not path or not exchange.markets:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Запись через временный файл: параллельный запуск не прочитает половину файла
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'markets': exchange.markets, 'currencies': exchange.currencies}, f, default=str)
+    os.replace(tmp, path)
+
+
+def load_markets(exchange, path=None, ttl=None, reload=False):
+    """
+    Рынки синхронного клиента: из файла, если он свежий, иначе с биржи с записью в файл
+    """
+    if not reload and (exchange.markets or apply_cached_markets(exchange, path, ttl)):
+        return exchange.markets
+    markets = exchange.load_markets(reload)
+    try:
+        save_markets(exchange, path)
+    except OSError as e:
+        logging.warning(f"Кэш рынков не сохранен: {e}")
+    return markets
@@ -0,0 +1,235 @@
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Метрики производительности торгового цикла.
+# Гистограммы времени по этапам, счетчики по парам и запросам к бирже.
+# Доступны через HTTP в текстовом формате Prometheus и периодической строкой в логе.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Оценка квантиля по границам корзин"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + inner + '}'
+
+
+class Metrics:
+    def __init__(self, prefix='mexc_bot'):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """
+        Замер времени этапа торгового цикла
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    @asynccontextmanager
+    async def async_timer(self, stage, **labels):
+        """
+        Замер времени этапа в асинхронном коде
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def render_prometheus(self):
+        """
+        Все метрики в текстовом формате Prometheus
+        """
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = labels + (('le', bound),)
+                    lines.append(f"{self.prefix}_{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                inf_labels = labels + (('le', '+Inf'),)
+                lines.append(f"{self.prefix}_{name}_bucket{_format_labels(inf_labels)} {histogram.count}")
+                lines.append(f"{self.prefix}_{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{self.prefix}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        Краткая сводка по этапам: количество, среднее и p95 (мс)
+        """
+        parts = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name != 'stage_seconds' or histogram.count == 0:
+                    continue
+                stage = dict(labels).get('stage')
+                avg_ms = histogram.sum / histogram.count * 1000
+                p95_ms = histogram.quantile(0.95) * 1000
+                parts.append(f"{stage}: n={histogram.count} avg={avg_ms:.1f}ms p95<={p95_ms:.0f}ms")
+            requests = sum(v for (name, _), v in self.counters.items() if name == 'exchange_requests_total')
+            waits = [h for (name, _), h in self.histograms.items() if name == 'rate_limit_wait_seconds']
+        wait_total = sum(h.sum for h in waits)
+        parts.append(f"запросов к бирже={requests}, ожидание лимитов={wait_total:.2f}s")
+        return '; '.join(parts)
+
+    @property
+    def serving(self):
+        return self._server is not None
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """
+        Запуск HTTP-эндпоинта /metrics в фоновом потоке
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"Метрики доступны на http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def start_summary_logger(self, interval):
+        """
+        Периодический вывод сводки метрик в лог
+        """
+        def loop():
+            while True:
+                time.sleep(interval)
+                logging.info(f"[METRICS] {self.summary()}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+# Общий реестр метрик процесса
+metrics = Metrics()
+
+
+def _timed(original, on_done):
+    if asyncio.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = None
+            try:
+                return await original(*args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                on_done(time.perf_counter() - start, args, error)
+        return async_wrapper
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        error = None
+        try:
+            return original(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            on_done(time.perf_counter() - start, args, error)
+    return wrapper
+
+
+def instrument_exchange(exchange, registry=None):
+    """
+    Подсчет запросов к бирже по эндпоинтам, их длительности, ошибок
+    и времени ожидания встроенного ограничителя запросов ccxt
+    """
+    registry = registry or metrics
+
+    def on_request(elapsed, args, error):
+        endpoint = args[0] if args else 'unknown'
+        registry.inc('exchange_requests_total', endpoint=endpoint)
+        registry.observe('exchange_request_seconds', elapsed, endpoint=endpoint)
+        if error is not None:
+            registry.inc('exchange_errors_total', endpoint=endpoint, error=type(error).__name__)
+
+    def on_throttle(elapsed, args, error):
+        registry.observe('rate_limit_wait_seconds', elapsed)
+
+    exchange.fetch2 = _timed(exchange.fetch2, on_request)
+    exchange.throttle = _timed(exchange.throttle, on_throttle)
+    return exchange
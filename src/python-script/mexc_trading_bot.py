@@ -7,46 +7,83 @@ import pandas as pd
 import numpy as np
 import time
 import json
+import asyncio
 from datetime import datetime
 import logging
-from config import TradingConfig
+from config import TradingConfig, configure_logging
+from utils import TradingUtils, RiskManager
+from backtest import ohlcv_to_arrays, run_backtest, data_version
+from indicators import IndicatorState, IndicatorCache, IndicatorSeries, SIGNAL_DTYPE, analyze_batch
+from candle_store import CandleStore
+from candle_series import CandleSeries, candle_timestamps
+from resample import Resampler, base_history_limit
+from account_state import AccountState
+from metrics import metrics, instrument_exchange
+from order_execution import OrderExecutor
+from journal import (TradeJournal, reconcile_positions, check_brackets, fetch_open_orders_bulk,
+                     REASON_STOP_LOSS, REASON_TAKE_PROFIT)
+from portfolio_risk import PortfolioRiskEngine
+from trade_store import TradeStore, position_trade, order_time
+from scheduler import RequestScheduler, install_scheduler, lane, LANE_POSITION
+from market_cache import apply_cached_markets, load_markets
+from live_state import LiveState, position_view, SECTION_SYMBOLS, SECTION_POSITIONS, SECTION_BALANCE
 
-# Настройка логирования
-logging.basicConfig(
-    level=getattr(logging, TradingConfig.LOG_LEVEL),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(TradingConfig.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Роль исполнения в хранилище сделок по причине закрытия позиции
+EXIT_FILL_ROLES = {REASON_STOP_LOSS: 'stop', REASON_TAKE_PROFIT: 'take'}
 
 class MexcTrendBot:
-    def __init__(self, api_key=None, secret_key=None, sandbox=None):
+    def __init__(self, api_key=None, secret_key=None, sandbox=None, exchange=None, persist=True):
         """
-        Инициализация бота с параметрами из .env файла
+        Инициализация бота с параметрами из .env файла.
+        exchange - готовый клиент биржи (симулятор, заглушка для бенчмарков);
+        в этом случае API ключи не требуются.
+        persist=False - без журнала, хранилища сделок и локального кэша свечей
+        (симулятор и бенчмарки не создают и не открывают файлы живого бота).
         """
+        configure_logging()
+        
         # Использование конфигурации из .env файла
         self.api_key = api_key or TradingConfig.API_KEY
         self.secret_key = secret_key or TradingConfig.SECRET_KEY
         self.sandbox = sandbox if sandbox is not None else TradingConfig.SANDBOX_MODE
         
-        # Проверка наличия API ключей
-        if not self.api_key or not self.secret_key:
-            raise ValueError("API ключи не найдены! Проверьте .env файл")
-        
-        self.exchange = ccxt.mexc({
-            'apiKey': self.api_key,
-            'secret': self.secret_key,
-            'sandbox': self.sandbox,
-            'enableRateLimit': True,
-        })
+        self.scheduler = None
+        if exchange is not None:
+            self.exchange = exchange
+        else:
+            # Проверка наличия API ключей
+            if not self.api_key or not self.secret_key:
+                raise ValueError("API ключи не найдены! Проверьте .env файл")
+            
+            self.exchange = ccxt.mexc({
+                'apiKey': self.api_key,
+                'secret': self.secret_key,
+                'sandbox': self.sandbox,
+                'enableRateLimit': True,
+            })
+            # Рынки из файла вместо загрузки с биржи при каждом запуске
+            apply_cached_markets(self.exchange)
+            # Приоритетная очередь запросов: ордера не ждут загрузки свечей
+            if TradingConfig.SCHEDULER_ENABLED:
+                self.scheduler = RequestScheduler.for_exchange(self.exchange)
+                install_scheduler(self.exchange, self.scheduler)
+            instrument_exchange(self.exchange)
+        self.executor = OrderExecutor(self.exchange)
         
         # Параметры стратегии
         self.risk_per_trade = TradingConfig.RISK_PER_TRADE
         self.stop_loss_pct = TradingConfig.STOP_LOSS_PCT
         self.take_profit_pct = TradingConfig.TAKE_PROFIT_PCT
         
+        # Риск портфеля: лимит позиций, суммарный риск и корреляция с открытыми позициями
+        self.risk_manager = RiskManager(self.risk_per_trade, TradingConfig.MAX_TOTAL_RISK)
+        self.risk_engine = PortfolioRiskEngine(
+            self.risk_manager, TradingConfig.MAX_OPEN_POSITIONS,
+            TradingConfig.MAX_CORRELATION, TradingConfig.CORRELATION_WINDOW
+        )
+        
         # Параметры индикаторов
         self.ma_short = TradingConfig.MA_SHORT_PERIOD
         self.ma_medium = TradingConfig.MA_MEDIUM_PERIOD
@@ -54,16 +91,90 @@ class MexcTrendBot:
         self.rsi_period = TradingConfig.RSI_PERIOD
         self.rsi_oversold = TradingConfig.RSI_OVERSOLD
         self.rsi_overbought = TradingConfig.RSI_OVERBOUGHT
+        self.macd_fast = TradingConfig.MACD_FAST
+        self.macd_slow = TradingConfig.MACD_SLOW
+        self.macd_signal = TradingConfig.MACD_SIGNAL
         
         # Торгуемые пары
         self.symbols = TradingConfig.TRADING_PAIRS
         
+        # Пары, ордера которых принадлежат только этому боту (None - все пары аккаунта).
+        # Задается супервизором, когда один аккаунт делят несколько процессов.
+        self.owned_symbols = None
+        
         # Активные позиции
         self.positions = {}
         
+        # Потоковое состояние индикаторов по парам
+        self.indicator_states = {}
+        
+        # Свечи по парам в кольцевых буферах (symbol, timeframe) -> CandleSeries
+        self.candle_series = {}
+        
+        # Старшие таймфреймы, собираемые из свечей TIMEFRAME
+        base_ms = TradingUtils.timeframe_to_ms(TradingConfig.TIMEFRAME)
+        self.higher_timeframes = []
+        for timeframe in TradingConfig.HIGHER_TIMEFRAMES:
+            timeframe_ms = TradingUtils.timeframe_to_ms(timeframe)
+            if timeframe_ms > base_ms and timeframe_ms % base_ms == 0:
+                self.higher_timeframes.append(timeframe)
+            else:
+                logging.warning(f"Таймфрейм {timeframe} не кратен {TradingConfig.TIMEFRAME} и пропущен")
+        self.resamplers = {}
+        
+        # Кэш рассчитанных индикаторов
+        self.indicator_cache = IndicatorCache(TradingConfig.INDICATOR_CACHE_MB * 1024 * 1024)
+        
+        # Кэш баланса аккаунта
+        self.account = AccountState(self.exchange)
+        
+        # Локальное хранилище свечей
+        self.candle_store = None
+        if persist and TradingConfig.CANDLE_CACHE_DIR:
+            self.candle_store = CandleStore(TradingConfig.CANDLE_CACHE_DIR)
+        
+        # Журнал позиций и ордеров для восстановления после перезапуска
+        self.journal = None
+        if persist and TradingConfig.JOURNAL_PATH:
+            self.journal = TradeJournal(
+                TradingConfig.JOURNAL_PATH, TradingConfig.JOURNAL_BATCH_SIZE,
+                TradingConfig.JOURNAL_FLUSH_INTERVAL, TradingConfig.JOURNAL_SNAPSHOT_EVERY
+            )
+        self.executor.journal = self.journal
+        
+        # Исполнения и закрытые сделки для аналитики и панели
+        self.trade_store = None
+        if persist and TradingConfig.TRADE_STORE_PATH:
+            self.trade_store = TradeStore(TradingConfig.TRADE_STORE_PATH)
+        self.api_server = None
+        
+        # Живое состояние для панели (поток /api/live), только при включенном API
+        self.live = LiveState() if TradingConfig.API_PORT else None
+        
+        # Сканер рынка (периодически обновляет self.symbols)
+        self.scanner = None
+        if TradingConfig.SCANNER_ENABLED:
+            from scanner import MarketScanner
+            self.scanner = MarketScanner(self)
+        
+        # Часы и пауза основного цикла (симулятор подменяет их своим временем)
+        self.now = datetime.now
+        self.sleep = time.sleep
+        self.running = False
+        
         logging.info(f"Бот инициализирован. Режим: {'SANDBOX' if self.sandbox else 'LIVE'}")
         logging.info(f"Торгуемые пары: {', '.join(self.symbols)}")
         
+    def fetch_candles(self, symbol, timeframe, limit, since=None):
+        """
+        Загрузка свечей с биржи или через локальное хранилище
+        """
+        with metrics.timer('fetch_ohlcv'):
+            if self.candle_store:
+                # Запрашиваются только свечи новее последней сохраненной
+                return self.candle_store.sync(self.exchange, symbol, timeframe, limit)
+            return self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+    
     def get_historical_data(self, symbol, timeframe=None, limit=None):
         """
         Получение исторических данных
@@ -72,27 +183,87 @@ class MexcTrendBot:
         limit = limit or TradingConfig.HISTORICAL_PERIODS
         
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            return self.candles_to_dataframe(self.fetch_candles(symbol, timeframe, limit))
+        except Exception as e:
+            logging.error(f"Ошибка получения данных для {symbol}: {e}")
+            return None
+    
+    def get_candle_series(self, symbol, timeframe=None, limit=None):
+        """
+        Последние свечи пары в кольцевом буфере CandleSeries.
+        После первой загрузки запрашиваются только свечи начиная с последней известной.
+        """
+        timeframe = timeframe or TradingConfig.TIMEFRAME
+        limit = limit or TradingConfig.HISTORICAL_PERIODS
+        key = (symbol, timeframe)
+        
+        try:
+            series = self.candle_series.get(key)
+            if series is None or series.capacity < limit:
+                series = self.candle_series[key] = CandleSeries(limit)
+            
+            since = series.last_timestamp
+            candles = self.fetch_candles(symbol, timeframe, limit, since)
+            if since is not None and not self.candle_store:
+                first = candles[0][0] if len(candles) else None
+                if first != since or len(candles) >= limit:
+                    # Разрыв в данных - загружаем окно заново
+                    series.clear()
+                    candles = self.fetch_candles(symbol, timeframe, limit)
+            series.extend(candles)
+            return series
         except Exception as e:
             logging.error(f"Ошибка получения данных для {symbol}: {e}")
             return None
     
-    def calculate_ma(self, df, periods):
+    @staticmethod
+    def candles_to_dataframe(candles):
+        """
+        Преобразование свечей (список ccxt или массив хранилища) в DataFrame
+        """
+        with metrics.timer('dataframe'):
+            if isinstance(candles, np.ndarray) and candles.dtype.names:
+                df = pd.DataFrame(candles)
+            else:
+                df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+    
+    def indicator_series(self, df, symbol, timeframe=None):
+        """
+        Ряд индикаторов по свечам (DataFrame или CandleSeries) с кэшированием в indicator_cache.
+        Версия данных - количество свечей, время и цена закрытия последней свечи.
+        """
+        timeframe = timeframe or TradingConfig.TIMEFRAME
+        closes = np.asarray(df['close'], dtype=np.float64)
+        version = (len(df), int(candle_timestamps(df)[-1]), float(closes[-1]))
+        return self.indicator_cache.series(closes, symbol, timeframe, version)
+    
+    def calculate_ma(self, df, periods, symbol=None, timeframe=None):
         """
         Расчет скользящих средних
         """
+        if symbol:
+            series = self.indicator_series(df, symbol, timeframe)
+            return {f'ma_{period}': series.sma(period)[-1] for period in periods}
+        if isinstance(df, CandleSeries):
+            series = IndicatorSeries(df)
+            return {f'ma_{period}': series.sma(period)[-1] for period in periods}
+        
         return {
             f'ma_{period}': df['close'].rolling(window=period).mean().iloc[-1]
             for period in periods
         }
     
-    def calculate_rsi(self, df, period=14):
+    def calculate_rsi(self, df, period=14, symbol=None, timeframe=None):
         """
         Расчет RSI
         """
+        if symbol:
+            return self.indicator_series(df, symbol, timeframe).rsi(period)[-1]
+        if isinstance(df, CandleSeries):
+            return IndicatorSeries(df).rsi(period)[-1]
+        
         delta = df['close'].diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
@@ -100,10 +271,17 @@ class MexcTrendBot:
         rsi = 100 - (100 / (1 + rs))
         return rsi.iloc[-1]
     
-    def calculate_macd(self, df, fast=12, slow=26, signal=9):
+    def calculate_macd(self, df, fast=12, slow=26, signal=9, symbol=None, timeframe=None):
         """
         Расчет MACD
         """
+        if symbol:
+            macd_line, signal_line, histogram = self.indicator_series(df, symbol, timeframe).macd(fast, slow, signal)
+            return {'macd': macd_line[-1], 'signal': signal_line[-1], 'histogram': histogram[-1]}
+        if isinstance(df, CandleSeries):
+            macd_line, signal_line, histogram = IndicatorSeries(df).macd(fast, slow, signal)
+            return {'macd': macd_line[-1], 'signal': signal_line[-1], 'histogram': histogram[-1]}
+        
         ema_fast = df['close'].ewm(span=fast).mean()
         ema_slow = df['close'].ewm(span=slow).mean()
         macd_line = ema_fast - ema_slow
@@ -116,25 +294,72 @@ class MexcTrendBot:
             'histogram': histogram.iloc[-1]
         }
     
+    def update_indicator_state(self, symbol, df):
+        """
+        Инкрементальное обновление индикаторов по новым закрытым свечам.
+        Последняя свеча считается незакрытой и учитывается без сохранения в состоянии.
+        Возвращает значения индикаторов, совпадающие с calculate_ma / calculate_rsi /
+        calculate_macd по всей накопленной истории.
+        """
+        timestamps = candle_timestamps(df)
+        closes = np.asarray(df['close'], dtype=np.float64)
+        
+        state = self.indicator_states.get(symbol)
+        if state is None or state.last_timestamp < timestamps[0]:
+            # Первый запуск или разрыв в данных - заполняем состояние заново
+            state = IndicatorState(
+                [self.ma_short, self.ma_medium, self.ma_long],
+                self.rsi_period, self.macd_fast, self.macd_slow, self.macd_signal
+            )
+            self.indicator_states[symbol] = state
+            start = 0
+        else:
+            start = int(timestamps[:-1].searchsorted(state.last_timestamp, side='right'))
+        
+        for i in range(start, len(closes) - 1):
+            state.update(float(closes[i]), timestamps[i])
+        
+        return state.snapshot(float(closes[-1]))
+    
     def analyze_trend(self, symbol):
         """
         Анализ тренда для конкретной пары
         """
-        df = self.get_historical_data(symbol)
+        candles = self.get_candle_series(symbol, limit=self.base_history_limit())
+        return self.analyze_candles(symbol, candles)
+    
+    def analyze_candles(self, symbol, candles):
+        """
+        Анализ по свечам базового таймфрейма с подтверждением на старших (если заданы)
+        """
+        analysis = self.analyze_dataframe(symbol, candles)
+        if analysis and self.higher_timeframes:
+            with metrics.timer('timeframes'):
+                analysis['timeframes'] = self.analyze_timeframes(symbol, candles, analysis)
+            if TradingConfig.MTF_CONFIRMATION:
+                self.apply_confirmation(analysis)
+        return analysis
+    
+    def analyze_dataframe(self, symbol, df):
+        """
+        Анализ тренда по уже загруженным свечам (DataFrame или CandleSeries)
+        """
         if df is None or len(df) < self.ma_long:
             return None
         
-        current_price = df['close'].iloc[-1]
-        
-        # Скользящие средние
-        ma_values = self.calculate_ma(df, [self.ma_short, self.ma_medium, self.ma_long])
-        
-        # RSI
-        rsi = self.calculate_rsi(df)
-        
-        # MACD
-        macd_data = self.calculate_macd(df)
+        current_price = np.asarray(df['close'])[-1]
         
+        # Скользящие средние, RSI и MACD (инкрементально)
+        with metrics.timer('indicators'):
+            indicators = self.update_indicator_state(symbol, df)
+        self.risk_engine.update_returns(symbol, df)
+        metrics.inc('symbol_analyses_total', symbol=symbol)
+        return self.score_analysis(symbol, current_price, indicators['ma_values'], indicators['rsi'], indicators['macd'])
+    
+    def score_analysis(self, symbol, current_price, ma_values, rsi, macd_data):
+        """
+        Тренд и баллы сигналов по значениям индикаторов
+        """
         # Определение тренда
         ma_trend = "UPTREND" if (ma_values[f'ma_{self.ma_short}'] > ma_values[f'ma_{self.ma_medium}'] > ma_values[f'ma_{self.ma_long}']) else \
                   "DOWNTREND" if (ma_values[f'ma_{self.ma_short}'] < ma_values[f'ma_{self.ma_medium}'] < ma_values[f'ma_{self.ma_long}']) else \
@@ -144,14 +369,14 @@ class MexcTrendBot:
         buy_signals = [
             ma_trend == "UPTREND",
             current_price > ma_values[f'ma_{self.ma_short}'],
-            rsi < 70,  # Не перекупленность
+            rsi < self.rsi_overbought,  # Не перекупленность
             macd_data['macd'] > macd_data['signal']  # MACD бычий сигнал
         ]
         
         sell_signals = [
             ma_trend == "DOWNTREND",
             current_price < ma_values[f'ma_{self.ma_short}'],
-            rsi > 30,  # Не перепроданность
+            rsi > self.rsi_oversold,  # Не перепроданность
             macd_data['macd'] < macd_data['signal']  # MACD медвежий сигнал
         ]
         
@@ -167,12 +392,114 @@ class MexcTrendBot:
             'signal': 'BUY' if sum(buy_signals) >= 3 else 'SELL' if sum(sell_signals) >= 3 else 'HOLD'
         }
     
-    def get_balance(self):
+    def base_history_limit(self):
+        """
+        Количество свечей базового таймфрейма, достаточное и для старших таймфреймов
+        """
+        return base_history_limit(TradingConfig.TIMEFRAME, self.higher_timeframes, TradingConfig.HISTORICAL_PERIODS)
+    
+    def get_timeframe_series(self, symbol, timeframe, candles):
+        """
+        Свечи старшего таймфрейма, собранные из базовых свечей.
+        История загружается с биржи один раз (и после разрыва в данных),
+        дальше свечи обновляются локально.
+        """
+        key = (symbol, timeframe)
+        resampler = self.resamplers.get(key)
+        if resampler is None:
+            resampler = self.resamplers[key] = Resampler(timeframe, TradingConfig.HISTORICAL_PERIODS)
+        if resampler.needs_seed(candles):
+            try:
+                resampler.seed(self.fetch_candles(symbol, timeframe, TradingConfig.HISTORICAL_PERIODS))
+            except Exception as e:
+                logging.error(f"Ошибка получения данных {symbol} {timeframe}: {e}")
+        return resampler.update(candles)
+    
+    def analyze_timeframe(self, symbol, timeframe, candles):
+        """
+        Тренд и баллы сигналов на одном таймфрейме (индикаторы из indicator_cache)
+        """
+        if len(candles) < self.ma_long:
+            return None
+        ma_values = self.calculate_ma(candles, [self.ma_short, self.ma_medium, self.ma_long], symbol, timeframe)
+        rsi = self.calculate_rsi(candles, self.rsi_period, symbol, timeframe)
+        macd_data = self.calculate_macd(candles, self.macd_fast, self.macd_slow, self.macd_signal, symbol, timeframe)
+        analysis = self.score_analysis(symbol, candles['close'][-1], ma_values, rsi, macd_data)
+        return {key: analysis[key] for key in ('trend', 'rsi', 'buy_score', 'sell_score', 'signal')}
+    
+    def analyze_timeframes(self, symbol, candles, analysis):
+        """
+        Тренд и баллы по базовому и всем старшим таймфреймам
+        """
+        result = {
+            TradingConfig.TIMEFRAME: {key: analysis[key] for key in ('trend', 'rsi', 'buy_score', 'sell_score', 'signal')}
+        }
+        for timeframe in self.higher_timeframes:
+            result[timeframe] = self.analyze_timeframe(
+                symbol, timeframe, self.get_timeframe_series(symbol, timeframe, candles)
+            )
+        return result
+    
+    def apply_confirmation(self, analysis):
+        """
+        Подтверждение сигнала старшими таймфреймами: BUY отменяется при нисходящем
+        тренде на любом из них, SELL - при восходящем
+        """
+        trends = [tf['trend'] for tf in list(analysis['timeframes'].values())[1:] if tf]
+        if analysis['signal'] == 'BUY' and 'DOWNTREND' in trends:
+            analysis['signal'] = 'HOLD'
+        elif analysis['signal'] == 'SELL' and 'UPTREND' in trends:
+            analysis['signal'] = 'HOLD'
+        return analysis
+    
+    def strategy_params(self):
+        """
+        Текущие параметры индикаторов бота в формате TradingConfig.strategy_params()
+        """
+        params = TradingConfig.strategy_params()
+        params.update({
+            'ma_short': self.ma_short,
+            'ma_medium': self.ma_medium,
+            'ma_long': self.ma_long,
+            'rsi_period': self.rsi_period,
+            'rsi_oversold': self.rsi_oversold,
+            'rsi_overbought': self.rsi_overbought,
+            'macd_fast': self.macd_fast,
+            'macd_slow': self.macd_slow,
+            'macd_signal': self.macd_signal,
+        })
+        return params
+    
+    def analyze_batch(self, symbols=None, closes=None):
+        """
+        Пакетный анализ нескольких пар за один векторный проход.
+        Если матрица closes (пары x бары) не передана, данные загружаются с биржи
+        и выравниваются по последним общим барам.
+        Возвращает (список пар, массив сигналов SIGNAL_DTYPE).
+        """
+        symbols = list(symbols or self.symbols)
+        
+        if closes is None:
+            series = {}
+            for symbol in symbols:
+                candles = self.get_candle_series(symbol)
+                if candles is not None and len(candles) >= self.ma_long:
+                    series[symbol] = candles.close
+            if not series:
+                return [], np.empty(0, dtype=SIGNAL_DTYPE)
+            symbols = list(series)
+            bars = min(len(values) for values in series.values())
+            closes = np.vstack([values[-bars:] for values in series.values()])
+        
+        return symbols, analyze_batch(closes, self.strategy_params())
+    
+    def get_balance(self, force=False):
         """
-        Получение баланса аккаунта
+        Получение баланса аккаунта (из кэша, если он не устарел)
         """
         try:
-            balance = self.exchange.fetch_balance()
+            balance = self.account.get_balance(force)
+            self.publish_balance(balance)
             return balance
         except Exception as e:
             logging.error(f"Ошибка получения баланса: {e}")
@@ -206,35 +533,39 @@ class MexcTrendBot:
                 logging.warning(f"Недостаточно средств для покупки {symbol}")
                 return None
             
-            # Размещение рыночного ордера
-            order = self.exchange.create_market_buy_order(symbol, position_size)
-            
-            # Размещение ордеров stop-loss и take-profit
-            stop_loss_price = current_price * (1 - self.stop_loss_pct)
-            take_profit_price = current_price * (1 + self.take_profit_pct)
-            
-            stop_order = self.exchange.create_order(
-                symbol, 'market', 'sell', position_size, None,
-                None, None, {'stopPrice': stop_loss_price}
+            # Проверка риска портфеля до отправки ордера
+            allowed, reason, risk = self.risk_engine.check(
+                symbol, position_size, current_price, current_price * (1 - self.stop_loss_pct),
+                self.get_balance()['USDT']['free'], self.positions
             )
+            if not allowed:
+                logging.info(f"Покупка {symbol} отклонена риск-менеджером: {reason}")
+                metrics.inc('risk_rejections_total', symbol=symbol, reason=reason)
+                return None
             
-            limit_order = self.exchange.create_limit_sell_order(
-                symbol, position_size, take_profit_price
+            # Рыночный ордер, затем stop-loss и take-profit одновременно после исполнения
+            bracket = self.executor.open_bracket(
+                symbol, position_size, self.stop_loss_pct, self.take_profit_pct, current_price
             )
+            order = bracket['entry_order']
+            if not bracket['size']:
+                self.account.invalidate()
+                logging.warning(f"Покупка {symbol} не исполнена, позиция не открыта")
+                return None
+            self.account.on_order(symbol, 'buy', order, bracket['size'], bracket['entry_price'])
             
             # Сохранение информации о позиции
-            self.positions[symbol] = {
-                'entry_order': order,
-                'stop_order': stop_order,
-                'limit_order': limit_order,
-                'entry_price': current_price,
-                'stop_loss': stop_loss_price,
-                'take_profit': take_profit_price,
-                'size': position_size,
-                'timestamp': datetime.now()
-            }
+            self.positions[symbol] = dict(bracket, timestamp=self.now(), risk=risk, regime=analysis.get('trend'))
+            self.publish_position(symbol, current_price)
+            if self.journal:
+                self.journal.record_open(symbol, self.positions[symbol])
+            if self.trade_store:
+                self.trade_store.record_fill(symbol, 'entry', order, self.now())
+            
+            if bracket['stop_order'] is None or bracket['limit_order'] is None:
+                logging.error(f"Позиция {symbol} открыта без полной защиты stop-loss/take-profit")
             
-            logging.info(f"Покупка {symbol}: {position_size} по цене {current_price}")
+            logging.info(f"Покупка {symbol}: {bracket['size']} по цене {bracket['entry_price']}")
             return order
             
         except Exception as e:
@@ -252,114 +583,483 @@ class MexcTrendBot:
             
             position = self.positions[symbol]
             
-            # Отмена существующих ордеров
-            try:
-                self.exchange.cancel_order(position['stop_order']['id'], symbol)
-                self.exchange.cancel_order(position['limit_order']['id'], symbol)
-            except:
-                pass
-            
-            # Размещение рыночного ордера на продажу
-            order = self.exchange.create_market_sell_order(symbol, position['size'])
+            # Отмена защитных ордеров и рыночная продажа
+            order = self.executor.close_bracket(symbol, position)
+            self.account.on_order(symbol, 'sell', order)
             
             logging.info(f"Продажа {symbol}: {position['size']}")
             del self.positions[symbol]
+            self.publish_position(symbol)
+            if self.journal:
+                self.journal.record_close(symbol, 'SELL_SIGNAL', order)
+            self.record_trade(symbol, position, order, 'SELL_SIGNAL')
             return order
             
         except Exception as e:
             logging.error(f"Ошибка размещения ордера на продажу {symbol}: {e}")
             return None
     
+    def strategy_symbols(self):
+        """
+        Пары цикла анализа: сначала открытые позиции (в том числе вне списка пар),
+        чтобы проверка корреляции входа видела их доходности по последней свече
+        """
+        return list(self.positions) + [symbol for symbol in self.symbols if symbol not in self.positions]
+    
     def check_and_execute_strategy(self):
         """
         Проверка сигналов и выполнение стратегии
         """
-        for symbol in self.symbols:
+        for symbol in self.strategy_symbols():
             try:
                 analysis = self.analyze_trend(symbol)
-                if not analysis:
+                if not analysis or symbol not in self.symbols:
                     continue
                 
-                signal = analysis['signal']
-                logging.info(f"{symbol}: Цена={analysis['current_price']:.2f}, Тренд={analysis['trend']}, Сигнал={signal}")
-                
-                # Логика торговли
-                if signal == 'BUY' and symbol not in self.positions:
-                    # Дополнительная проверка RSI для избежания покупки в перекупленности
-                    if analysis['rsi'] < self.rsi_overbought:
-                        self.place_buy_order(symbol, analysis)
-                
-                elif signal == 'SELL' and symbol in self.positions:
-                    # Дополнительная проверка RSI для избежания продажи в перепроданности
-                    if analysis['rsi'] > self.rsi_oversold:
-                        self.place_sell_order(symbol)
+                self.execute_signal(symbol, analysis)
                 
             except Exception as e:
                 logging.error(f"Ошибка анализа {symbol}: {e}")
     
+    def execute_signal(self, symbol, analysis):
+        """
+        Исполнение сигнала по результату анализа пары
+        """
+        signal = analysis['signal']
+        logging.info(f"{symbol}: Цена={analysis['current_price']:.2f}, Тренд={analysis['trend']}, Сигнал={signal}")
+        metrics.inc('signals_total', symbol=symbol, signal=signal)
+        self.publish_analysis(symbol, analysis)
+        
+        # Логика торговли
+        if signal == 'BUY' and symbol not in self.positions:
+            # Дополнительная проверка RSI для избежания покупки в перекупленности
+            if analysis['rsi'] < self.rsi_overbought:
+                with metrics.timer('place_buy_order'):
+                    self.place_buy_order(symbol, analysis)
+        
+        elif signal == 'SELL' and symbol in self.positions:
+            # Дополнительная проверка RSI для избежания продажи в перепроданности
+            if analysis['rsi'] > self.rsi_oversold:
+                with metrics.timer('place_sell_order'):
+                    self.place_sell_order(symbol)
+    
+    def check_brackets(self):
+        """
+        Позиции, закрытые на бирже stop-loss или take-profit: сделка записывается
+        со временем и ценой исполнения защитного ордера, позиция освобождается
+        """
+        if not self.positions:
+            return {}
+        try:
+            with metrics.timer('check_brackets'), lane(LANE_POSITION):
+                open_orders = fetch_open_orders_bulk(self.exchange, list(self.positions), self.executor.pool)
+                closed = check_brackets(self.positions, self.exchange, self.executor, open_orders, self.journal)
+        except Exception as e:
+            logging.error(f"Ошибка проверки защитных ордеров: {e}")
+            return {}
+        if closed:
+            # Исполнение защитного ордера снимает резерв на бирже, которого нет в локальном
+            # балансе: вместо локального пересчета следующий запрос идет на биржу
+            self.account.invalidate()
+        for symbol, (position, order, reason) in closed.items():
+            if self.journal:
+                self.journal.record_close(symbol, reason, order)
+            self.record_trade(symbol, position, order, reason)
+            self.publish_position(symbol)
+            metrics.inc('bracket_exits_total', symbol=symbol, reason=reason)
+            logging.info(f"Позиция {symbol} закрыта на бирже: {reason} по цене {order.get('average') or order.get('price')}")
+        return closed
+    
     def monitor_positions(self):
         """
         Мониторинг открытых позиций
         """
         for symbol, position in list(self.positions.items()):
             try:
-                current_price = self.exchange.fetch_ticker(symbol)['last']
-                entry_price = position['entry_price']
-                
-                # Проверка времени удержания позиции
-                hold_time = datetime.now() - position['timestamp']
-                
-                # Логирование статуса позиции
-                pnl_pct = ((current_price - entry_price) / entry_price) * 100
-                logging.info(f"Позиция {symbol}: P&L={pnl_pct:.2f}%, Время={hold_time}")
+                with metrics.timer('fetch_ticker'), lane(LANE_POSITION):
+                    current_price = self.exchange.fetch_ticker(symbol)['last']
+                self.log_position(symbol, position, current_price)
                 
             except Exception as e:
                 logging.error(f"Ошибка мониторинга позиции {symbol}: {e}")
     
+    def log_position(self, symbol, position, current_price):
+        """
+        Логирование статуса позиции по текущей цене
+        """
+        entry_price = position['entry_price']
+        
+        # Проверка времени удержания позиции
+        hold_time = self.now() - position['timestamp']
+        
+        # Логирование статуса позиции
+        pnl_pct = ((current_price - entry_price) / entry_price) * 100
+        logging.info(f"Позиция {symbol}: P&L={pnl_pct:.2f}%, Время={hold_time}")
+        self.publish_position(symbol, current_price)
+    
+    def publish_analysis(self, symbol, analysis):
+        """
+        Сигнал и индикаторы пары в живое состояние панели
+        """
+        if self.live is None:
+            return
+        price = float(analysis['current_price'])
+        periods = (self.ma_short, self.ma_medium, self.ma_long)
+        view = {
+            'price': price,
+            'trend': analysis['trend'],
+            'signal': analysis['signal'],
+            'buy_score': int(analysis['buy_score']),
+            'sell_score': int(analysis['sell_score']),
+            'rsi': float(analysis['rsi']),
+            'ma_periods': periods,
+            'ma': [float(analysis['ma_values'][f'ma_{period}']) for period in periods],
+            'macd': float(analysis['macd']['macd']),
+            'macd_signal': float(analysis['macd']['signal']),
+        }
+        # Изменение цены и оборот в USDT за 24 часа по свечам в памяти
+        series = self.candle_series.get((symbol, TradingConfig.TIMEFRAME))
+        if series is not None and len(series):
+            timestamps, closes = series.timestamp, series.close
+            start = int(np.searchsorted(timestamps, timestamps[-1] - DAY_MS, side='right'))
+            base = closes[start - 1] if start else closes[0]
+            view['change_24h'] = float((price / base - 1) * 100) if base else 0.0
+            view['volume_24h'] = float(np.dot(series.volume[start:], closes[start:]))
+        self.live.update(SECTION_SYMBOLS, symbol, view)
+        if symbol in self.positions:
+            self.publish_position(symbol, price)
+    
+    def publish_position(self, symbol, price=None):
+        """
+        Позиция пары в живое состояние панели (закрытая позиция удаляется)
+        """
+        if self.live is None:
+            return
+        position = self.positions.get(symbol)
+        if position is None:
+            self.live.remove(SECTION_POSITIONS, symbol)
+        else:
+            price = float(position['entry_price'] if price is None else price)
+            self.live.update(SECTION_POSITIONS, symbol, position_view(symbol, position, price))
+    
+    def publish_balance(self, balance):
+        """
+        Баланс USDT в живое состояние панели
+        """
+        if self.live is None or not balance:
+            return
+        usdt = balance.get('USDT') or {}
+        self.live.update(SECTION_BALANCE, 'USDT', {
+            key: float(usdt.get(key) or 0.0) for key in ('free', 'used', 'total')
+        })
+    
+    def load_markets(self):
+        """
+        Рынки биржи из кэша на диске или с биржи (с сохранением в кэш).
+        Для подмененных клиентов (симулятор, заглушки) ничего не делает.
+        """
+        if not isinstance(self.exchange, ccxt.Exchange):
+            return
+        try:
+            load_markets(self.exchange)
+        except Exception as e:
+            logging.error(f"Ошибка загрузки рынков: {e}")
+    
     def run_bot(self):
         """
         Основной цикл работы бота
         """
         logging.info("Запуск торгового бота...")
+        self.load_markets()
+        self.start_metrics()
+        self.restore_state()
+        self.running = True
         
-        while True:
+        while self.running:
             try:
-                # Проверка и выполнение стратегии
-                self.check_and_execute_strategy()
-                
-                # Мониторинг позиций
-                self.monitor_positions()
-                
-                # Вывод статистики портфеля
-                balance = self.get_balance()
-                if balance:
-                    usdt_balance = balance.get('USDT', {}).get('free', 0)
-                    logging.info(f"Баланс USDT: {usdt_balance:.2f}")
+                with metrics.timer('cycle'):
+                    # Обновление списка пар сканером рынка
+                    if self.scanner:
+                        self.scanner.maybe_refresh()
+                    
+                    # Позиции, закрытые на бирже stop-loss / take-profit
+                    self.check_brackets()
+                    
+                    # Проверка и выполнение стратегии
+                    self.check_and_execute_strategy()
+                    
+                    # Мониторинг позиций
+                    self.monitor_positions()
+                    
+                    # Вывод статистики портфеля
+                    balance = self.get_balance()
+                    if balance:
+                        usdt_balance = balance.get('USDT', {}).get('free', 0)
+                        logging.info(f"Баланс USDT: {usdt_balance:.2f}")
+                metrics.set_gauge('open_positions', len(self.positions))
+                self.save_state()
                 
                 # Пауза между итерациями
-                time.sleep(TradingConfig.CHECK_INTERVAL)
+                self.sleep(TradingConfig.CHECK_INTERVAL)
                 
             except KeyboardInterrupt:
                 logging.info("Остановка бота...")
                 break
             except Exception as e:
                 logging.error(f"Ошибка в основном цикле: {e}")
-                time.sleep(30)
+                self.sleep(30)
+        self.running = False
+        self.save_state(snapshot=True)
+    
+    def restore_state(self):
+        """
+        Восстановление позиций из журнала и сверка с открытыми ордерами на бирже
+        """
+        if not self.journal:
+            return
+        started = time.monotonic()
+        positions = self.journal.load_state()
+        try:
+            positions, closed = reconcile_positions(
+                positions, self.exchange, self.executor, self.symbols, self.journal,
+                owned_symbols=self.owned_symbols
+            )
+            for symbol, (position, order, reason) in closed.items():
+                self.journal.record_close(symbol, reason, order)
+                self.record_trade(symbol, position, order, reason)
+                logging.info(f"Позиция {symbol} закрыта на бирже ({reason}), пока бот был остановлен")
+        except Exception as e:
+            logging.error(f"Ошибка сверки позиций с биржей: {e}")
+        # Позиции, восстановленные по ордерам, приходят без оценки риска
+        unrated = [position for position in positions.values() if 'risk' not in position]
+        balance = self.get_balance() if unrated else None
+        for position in unrated if balance else ():
+            position['risk'] = self.risk_engine.position_risk(
+                position['size'], position['entry_price'], position.get('stop_loss') or 0.0, balance['USDT']['total']
+            )
+        self.positions.update(positions)
+        for symbol in positions:
+            self.publish_position(symbol)
+        self.journal.snapshot(self.positions)
+        logging.info(f"Восстановлено позиций: {len(positions)} за {time.monotonic() - started:.2f}s")
+    
+    def record_trade(self, symbol, position, order, reason):
+        """
+        Запись исполнения закрывающего ордера и закрытой сделки в хранилище.
+        Время закрытия - время исполнения ордера на бирже, если оно известно.
+        """
+        if not self.trade_store or not order:
+            return
+        exit_time = order_time(order) or self.now()
+        try:
+            role = EXIT_FILL_ROLES.get(reason, 'exit')
+            self.trade_store.record_fill(symbol, role, order, exit_time)
+            self.trade_store.record_trade(position_trade(symbol, position, order, reason, exit_time))
+        except Exception as e:
+            logging.error(f"Ошибка записи сделки {symbol}: {e}")
+    
+    def save_state(self, snapshot=False):
+        """
+        Фиксация журнала в конце цикла и периодический снимок позиций
+        """
+        if not self.journal:
+            return
+        try:
+            if snapshot:
+                self.journal.snapshot(self.positions)
+            else:
+                self.journal.flush()
+                self.journal.maybe_snapshot(self.positions)
+        except Exception as e:
+            logging.error(f"Ошибка записи журнала: {e}")
+    
+    def stop(self):
+        """
+        Остановка основного цикла после текущей итерации
+        """
+        self.running = False
+
+    def start_metrics(self):
+        """
+        Запуск HTTP-эндпоинтов метрик и API панели и периодической сводки в логе (если включены)
+        """
+        if TradingConfig.METRICS_PORT and not metrics.serving:
+            try:
+                metrics.start_http_server(TradingConfig.METRICS_PORT)
+            except OSError as e:
+                logging.error(f"Не удалось запустить эндпоинт метрик: {e}")
+        if TradingConfig.METRICS_SUMMARY_INTERVAL and not getattr(self, '_metrics_logger', None):
+            self._metrics_logger = metrics.start_summary_logger(TradingConfig.METRICS_SUMMARY_INTERVAL)
+        if TradingConfig.API_PORT and not self.api_server:
+            from api_server import ApiServer
+            try:
+                self.api_server = ApiServer(self.trade_store, self, self.live)
+                self.api_server.start(TradingConfig.API_PORT, TradingConfig.API_HOST)
+            except OSError as e:
+                self.api_server = None
+                logging.error(f"Не удалось запустить API панели: {e}")
+    
+    def run_bot_async(self, max_concurrency=None):
+        """
+        Основной цикл в асинхронном режиме: все пары анализируются параллельно
+        """
+        from async_runner import AsyncBotRunner
+        
+        self.load_markets()
+        self.restore_state()
+        try:
+            asyncio.run(AsyncBotRunner(self, max_concurrency).run_bot())
+        except KeyboardInterrupt:
+            logging.info("Остановка бота...")
+
+    def run_bot_stream(self, source=None):
+        """
+        Основной цикл в потоковом режиме: анализ по закрытию свечи из WebSocket
+        """
+        from streaming import CcxtProStreamSource, StreamRunner
+        
+        self.load_markets()
+        self.start_metrics()
+        self.restore_state()
+        
+        async def run():
+            stream_source = source or CcxtProStreamSource(self, self.symbols)
+            await StreamRunner(self, stream_source).run()
+        
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            logging.info("Остановка бота...")
+        finally:
+            self.save_state(snapshot=True)
 
 # Класс для backtesting стратегии
 class BacktestEngine:
-    def __init__(self, initial_capital=10000):
+    # Максимальное количество свечей за один запрос к MEXC
+    FETCH_LIMIT = 1000
+    
+    def __init__(self, initial_capital=10000, exchange=None, fee_rate=0.001, params=None, candle_store=None):
+        configure_logging()
         self.initial_capital = initial_capital
         self.capital = initial_capital
         self.trades = []
+        self.fee_rate = fee_rate
+        self.params = params or TradingConfig.strategy_params()
+        if exchange is None:
+            exchange = ccxt.mexc({'enableRateLimit': True})
+            apply_cached_markets(exchange)
+        self.exchange = exchange
+        if candle_store is None and TradingConfig.CANDLE_CACHE_DIR:
+            candle_store = CandleStore(TradingConfig.CANDLE_CACHE_DIR)
+        self.candle_store = candle_store
+        self.indicator_cache = IndicatorCache(TradingConfig.INDICATOR_CACHE_MB * 1024 * 1024)
+    
+    def load_history(self, symbol, timeframe=None, days=30):
+        """
+        Загрузка истории свечей за указанное количество дней (постранично)
+        """
+        timeframe = timeframe or TradingConfig.TIMEFRAME
+        timeframe_ms = TradingUtils.timeframe_to_ms(timeframe)
+        now = self.exchange.milliseconds()
+        since = now - days * 24 * 60 * 60 * 1000
+        
+        if self.candle_store:
+            # Загружаются только отсутствующие в локальном хранилище свечи
+            self.candle_store.backfill(self.exchange, symbol, timeframe, since)
+            records = self.candle_store.load_range(symbol, timeframe, since)
+            return {field: records[field] for field in records.dtype.names}
+        
+        candles = []
+        while since < now:
+            batch = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=self.FETCH_LIMIT)
+            if not batch:
+                break
+            candles.extend(batch)
+            since = batch[-1][0] + timeframe_ms
+        
+        # Последняя свеча еще не закрыта
+        if candles and candles[-1][0] + timeframe_ms > now:
+            candles.pop()
+        return ohlcv_to_arrays(candles)
+        
+    def backtest_strategy(self, symbol, days=30, timeframe=None, data=None, ticks=None):
+        """
+        Бэктестинг стратегии на исторических данных.
+        ticks - тики пары (tick_kernel.TICK_DTYPE) для точного исполнения stop-loss / take-profit
+        """
+        if data is None:
+            data = self.load_history(symbol, timeframe, days)
+        
+        if len(data['close']) < self.params['ma_long']:
+            logging.warning(f"Недостаточно данных для бэктеста {symbol}")
+            return None
+        
+        # Повторные прогоны по тем же данным переиспользуют рассчитанные индикаторы
+        series = self.indicator_cache.series(
+            data['close'], symbol, timeframe or TradingConfig.TIMEFRAME, data_version(data)
+        )
+        trades, stats = run_backtest(data, self.params, self.initial_capital, self.fee_rate, series, ticks)
+        for trade in trades:
+            trade['symbol'] = symbol
         
-    def backtest_strategy(self, symbol, days=30):
+        self.trades.extend(trades)
+        self.capital = stats['final_capital']
+        
+        logging.info(
+            f"Бэктест {symbol}: сделок={stats['total_trades']}, "
+            f"win rate={stats['win_rate']:.1f}%, доходность={stats['return_pct']:.2f}%, "
+            f"просадка={stats['max_drawdown_pct']:.2f}%"
+        )
+        return {'symbol': symbol, 'trades': trades, 'stats': stats}
+    
+    def backtest_all(self, symbols=None, days=30, timeframe=None):
+        """
+        Бэктестинг по всем торгуемым парам
+        """
+        results = {}
+        for symbol in symbols or TradingConfig.TRADING_PAIRS:
+            try:
+                result = self.backtest_strategy(symbol, days, timeframe)
+                if result:
+                    results[symbol] = result
+            except Exception as e:
+                logging.error(f"Ошибка бэктеста {symbol}: {e}")
+        return results
+    
+    def walk_forward(self, symbols=None, train_days=90, test_days=30, combinations=None, days=365,
+                     timeframe=None, step_days=None, workers=None, checkpoint=None, sort_by='return_pct'):
         """
-        Бэктестинг стратегии на исторических данных
+        Walk-forward: подбор параметров на обучающих окнах и проверка на следующих
+        за ними тестовых. Без combinations проверяются текущие параметры.
         """
-        # Здесь будет код для тестирования стратегии на исторических данных
-        # Для полной реализации потребуется больше кода
-        pass
+        from evaluation import walk_forward
+        
+        data = {symbol: self.load_history(symbol, timeframe, days) for symbol in symbols or TradingConfig.TRADING_PAIRS}
+        report = walk_forward(
+            data, combinations or [self.params], train_days, test_days, step_days,
+            self.initial_capital, self.fee_rate, workers, checkpoint, sort_by
+        )
+        if report:
+            stats = report['stats']
+            profit_factor = 'нет убытков' if stats['profit_factor'] is None else f"{stats['profit_factor']:.2f}"
+            logging.info(
+                f"Walk-forward: окон={len(report['windows'])}, сделок={stats['total_trades']}, "
+                f"Шарп={stats['sharpe_ratio']:.2f}, просадка={stats['max_drawdown_pct']:.2f}%, "
+                f"profit factor={profit_factor}"
+            )
+        return report
+    
+    def monte_carlo(self, trades=None, simulations=10000, seed=None, replace=True, workers=None, checkpoint=None):
+        """
+        Распределения доходности и просадки по перестановкам сделок
+        (по умолчанию - сделок последних бэктестов)
+        """
+        from evaluation import monte_carlo
+        
+        return monte_carlo(
+            self.trades if trades is None else trades, simulations, self.initial_capital,
+            seed, replace, workers, checkpoint
+        )
 
 # Пример использования
 if __name__ == "__main__":
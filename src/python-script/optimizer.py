@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Подбор параметров стратегии перебором (сетка или случайный поиск).
+Бэктесты выполняются параллельно на всех ядрах, данные свечей передаются
+процессам через общую память без копирования в каждый процесс.
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from config import TradingConfig
+from backtest import run_backtest, data_version
+from indicators import IndicatorCache
+
+# Пространство поиска по умолчанию
+DEFAULT_SEARCH_SPACE = {
+    'ma_short': [5, 7, 9, 12],
+    'ma_medium': [20, 25, 30],
+    'ma_long': [40, 50, 60, 100],
+    'rsi_period': [10, 14, 21],
+    'rsi_oversold': [25, 30, 35],
+    'rsi_overbought': [65, 70, 75],
+    'macd_fast': [8, 12],
+    'macd_slow': [21, 26],
+    'macd_signal': [9],
+    'stop_loss_pct': [0.02, 0.03, 0.05],
+    'take_profit_pct': [0.04, 0.06, 0.10],
+    'risk_per_trade': [0.01, 0.02],
+}
+
+# Метрики, у которых лучше меньшее значение (сортировка по возрастанию)
+LOWER_IS_BETTER = ('max_drawdown_pct',)
+
+_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Данные, подключенные к общей памяти в процессе-исполнителе
+_worker_data = {}
+_worker_blocks = []
+_worker_settings = {}
+_worker_cache = None
+
+
+def is_valid_combination(params):
+    """
+    Отсев заведомо бессмысленных комбинаций
+    """
+    return (params['ma_short'] < params['ma_medium'] < params['ma_long']
+            and params['macd_fast'] < params['macd_slow']
+            and params['rsi_oversold'] < params['rsi_overbought'])
+
+
+def grid_search_space(space):
+    """
+    Все комбинации параметров пространства поиска
+    """
+    base = TradingConfig.strategy_params()
+    keys = list(space)
+    for values in itertools.product(*(space[key] for key in keys)):
+        params = dict(base, **dict(zip(keys, values)))
+        if is_valid_combination(params):
+            yield params
+
+
+def random_search_space(space, samples, seed=None):
+    """
+    Случайная выборка комбинаций из пространства поиска
+    """
+    rng = random.Random(seed)
+    base = TradingConfig.strategy_params()
+    seen = set()
+    attempts = 0
+    while len(seen) < samples and attempts < samples * 20:
+        attempts += 1
+        params = dict(base, **{key: rng.choice(values) for key, values in space.items()})
+        key = tuple(sorted(params.items()))
+        if key in seen or not is_valid_combination(params):
+            continue
+        seen.add(key)
+        yield params
+
+
+class SharedCandles:
+    """
+    Свечи нескольких пар в блоках общей памяти (по матрице 6 x N на пару)
+    """
+    def __init__(self, data):
+        self.blocks = []
+        self.descriptors = {}
+        for symbol, arrays in data.items():
+            matrix = np.vstack([np.asarray(arrays[field], dtype=np.float64) for field in _FIELDS])
+            block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+            np.ndarray(matrix.shape, dtype=np.float64, buffer=block.buf)[:] = matrix
+            self.blocks.append(block)
+            self.descriptors[symbol] = (block.name, matrix.shape)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_shared_candles(descriptors):
+    """
+    Подключение к блокам общей памяти без копирования данных
+    """
+    data = {}
+    blocks = []
+    for symbol, (name, shape) in descriptors.items():
+        block = shared_memory.SharedMemory(name=name)
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        data[symbol] = dict(zip(_FIELDS, matrix))
+        blocks.append(block)
+    return data, blocks
+
+
+def _init_worker(descriptors, initial_capital, fee_rate):
+    global _worker_cache
+    _worker_cache = IndicatorCache(TradingConfig.INDICATOR_CACHE_MB * 1024 * 1024)
+    data, blocks = attach_shared_candles(descriptors)
+    _worker_data.update(data)
+    _worker_blocks.extend(blocks)
+    _worker_settings.update(initial_capital=initial_capital, fee_rate=fee_rate)
+
+
+def evaluate_params(params, data, initial_capital, fee_rate, cache=None):
+    """
+    Бэктест одной комбинации параметров по всем парам.
+    cache - IndicatorCache процесса: индикаторы с одинаковыми периодами
+    считаются один раз для всех комбинаций.
+    """
+    returns, drawdowns = [], []
+    total_trades = winning_trades = 0
+    for symbol, arrays in data.items():
+        if len(arrays['close']) < params['ma_long']:
+            continue
+        series = cache.series(arrays['close'], symbol, None, data_version(arrays)) if cache else None
+        _, stats = run_backtest(arrays, params, initial_capital, fee_rate, series)
+        returns.append(stats['return_pct'])
+        drawdowns.append(stats['max_drawdown_pct'])
+        total_trades += stats['total_trades']
+        winning_trades += stats['winning_trades']
+
+    result = dict(params)
+    result.update({
+        'return_pct': float(np.mean(returns)) if returns else 0.0,
+        'max_drawdown_pct': float(np.max(drawdowns)) if drawdowns else 0.0,
+        'total_trades': total_trades,
+        'win_rate': (winning_trades / total_trades * 100) if total_trades else 0.0,
+    })
+    return result
+
+
+def _evaluate_in_worker(params):
+    return evaluate_params(
+        params, _worker_data, _worker_settings['initial_capital'], _worker_settings['fee_rate'], _worker_cache
+    )
+
+
+class ParameterOptimizer:
+    def __init__(self, data, initial_capital=10000, fee_rate=0.001, workers=None):
+        """
+        data - словарь {пара: массивы OHLCV} (формат BacktestEngine.load_history)
+        """
+        self.data = data
+        self.initial_capital = initial_capital
+        self.fee_rate = fee_rate
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, combinations, sort_by='return_pct', ascending=None):
+        """
+        Параллельный прогон всех комбинаций. Возвращает таблицу результатов,
+        отсортированную по sort_by (лучшие первыми, если ascending не задан).
+        """
+        if ascending is None:
+            ascending = sort_by in LOWER_IS_BETTER
+        combinations = list(combinations)
+        if not combinations:
+            return pd.DataFrame()
+        logging.info(f"Оптимизация: {len(combinations)} комбинаций, {self.workers} процессов")
+
+        shared = SharedCandles(self.data)
+        try:
+            chunksize = max(1, len(combinations) // (self.workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(shared.descriptors, self.initial_capital, self.fee_rate)
+            ) as executor:
+                results = list(executor.map(_evaluate_in_worker, combinations, chunksize=chunksize))
+        finally:
+            shared.close()
+
+        table = pd.DataFrame(results).sort_values(sort_by, ascending=ascending)
+        return table.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Подбор параметров стратегии')
+    parser.add_argument('--symbols', default=','.join(TradingConfig.TRADING_PAIRS))
+    parser.add_argument('--timeframe', default=TradingConfig.TIMEFRAME)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random')
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sort-by', default='return_pct')
+    parser.add_argument('--output', default='optimization_results.csv')
+    args = parser.parse_args()
+
+    from mexc_trading_bot import BacktestEngine
+
+    engine = BacktestEngine()
+    data = {
+        symbol: engine.load_history(symbol, args.timeframe, args.days)
+        for symbol in args.symbols.split(',')
+    }
+
+    if args.mode == 'grid':
+        combinations = grid_search_space(DEFAULT_SEARCH_SPACE)
+    else:
+        combinations = random_search_space(DEFAULT_SEARCH_SPACE, args.samples, args.seed)
+
+    table = ParameterOptimizer(data, workers=args.workers).run(combinations, sort_by=args.sort_by)
+    table.to_csv(args.output, index=False)
+    print(table.head(20).to_string())
+    print(f"\nРезультаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
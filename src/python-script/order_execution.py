@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+
+# Исполнение ордеров.
+# Вход в позицию -> подтверждение исполнения -> одновременная отправка stop-loss
+# и take-profit (пакетным запросом, если биржа его поддерживает).
+# Все ордера получают clientOrderId, поэтому повтор после сетевой ошибки
+# не создает дубликат: сначала проверяется, не принят ли ордер биржей.
+# Создание, исполнение и отмена ордеров записываются в журнал (если он задан).
+
+ROLE_ENTRY = 'E'
+ROLE_STOP = 'S'
+ROLE_TAKE = 'T'
+ROLE_EXIT = 'X'
+
+# Префикс clientOrderId всех ордеров бота
+CLIENT_ID_PREFIX = 'tb'
+# Предельная длина clientOrderId на MEXC
+CLIENT_ID_MAX_LENGTH = 32
+
+# События ордеров в журнале
+ORDER_CREATE = 'create'
+ORDER_FILL = 'fill'
+ORDER_CANCEL = 'cancel'
+
+# Статусы ордера, после которых исполненный объем больше не меняется
+FINAL_STATUSES = ('closed', 'canceled', 'rejected', 'expired')
+
+
+class OrderExecutor:
+    def __init__(self, exchange, max_workers=4, fill_timeout=10.0, poll_interval=0.5, retries=2, journal=None):
+        self.exchange = exchange
+        self.journal = journal
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.fill_timeout = fill_timeout
+        self.poll_interval = poll_interval
+        self.retries = retries
+
+    @staticmethod
+    def client_order_id(symbol, role, nonce):
+        """
+        Детерминированный clientOrderId: одинаков для всех повторов одной операции.
+        Если пара не помещается в CLIENT_ID_MAX_LENGTH, вместо нее берется хеш нужной длины:
+        роль и nonce сохраняются целиком, иначе повторы разных операций совпали бы.
+        """
+        nonce = str(nonce)
+        room = CLIENT_ID_MAX_LENGTH - len(CLIENT_ID_PREFIX) - len(role) - len(nonce)
+        if room < 1:
+            raise ValueError(f"nonce {nonce} не помещается в clientOrderId")
+        name = ''.join(char for char in symbol if char.isalnum())
+        if len(name) > room:
+            name = hashlib.blake2b(name.encode(), digest_size=16).hexdigest()[:room]
+        return f"{CLIENT_ID_PREFIX}{name}{role}{nonce}"
+
+    @staticmethod
+    def parse_client_order_id(client_id):
+        """
+        (роль, nonce) из clientOrderId бота или None для чужих ордеров
+        """
+        if not client_id or not client_id.startswith(CLIENT_ID_PREFIX):
+            return None
+        body = client_id.rstrip('0123456789')
+        nonce = client_id[len(body):]
+        if not nonce or len(body) <= len(CLIENT_ID_PREFIX):
+            return None
+        return body[-1], int(nonce)
+
+    def _record(self, symbol, action, order):
+        if not self.journal or not order:
+            return
+        try:
+            self.journal.record_order(symbol, action, order)
+        except Exception as e:
+            logging.error(f"Ошибка записи ордера {order.get('id')} в журнал: {e}")
+
+    def find_order(self, symbol, client_id):
+        """
+        Поиск ранее отправленного ордера по clientOrderId
+        """
+        try:
+            for order in self.exchange.fetch_open_orders(symbol):
+                if order.get('clientOrderId') == client_id:
+                    return order
+            if self.exchange.has.get('fetchClosedOrders'):
+                for order in self.exchange.fetch_closed_orders(symbol, limit=20):
+                    if order.get('clientOrderId') == client_id:
+                        return order
+        except Exception as e:
+            logging.warning(f"Не удалось проверить ордер {client_id}: {e}")
+        return None
+
+    def create_order(self, symbol, order_type, side, amount, price=None, params=None, client_id=None):
+        """
+        Идемпотентное создание ордера
+        """
+        params = dict(params or {})
+        if client_id:
+            params['clientOrderId'] = client_id
+
+        for attempt in range(self.retries + 1):
+            try:
+                order = self.exchange.create_order(symbol, order_type, side, amount, price, params)
+                self._record(symbol, ORDER_CREATE, order)
+                return order
+            except (ccxt.RequestTimeout, ccxt.NetworkError) as e:
+                # Ответ мог потеряться после того, как биржа приняла ордер
+                existing = self.find_order(symbol, client_id) if client_id else None
+                if existing:
+                    self._record(symbol, ORDER_CREATE, existing)
+                    return existing
+                if attempt == self.retries:
+                    raise
+                logging.warning(f"Повтор отправки ордера {client_id or symbol}: {e}")
+
+    def wait_for_fill(self, order, symbol):
+        """
+        Ожидание окончательного статуса ордера (для рыночного ордера обычно мгновенно).
+        Частичное исполнение не останавливает ожидание: объем еще может измениться.
+        """
+        deadline = time.monotonic() + self.fill_timeout
+        while order.get('status') not in FINAL_STATUSES:
+            if time.monotonic() >= deadline or not order.get('id'):
+                break
+            time.sleep(self.poll_interval)
+            try:
+                order = self.exchange.fetch_order(order['id'], symbol)
+            except Exception as e:
+                logging.warning(f"Ошибка проверки исполнения ордера {order.get('id')}: {e}")
+        if order.get('filled'):
+            self._record(symbol, ORDER_FILL, order)
+        return order
+
+    def _protective_requests(self, symbol, amount, stop_price, take_price, nonce):
+        return [
+            {
+                'symbol': symbol, 'type': 'market', 'side': 'sell', 'amount': amount, 'price': None,
+                'params': {
+                    'stopPrice': stop_price,
+                    'clientOrderId': self.client_order_id(symbol, ROLE_STOP, nonce),
+                },
+            },
+            {
+                'symbol': symbol, 'type': 'limit', 'side': 'sell', 'amount': amount, 'price': take_price,
+                'params': {'clientOrderId': self.client_order_id(symbol, ROLE_TAKE, nonce)},
+            },
+        ]
+
+    def place_protective_orders(self, symbol, amount, stop_price, take_price, nonce):
+        """
+        Одновременная отправка stop-loss и take-profit.
+        Возвращает (stop_order, take_order); ордер, который не удалось разместить, равен None.
+        """
+        requests = self._protective_requests(symbol, amount, stop_price, take_price, nonce)
+
+        if self.exchange.has.get('createOrders'):
+            try:
+                results = self.exchange.create_orders(requests)
+            except Exception as e:
+                logging.warning(f"Пакетное размещение ордеров {symbol} не удалось, отправка по отдельности: {e}")
+            else:
+                # Пакетный ответ MEXC содержит ошибку вместо ордера, отклоненного биржей
+                placed = []
+                for request, order in zip(requests, results):
+                    if order and order.get('id'):
+                        self._record(symbol, ORDER_CREATE, order)
+                        placed.append(order)
+                    else:
+                        info = (order or {}).get('info') or {}
+                        logging.error(f"Защитный ордер {request['params']['clientOrderId']} отклонен: "
+                                      f"{info.get('msg') or info}")
+                        placed.append(None)
+                return tuple(placed)
+
+        futures = [
+            self.pool.submit(
+                self.create_order, r['symbol'], r['type'], r['side'], r['amount'], r['price'],
+                r['params'], r['params']['clientOrderId']
+            )
+            for r in requests
+        ]
+        results = []
+        for request, future in zip(requests, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logging.error(f"Ошибка размещения защитного ордера {request['params']['clientOrderId']}: {e}")
+                results.append(None)
+        return tuple(results)
+
+    def open_bracket(self, symbol, amount, stop_pct, take_pct, reference_price, nonce=None):
+        """
+        Рыночный вход и защитные ордера от фактической цены исполнения
+        """
+        nonce = nonce or self.exchange.milliseconds()
+        entry = self.create_order(
+            symbol, 'market', 'buy', amount, client_id=self.client_order_id(symbol, ROLE_ENTRY, nonce)
+        )
+        entry = self.wait_for_fill(entry, symbol)
+        if entry.get('status') not in FINAL_STATUSES and entry.get('id'):
+            # Исполнение не завершилось за fill_timeout: остаток отменяется,
+            # чтобы защищенный объем не разошелся с купленным
+            self.cancel_orders(symbol, [entry])
+            try:
+                entry = self.exchange.fetch_order(entry['id'], symbol)
+            except Exception as e:
+                logging.warning(f"Ошибка проверки исполнения ордера {entry['id']}: {e}")
+
+        # Защищается только подтвержденный биржей объем
+        filled = entry.get('filled') or 0.0
+        entry_price = entry.get('average') or entry.get('price') or reference_price
+        stop_price = entry_price * (1 - stop_pct)
+        take_price = entry_price * (1 + take_pct)
+
+        stop_order = take_order = None
+        if filled > 0:
+            stop_order, take_order = self.place_protective_orders(symbol, filled, stop_price, take_price, nonce)
+        else:
+            logging.error(f"Исполнение входа {symbol} не подтверждено, защитные ордера не выставлены")
+        return {
+            'entry_order': entry,
+            'stop_order': stop_order,
+            'limit_order': take_order,
+            'entry_price': entry_price,
+            'stop_loss': stop_price,
+            'take_profit': take_price,
+            'size': filled,
+            'nonce': nonce,
+        }
+
+    def cancel_orders(self, symbol, orders):
+        """
+        Отмена ордеров пакетом (если поддерживается) или параллельно
+        """
+        orders = [order for order in orders if order and order.get('id')]
+        if not orders:
+            return
+        ids = [order['id'] for order in orders]
+        if len(ids) > 1 and self.exchange.has.get('cancelOrders'):
+            try:
+                self.exchange.cancel_orders(ids, symbol)
+                for order in orders:
+                    self._record(symbol, ORDER_CANCEL, dict(order, status='canceled'))
+                return
+            except Exception as e:
+                logging.warning(f"Пакетная отмена ордеров {symbol} не удалась: {e}")
+
+        futures = [self.pool.submit(self.exchange.cancel_order, order_id, symbol) for order_id in ids]
+        for order, future in zip(orders, futures):
+            try:
+                future.result()
+                self._record(symbol, ORDER_CANCEL, dict(order, status='canceled'))
+            except Exception as e:
+                # Ордер уже исполнен или отменен
+                logging.debug(f"Отмена ордера {order['id']}: {e}")
+
+    def close_bracket(self, symbol, position):
+        """
+        Отмена защитных ордеров и рыночный выход из позиции
+        """
+        self.cancel_orders(symbol, [position.get('stop_order'), position.get('limit_order')])
+        nonce = position.get('nonce') or self.exchange.milliseconds()
+        return self.create_order(
+            symbol, 'market', 'sell', position['size'], client_id=self.client_order_id(symbol, ROLE_EXIT, nonce)
+        )
@@ -0,0 +1,143 @@
+import logging
+
+import numpy as np
+
+from candle_series import candle_timestamps
+from metrics import metrics
+
+# Риск на уровне портфеля перед каждым входом в позицию:
+# лимит количества позиций, суммарный открытый риск (RiskManager.validate_new_position)
+# и корреляция доходностей кандидата с уже открытыми позициями.
+# Доходности хранятся нормированными строками одной матрицы, поэтому корреляция
+# с открытыми позициями - одно матричное умножение без пересчета по истории.
+
+ALLOWED = 'OK'
+REJECT_DUPLICATE = 'ALREADY_OPEN'
+REJECT_MAX_POSITIONS = 'MAX_POSITIONS'
+REJECT_TOTAL_RISK = 'TOTAL_RISK'
+REJECT_CORRELATION = 'CORRELATION'
+REJECT_CORRELATION_UNKNOWN = 'CORRELATION_UNKNOWN'
+
+
+class ReturnsMatrix:
+    """
+    Последние window логарифмических доходностей по парам, центрированные
+    и нормированные к единичной длине: корреляция двух пар - скалярное произведение строк.
+    """
+    def __init__(self, window=50, capacity=16):
+        self.window = window
+        self.rows = np.zeros((capacity, window))
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.stamps = np.zeros(capacity, dtype=np.int64)
+        self.index = {}
+
+    def _row(self, symbol):
+        row = self.index.get(symbol)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.rows):
+                grow = len(self.rows)
+                self.rows = np.vstack([self.rows, np.zeros((grow, self.window))])
+                self.valid = np.concatenate([self.valid, np.zeros(grow, dtype=bool)])
+                self.stamps = np.concatenate([self.stamps, np.zeros(grow, dtype=np.int64)])
+            self.index[symbol] = row
+        return row
+
+    def update(self, symbol, closes, last_timestamp):
+        """
+        Обновление строки пары по закрытым свечам (если время последней свечи изменилось)
+        """
+        row = self._row(symbol)
+        if self.valid[row] and self.stamps[row] == last_timestamp:
+            return
+        closes = np.asarray(closes, dtype=np.float64)[-(self.window + 1):]
+        if len(closes) < self.window + 1 or np.any(closes <= 0):
+            self.valid[row] = False
+            return
+        returns = np.diff(np.log(closes))
+        returns -= returns.mean()
+        norm = np.sqrt(returns @ returns)
+        self.valid[row] = norm > 0
+        self.rows[row] = returns / norm if norm > 0 else 0.0
+        self.stamps[row] = last_timestamp
+
+    def comparable(self, symbol, other):
+        """
+        Строки обеих пар рассчитаны и заканчиваются одной и той же свечой
+        """
+        row, other_row = self.index.get(symbol), self.index.get(other)
+        if row is None or other_row is None:
+            return False
+        return bool(self.valid[row] and self.valid[other_row] and self.stamps[row] == self.stamps[other_row])
+
+    def correlations(self, symbol, others):
+        """
+        Корреляции пары с others: {пара: коэффициент}. Пары без данных
+        или с другим временем последней свечи пропускаются (см. comparable).
+        """
+        others = [s for s in others if s != symbol and self.comparable(symbol, s)]
+        if not others:
+            return {}
+        rows = [self.index[s] for s in others]
+        values = self.rows[rows] @ self.rows[self.index[symbol]]
+        return {s: float(v) for s, v in zip(others, values)}
+
+    def has_returns(self, symbol):
+        row = self.index.get(symbol)
+        return row is not None and bool(self.valid[row])
+
+
+class PortfolioRiskEngine:
+    def __init__(self, risk_manager, max_positions=5, max_correlation=0.8, window=50):
+        self.risk_manager = risk_manager
+        self.max_positions = max_positions
+        self.max_correlation = max_correlation
+        self.returns = ReturnsMatrix(window)
+
+    def update_returns(self, symbol, candles):
+        """
+        Доходности пары по закрытым свечам (последняя свеча считается незакрытой)
+        """
+        if candles is None or len(candles) < 2:
+            return
+        closes = np.asarray(candles['close'])[:-1]
+        self.returns.update(symbol, closes, int(candle_timestamps(candles)[-2]))
+
+    @staticmethod
+    def position_risk(size, entry_price, stop_price, balance):
+        """
+        Риск позиции - возможный убыток при срабатывании stop-loss в долях баланса
+        """
+        if balance <= 0:
+            return float('inf')
+        return round(size * abs(entry_price - stop_price) / balance, 8)
+
+    def open_risk(self, positions):
+        return sum(position.get('risk', 0) for position in positions.values())
+
+    def check(self, symbol, size, entry_price, stop_price, balance, positions):
+        """
+        Проверка входа в позицию. Возвращает (разрешено, причина, риск позиции).
+        """
+        with metrics.timer('risk_check'):
+            risk = self.position_risk(size, entry_price, stop_price, balance)
+            if symbol in positions:
+                return False, REJECT_DUPLICATE, risk
+            if len(positions) >= self.max_positions:
+                return False, REJECT_MAX_POSITIONS, risk
+            if not self.risk_manager.validate_new_position(positions, risk):
+                return False, REJECT_TOTAL_RISK, risk
+            if positions and self.max_correlation < 1 and self.returns.has_returns(symbol):
+                # Открытая позиция без доходностей по той же свече - корреляция неизвестна,
+                # вход откладывается до следующего анализа, а не разрешается без проверки
+                unknown = [held for held in positions if not self.returns.comparable(symbol, held)]
+                if unknown:
+                    logging.warning(f"Нет доходностей {', '.join(unknown)} для проверки корреляции {symbol}")
+                    return False, REJECT_CORRELATION_UNKNOWN, risk
+                correlations = self.returns.correlations(symbol, positions)
+                if correlations:
+                    held, value = max(correlations.items(), key=lambda item: item[1])
+                    if value > self.max_correlation:
+                        logging.info(f"Корреляция {symbol} с {held}: {value:.2f}")
+                        return False, REJECT_CORRELATION, risk
+            return True, ALLOWED, risk
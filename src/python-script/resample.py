@@ -0,0 +1,92 @@
+import numpy as np
+
+from candle_store import CANDLE_DTYPE
+from candle_series import CandleSeries, candle_timestamps
+from utils import TradingUtils
+
+# Пересборка свечей базового таймфрейма в старшие (5m -> 15m / 1h / 4h).
+# С биржи загружается только базовый таймфрейм, старшие обновляются локально
+# и инкрементально: при каждом обновлении пересчитывается лишь текущая
+# (незакрытая) свеча старшего таймфрейма и новые после нее.
+
+
+def resample(timestamps, opens, highs, lows, closes, volumes, timeframe_ms):
+    """
+    Агрегация свечей в свечи длительностью timeframe_ms (массив CANDLE_DTYPE).
+    Время свечи - начало интервала, кратное timeframe_ms.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    keys = timestamps // timeframe_ms
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(keys)) - 1
+
+    records = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    records['timestamp'] = keys[starts] * timeframe_ms
+    records['open'] = np.asarray(opens)[starts]
+    records['high'] = np.maximum.reduceat(np.asarray(highs, dtype=np.float64), starts)
+    records['low'] = np.minimum.reduceat(np.asarray(lows, dtype=np.float64), starts)
+    records['close'] = np.asarray(closes)[ends]
+    records['volume'] = np.add.reduceat(np.asarray(volumes, dtype=np.float64), starts)
+    return records
+
+
+class Resampler:
+    """
+    Инкрементальная пересборка базовых свечей в один старший таймфрейм.
+    Результат хранится в CandleSeries емкостью capacity.
+    """
+    def __init__(self, timeframe, capacity):
+        self.timeframe = timeframe
+        self.timeframe_ms = TradingUtils.timeframe_to_ms(timeframe)
+        self.series = CandleSeries(capacity)
+
+    def needs_seed(self, candles):
+        """
+        Нужна начальная история: ряд пуст или базовые свечи не покрывают
+        начало текущей свечи старшего таймфрейма (разрыв в данных)
+        """
+        if not len(self.series):
+            return True
+        timestamps = candle_timestamps(candles)
+        return len(timestamps) > 0 and timestamps[0] > self.series.last_timestamp
+
+    def seed(self, candles):
+        """
+        Начальная история старшего таймфрейма (например, одна загрузка с биржи)
+        """
+        self.series.clear()
+        self.series.extend(candles)
+
+    def update(self, candles):
+        """
+        Добавление базовых свечей (CandleSeries или DataFrame).
+        Пересобирается свеча, начатая последней, и все более новые.
+        """
+        timestamps = candle_timestamps(candles)
+        if len(timestamps) == 0:
+            return self.series
+
+        start = self.series.last_timestamp
+        if start is None:
+            # Без начальной истории первая неполная свеча отбрасывается
+            start = -(-int(timestamps[0]) // self.timeframe_ms) * self.timeframe_ms
+        lo = int(np.searchsorted(timestamps, start, side='left'))
+        if lo < len(timestamps):
+            self.series.extend(resample(
+                timestamps[lo:],
+                *(np.asarray(candles[field])[lo:] for field in ('open', 'high', 'low', 'close', 'volume')),
+                self.timeframe_ms,
+            ))
+        return self.series
+
+
+def base_history_limit(base_timeframe, timeframes, periods):
+    """
+    Количество базовых свечей, при котором текущая свеча любого старшего
+    таймфрейма целиком покрыта базовыми данными
+    """
+    base_ms = TradingUtils.timeframe_to_ms(base_timeframe)
+    ratios = [TradingUtils.timeframe_to_ms(tf) // base_ms for tf in timeframes]
+    return max([periods] + [ratio + 1 for ratio in ratios])
@@ -0,0 +1,161 @@
+import logging
+import math
+import re
+
+import numpy as np
+
+from config import TradingConfig
+from metrics import metrics
+
+# Сканер рынка.
+# Шаг 1: один запрос fetch_tickers по всем парам биржи и отбор по объему и волатильности.
+# Шаг 2: полный analyze_trend только для короткого списка лучших кандидатов.
+# Свечи загружаются лишь для короткого списка, поэтому полторы тысячи пар
+# обрабатываются за один цикл.
+
+# Токены с плечом (BTC3L, ETH5S) не подходят для трендовой стратегии
+_LEVERAGED_TOKEN = re.compile(r'\d+[LS]$')
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class MarketScanner:
+    def __init__(self, bot, quote=None, min_volume=None, min_volatility=None,
+                 shortlist_size=None, max_symbols=None, interval=None):
+        self.bot = bot
+        self.quote = quote or TradingConfig.SCANNER_QUOTE
+        self.min_volume = TradingConfig.SCANNER_MIN_VOLUME if min_volume is None else min_volume
+        self.min_volatility = TradingConfig.SCANNER_MIN_VOLATILITY if min_volatility is None else min_volatility
+        self.shortlist_size = shortlist_size or TradingConfig.SCANNER_SHORTLIST
+        self.max_symbols = max_symbols or TradingConfig.SCANNER_MAX_SYMBOLS
+        self.interval = TradingConfig.SCANNER_INTERVAL if interval is None else interval
+        self.last_scan = None
+        self.last_ranking = []
+
+    def _tradable(self, symbol):
+        """
+        Спотовая пара с нужной валютой котировки (по рынкам ccxt, если они загружены)
+        """
+        if not symbol.endswith('/' + self.quote):
+            return False
+        if _LEVERAGED_TOKEN.search(symbol.split('/')[0]):
+            return False
+        markets = getattr(self.bot.exchange, 'markets', None)
+        if markets and symbol in markets:
+            market = markets[symbol]
+            return market.get('spot', True) and market.get('active') is not False
+        return True
+
+    def prefilter(self, tickers):
+        """
+        Отбор кандидатов по тикерам: суточный объем в валюте котировки не ниже min_volume,
+        диапазон (high - low) / last в процентах не ниже min_volatility.
+        Возвращает список (пара, объем, волатильность), отсортированный по убыванию
+        волатильность * log10(объем), длиной не больше shortlist_size.
+        """
+        symbols = [symbol for symbol in tickers if self._tradable(symbol)]
+        if not symbols:
+            return []
+
+        fields = np.array([
+            (
+                _number(tickers[s].get('last')),
+                _number(tickers[s].get('high')),
+                _number(tickers[s].get('low')),
+                _number(tickers[s].get('quoteVolume')),
+                _number(tickers[s].get('baseVolume')),
+            )
+            for s in symbols
+        ], dtype=np.float64)
+        last, high, low, quote_volume, base_volume = fields.T
+        volume = np.where(np.isnan(quote_volume), base_volume * last, quote_volume)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = (high - low) / last * 100
+            mask = (last > 0) & (volume >= self.min_volume) & (volatility >= self.min_volatility)
+            score = np.where(mask, volatility * np.log10(np.maximum(volume, 1)), -np.inf)
+
+        order = np.argsort(-score, kind='stable')[:self.shortlist_size]
+        return [
+            (symbols[i], float(volume[i]), float(volatility[i]))
+            for i in order if mask[i]
+        ]
+
+    def rank(self, shortlist):
+        """
+        Полный анализ тренда для короткого списка. Лучшие - пары с сигналом BUY
+        и восходящим трендом, затем по разнице баллов покупки и продажи и объему.
+        """
+        ranking = []
+        for symbol, volume, volatility in shortlist:
+            analysis = self.bot.analyze_trend(symbol)
+            if not analysis:
+                continue
+            ranking.append({
+                'symbol': symbol,
+                'signal': analysis['signal'],
+                'trend': analysis['trend'],
+                'score': int(analysis['buy_score'] - analysis['sell_score']),
+                'volume': volume,
+                'volatility': volatility,
+            })
+        ranking.sort(key=lambda r: (r['signal'] == 'BUY', r['trend'] == 'UPTREND', r['score'], r['volume']),
+                     reverse=True)
+        return ranking
+
+    def scan(self):
+        """
+        Полный проход сканера. Возвращает новый список торгуемых пар.
+        """
+        with metrics.timer('scanner'):
+            tickers = self.bot.exchange.fetch_tickers()
+            shortlist = self.prefilter(tickers)
+            metrics.set_gauge('scanner_markets', len(tickers))
+            metrics.set_gauge('scanner_shortlist', len(shortlist))
+            self.last_ranking = self.rank(shortlist)
+
+        selected = [r['symbol'] for r in self.last_ranking if r['trend'] != 'DOWNTREND'][:self.max_symbols]
+        # Пары с открытыми позициями остаются в работе до закрытия позиции
+        held = [symbol for symbol in self.bot.positions if symbol not in selected]
+        logging.info(
+            f"Сканер: {len(tickers)} пар, короткий список {len(shortlist)}, выбрано: {', '.join(selected) or '-'}"
+        )
+        return selected + held
+
+    def refresh(self):
+        """
+        Обновление списка пар бота по результатам сканирования
+        """
+        try:
+            symbols = self.scan()
+        except Exception as e:
+            logging.error(f"Ошибка сканирования рынка: {e}")
+            return self.bot.symbols
+        finally:
+            self.last_scan = self.bot.exchange.milliseconds() / 1000
+
+        if symbols:
+            self.bot.symbols = symbols
+            # Освобождаем буферы свечей и состояние индикаторов пар вне списка
+            keep = set(symbols)
+            for key in [key for key in self.bot.candle_series if key[0] not in keep]:
+                del self.bot.candle_series[key]
+            for symbol in [symbol for symbol in self.bot.indicator_states if symbol not in keep]:
+                del self.bot.indicator_states[symbol]
+        return self.bot.symbols
+
+    def due(self):
+        return self.last_scan is None or self.bot.exchange.milliseconds() / 1000 - self.last_scan >= self.interval
+
+    def maybe_refresh(self):
+        """
+        Обновление списка пар, если с прошлого сканирования прошло interval секунд
+        """
+        if self.due():
+            self.refresh()
+        return self.bot.symbols
@@ -0,0 +1,305 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+import ccxt
+
+from config import TradingConfig
+from metrics import metrics
+
+# Общий планировщик запросов к бирже вместо равномерных пауз enableRateLimit.
+# Вес запросов (по таблице весов эндпоинтов MEXC, иначе cost ccxt) списывается
+# из одного ведра токенов, ожидающие запросы
+# обслуживаются по полосам приоритета: ордера, затем цены открытых позиций,
+# затем рыночные данные. Рыночным данным недоступна часть ведра (резерв),
+# поэтому закрытие позиции не ждет очереди из запросов свечей.
+# Ответ 429 уменьшает скорость и приостанавливает все запросы с экспоненциальной
+# задержкой; успешные ответы постепенно возвращают скорость.
+
+LANE_ORDER = 0
+LANE_POSITION = 1
+LANE_MARKET = 2
+LANE_NAMES = ('order', 'position', 'market')
+
+_lane_override = contextvars.ContextVar('scheduler_lane', default=None)
+_current_lane = contextvars.ContextVar('scheduler_current_lane', default=LANE_MARKET)
+_current_weight = contextvars.ContextVar('scheduler_current_weight', default=None)
+
+_ORDER_PATHS = ('order', 'mytrades')
+_ACCOUNT_PATHS = ('account', 'balance')
+
+# Веса эндпоинтов MEXC spot v3, которые зависят от параметров запроса и поэтому
+# не совпадают со статическим cost ccxt: путь -> (вес с symbol, вес без symbol)
+ENDPOINT_WEIGHTS = {
+    'ticker/24hr': (1, 40),
+    'ticker/price': (1, 2),
+    'ticker/bookticker': (1, 2),
+    'exchangeinfo': (10, 10),
+}
+
+
+def request_weight(path, params=None, cost=None, weights=ENDPOINT_WEIGHTS):
+    """
+    Вес запроса по таблице weights (с учетом параметра symbol), иначе cost ccxt
+    """
+    weight = weights.get(str(path).lower().strip('/'))
+    if weight is None:
+        return 1 if cost is None else cost
+    return weight[0] if isinstance(params, dict) and params.get('symbol') else weight[1]
+
+
+def classify_request(path, method='GET'):
+    """
+    Полоса запроса по эндпоинту ccxt: торговые запросы, данные аккаунта, рыночные данные
+    """
+    path = str(path).lower()
+    if str(method).upper() in ('POST', 'PUT', 'DELETE') or any(key in path for key in _ORDER_PATHS):
+        return LANE_ORDER
+    if any(key in path for key in _ACCOUNT_PATHS):
+        return LANE_POSITION
+    return LANE_MARKET
+
+
+@contextlib.contextmanager
+def lane(value):
+    """
+    Повышение приоритета запросов внутри блока (например, цены открытых позиций).
+    Торговые запросы всегда остаются в полосе ордеров.
+    """
+    token = _lane_override.set(value)
+    try:
+        yield
+    finally:
+        _lane_override.reset(token)
+
+
+class RequestScheduler:
+    def __init__(self, rate, capacity=None, reserve=None, max_backoff=None, clock=time.monotonic, weights=None):
+        """
+        rate - вес запросов в секунду, capacity - размер ведра (допустимый всплеск),
+        reserve - доля ведра, недоступная рыночным данным (полосе позиций - половина резерва),
+        weights - веса эндпоинтов (по умолчанию ENDPOINT_WEIGHTS)
+        """
+        self.rate = rate
+        self.weights = ENDPOINT_WEIGHTS if weights is None else weights
+        self.capacity = capacity or TradingConfig.SCHEDULER_BURST
+        reserve = TradingConfig.SCHEDULER_RESERVE if reserve is None else reserve
+        self.reserves = (0.0, self.capacity * reserve / 2, self.capacity * reserve)
+        self.max_backoff = max_backoff or TradingConfig.SCHEDULER_MAX_BACKOFF
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self.failures = 0
+        self._updated = clock()
+        self._queues = tuple(deque() for _ in LANE_NAMES)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def for_exchange(cls, exchange, **kwargs):
+        """
+        Скорость по rateLimit клиента ccxt: один запрос веса 1 раз в rateLimit мс
+        """
+        return cls(1000.0 / exchange.rateLimit, **kwargs)
+
+    # --- Ведро токенов и очередь ---
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate * self.factor)
+        self._updated = now
+        return now
+
+    def _enqueue(self, lane_index):
+        self._seq += 1
+        ticket = (lane_index, self._seq)
+        self._queues[lane_index].append(ticket)
+        metrics.set_gauge('scheduler_queue_depth', len(self._queues[lane_index]), lane=LANE_NAMES[lane_index])
+        return ticket
+
+    def _dequeue(self, ticket):
+        queue = self._queues[ticket[0]]
+        with contextlib.suppress(ValueError):
+            queue.remove(ticket)
+        metrics.set_gauge('scheduler_queue_depth', len(queue), lane=LANE_NAMES[ticket[0]])
+        self._cond.notify_all()
+
+    def _head(self):
+        for queue in self._queues:
+            if queue:
+                return queue[0]
+        return None
+
+    def _try_take(self, ticket, cost):
+        """
+        Списание веса, если запрос первый в очереди и токенов хватает с учетом резерва.
+        Возвращает 0 при успехе, иначе рекомендуемое время ожидания (секунды).
+        """
+        now = self._refill()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self._head() != ticket:
+            return 0.1
+        needed = cost + self.reserves[ticket[0]]
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0
+        return max((needed - self.tokens) / (self.rate * self.factor), 0.001)
+
+    def depth(self):
+        """
+        Число ожидающих запросов по полосам
+        """
+        with self._cond:
+            return {name: len(queue) for name, queue in zip(LANE_NAMES, self._queues)}
+
+    def _lane(self, lane_index):
+        return _current_lane.get() if lane_index is None else lane_index
+
+    def acquire(self, cost=1, lane_index=None):
+        """
+        Ожидание очереди и токенов для запроса веса cost (синхронный клиент)
+        """
+        lane_index = self._lane(lane_index)
+        cost = min(cost, self.capacity)
+        started = self.clock()
+        with self._cond:
+            ticket = self._enqueue(lane_index)
+            try:
+                while True:
+                    delay = self._try_take(ticket, cost)
+                    if not delay:
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._dequeue(ticket)
+        metrics.observe('scheduler_wait_seconds', self.clock() - started, lane=LANE_NAMES[lane_index])
+
+    async def acquire_async(self, cost=1, lane_index=None):
+        """
+        То же для асинхронного клиента: ожидание без блокировки цикла событий
+        """
+        lane_index = self._lane(lane_index)
+        cost = min(cost, self.capacity)
+        started = self.clock()
+        with self._cond:
+            ticket = self._enqueue(lane_index)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(ticket, cost)
+                if not delay:
+                    break
+                await asyncio.sleep(min(delay, 0.05))
+        finally:
+            with self._cond:
+                self._dequeue(ticket)
+        metrics.observe('scheduler_wait_seconds', self.clock() - started, lane=LANE_NAMES[lane_index])
+
+    # --- Адаптация к ответам 429 ---
+
+    def on_rate_limited(self, retry_after=None):
+        """
+        Ответ 429: пауза для всех полос (Retry-After или экспоненциальная) и снижение скорости
+        """
+        with self._cond:
+            self.failures += 1
+            delay = retry_after or min(2 ** (self.failures - 1), self.max_backoff)
+            self.paused_until = max(self.paused_until, self._refill() + delay)
+            self.factor = max(self.factor / 2, 0.1)
+            self.tokens = 0.0
+            self._cond.notify_all()
+        metrics.inc('scheduler_rate_limited_total')
+        metrics.set_gauge('scheduler_rate_factor', self.factor)
+        logging.warning(f"Превышен лимит запросов биржи: пауза {delay:.1f}s, скорость x{self.factor:.2f}")
+
+    def on_success(self):
+        with self._cond:
+            if self.failures == 0 and self.factor >= 1:
+                return
+            self.failures = 0
+            self.factor = factor = min(self.factor * 1.05, 1.0)
+        metrics.set_gauge('scheduler_rate_factor', factor)
+
+
+def _retry_after(exchange):
+    headers = getattr(exchange, 'last_response_headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def install_scheduler(exchange, scheduler):
+    """
+    Подключение планировщика к клиенту ccxt (синхронному или асинхронному):
+    throttle ждет планировщик, fetch2 определяет полосу и вес запроса и сообщает о 429.
+    Вызывается до instrument_exchange, чтобы метрика ожидания учитывала планировщик.
+    """
+    original_fetch2 = exchange.fetch2
+    rate_limited = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+    def request_lane(path, method):
+        lane_index = classify_request(path, method)
+        override = _lane_override.get()
+        return lane_index if override is None else min(lane_index, override)
+
+    def enter(path, method, args, kwargs):
+        params = args[0] if args else kwargs.get('params')
+        return (_current_lane.set(request_lane(path, method)),
+                _current_weight.set((path, params)))
+
+    def leave(tokens):
+        _current_lane.reset(tokens[0])
+        _current_weight.reset(tokens[1])
+
+    def weight(cost):
+        request = _current_weight.get()
+        if request is None:
+            return 1 if cost is None else cost
+        return request_weight(request[0], request[1], cost, scheduler.weights)
+
+    if asyncio.iscoroutinefunction(original_fetch2):
+        @functools.wraps(original_fetch2)
+        async def fetch2(path, api='public', method='GET', *args, **kwargs):
+            tokens = enter(path, method, args, kwargs)
+            try:
+                response = await original_fetch2(path, api, method, *args, **kwargs)
+            except rate_limited:
+                scheduler.on_rate_limited(_retry_after(exchange))
+                raise
+            finally:
+                leave(tokens)
+            scheduler.on_success()
+            return response
+
+        async def throttle(cost=None):
+            await scheduler.acquire_async(weight(cost))
+    else:
+        @functools.wraps(original_fetch2)
+        def fetch2(path, api='public', method='GET', *args, **kwargs):
+            tokens = enter(path, method, args, kwargs)
+            try:
+                response = original_fetch2(path, api, method, *args, **kwargs)
+            except rate_limited:
+                scheduler.on_rate_limited(_retry_after(exchange))
+                raise
+            finally:
+                leave(tokens)
+            scheduler.on_success()
+            return response
+
+        def throttle(cost=None):
+            scheduler.acquire(weight(cost))
+
+    exchange.fetch2 = fetch2
+    exchange.throttle = throttle
+    exchange.enableRateLimit = True
+    return exchange
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+Локальный симулятор биржи для бумажной торговли на записанных данных.
+Реализует методы ccxt, которые использует MexcTrendBot, и прокручивает
+записанные свечи (или тики) с виртуальными часами, поэтому месяцы работы
+бота проходят за минуты с настоящим основным циклом run_bot.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from config import TradingConfig, configure_logging
+from candle_store import CandleStore, CANDLE_DTYPE, to_records
+from resample import resample
+from tick_kernel import TICK_DTYPE, CROSS_BELOW, first_crosses, load_ticks
+from utils import TradingUtils
+
+_FIELDS = CANDLE_DTYPE.names
+QUOTE_CURRENCY = 'USDT'
+
+
+def load_recorded(path):
+    """
+    Загрузка записанных данных в массив CANDLE_DTYPE.
+    Поддерживаются файлы хранилища (.bin), JSON со списком свечей ccxt
+    и CSV со свечами (timestamp,open,high,low,close,volume) или тиками (timestamp,price[,volume]).
+    """
+    if path.endswith('.bin'):
+        return np.fromfile(path, dtype=CANDLE_DTYPE)
+    if path.endswith('.json'):
+        with open(path) as f:
+            return to_records(json.load(f))
+
+    frame = pd.read_csv(path)
+    frame.columns = [str(column).lower() for column in frame.columns]
+    if 'close' not in frame and 'price' in frame:
+        # Тик - свеча нулевой длительности
+        for field in ('open', 'high', 'low', 'close'):
+            frame[field] = frame['price']
+    if 'volume' not in frame:
+        frame['volume'] = 0.0
+    records = np.empty(len(frame), dtype=CANDLE_DTYPE)
+    for field in _FIELDS:
+        records[field] = frame[field].to_numpy()
+    return records
+
+
+class SimulatedExchange:
+    """
+    Симулятор спотовой биржи с виртуальными часами.
+
+    В момент времени now известны все базовые свечи, закрывшиеся до now,
+    и цена открытия текущей базовой свечи - она же текущая цена тикера.
+    Рыночные ордера исполняются по текущей цене с проскальзыванием,
+    лимитные и стоп-ордера - по high/low закрывшихся свечей.
+    Если для пары переданы тики (TICK_DTYPE), текущая цена - последний тик,
+    а лимитные и стоп-ордера исполняются на первом тике, достигшем уровня.
+    """
+
+    def __init__(self, candles, base_timeframe=None, initial_balance=10000.0, start=None,
+                 taker_fee=0.001, maker_fee=0.0, slippage=0.0005, speed=None, ticks=None):
+        self.data = {}
+        for symbol, records in candles.items():
+            records = np.sort(np.asarray(records, dtype=CANDLE_DTYPE), order='timestamp')
+            self.data[symbol] = {field: np.ascontiguousarray(records[field]) for field in _FIELDS}
+        if not self.data:
+            raise ValueError("Нет данных для симуляции")
+
+        self.base_ms = (TradingUtils.timeframe_to_ms(base_timeframe) if base_timeframe
+                        else self._infer_step())
+        self.start = start if start is not None else min(d['timestamp'][0] for d in self.data.values())
+        self.end = max(d['timestamp'][-1] for d in self.data.values()) + self.base_ms
+        self.now = int(self.start)
+        self.speed = speed
+
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.slippage = slippage
+        self.initial_balance = float(initial_balance)
+        self.balances = {QUOTE_CURRENCY: float(initial_balance)}
+        # Резерв открытых ордеров: id ордера -> (валюта, сумма)
+        self.reserved = {}
+
+        self.has = {
+            'fetchOHLCV': True, 'fetchTicker': True, 'fetchTickers': True, 'fetchBalance': True,
+            'createOrder': True, 'createOrders': True, 'cancelOrder': True, 'cancelOrders': True,
+            'fetchOrder': True, 'fetchOpenOrders': True, 'fetchClosedOrders': True,
+        }
+        self.markets = {
+            symbol: {'symbol': symbol, 'base': symbol.split('/')[0], 'quote': symbol.split('/')[1],
+                     'active': True, 'spot': True}
+            for symbol in self.data
+        }
+        self.orders = {}
+        self.open_orders = {}
+        self.trades = []
+        self.finished = False
+        self._on_finished = []
+        self._ids = itertools.count(1)
+        self._cursors = {symbol: self._closed_count(symbol) for symbol in self.data}
+        self.ticks = {
+            symbol: np.sort(np.asarray(records, dtype=TICK_DTYPE), order='timestamp')
+            for symbol, records in (ticks or {}).items() if symbol in self.data
+        }
+        self._tick_cursors = {symbol: self._tick_count(symbol) for symbol in self.ticks}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_candle_store(cls, store, symbols, timeframe, since=None, until=None, **kwargs):
+        """
+        Симулятор по свечам из CandleStore
+        """
+        candles = {}
+        for symbol in symbols:
+            records = store.load_range(symbol, timeframe, since or 0, until)
+            if len(records):
+                candles[symbol] = records
+            else:
+                logging.warning(f"Нет сохраненных свечей {symbol} {timeframe}")
+        return cls(candles, base_timeframe=timeframe, **kwargs)
+
+    @classmethod
+    def from_files(cls, paths, **kwargs):
+        """
+        Симулятор по записанным файлам: {пара: путь}
+        """
+        return cls({symbol: load_recorded(path) for symbol, path in paths.items()}, **kwargs)
+
+    def _infer_step(self):
+        steps = [np.diff(d['timestamp']) for d in self.data.values() if len(d['timestamp']) > 1]
+        steps = np.concatenate(steps) if steps else np.empty(0)
+        steps = steps[steps > 0]
+        return int(np.median(steps)) if len(steps) else 60_000
+
+    def _closed_count(self, symbol):
+        """Количество базовых свечей, закрывшихся к текущему времени"""
+        return int(np.searchsorted(self.data[symbol]['timestamp'], self.now - self.base_ms, side='right'))
+
+    def _tick_count(self, symbol):
+        """Количество тиков к текущему времени"""
+        return int(np.searchsorted(self.ticks[symbol]['timestamp'], self.now, side='right'))
+
+    def _current_price(self, symbol):
+        """
+        Последняя известная цена: последний тик, открытие текущей свечи или закрытие последней
+        """
+        if symbol in self.ticks:
+            count = self._tick_count(symbol)
+            if count:
+                return float(self.ticks[symbol]['price'][count - 1])
+        data = self.data[symbol]
+        closed = self._cursors[symbol]
+        if closed < len(data['timestamp']) and data['timestamp'][closed] <= self.now:
+            return float(data['open'][closed])
+        if closed == 0:
+            raise ccxt.BadSymbol(f"{symbol}: нет данных на {self.now}")
+        return float(data['close'][closed - 1])
+
+    def _check_symbol(self, symbol):
+        if symbol not in self.data:
+            raise ccxt.BadSymbol(f"Неизвестная пара {symbol}")
+
+    # --- Время ---
+
+    def milliseconds(self):
+        return self.now
+
+    def datetime_now(self):
+        return datetime.fromtimestamp(self.now / 1000)
+
+    def sleep(self, seconds):
+        """
+        Продвижение виртуального времени с исполнением ордеров по пройденным свечам.
+        speed > 0 добавляет реальную паузу seconds / speed.
+        """
+        if self.finished:
+            return
+        if self.speed:
+            time.sleep(seconds / self.speed)
+        self.advance(self.now + int(seconds * 1000))
+
+    def advance(self, until):
+        with self._lock:
+            self.now = min(int(until), self.end)
+            self._match_orders()
+            if self.now >= self.end:
+                self.finished = True
+        if self.finished:
+            for callback in self._on_finished:
+                callback()
+
+    def on_finished(self, callback):
+        self._on_finished.append(callback)
+
+    # --- Рыночные данные ---
+
+    def load_markets(self, reload=False, params=None):
+        return self.markets
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """
+        Свечи таймфрейма timeframe, собранные из базовых свечей.
+        Последняя свеча - незакрытая, по уже известным данным.
+        """
+        self._check_symbol(symbol)
+        tf_ms = TradingUtils.timeframe_to_ms(timeframe)
+        if tf_ms % self.base_ms:
+            raise ccxt.BadRequest(f"Таймфрейм {timeframe} не кратен базовому ({self.base_ms} мс)")
+        limit = limit or 500
+
+        with self._lock:
+            data = self.data[symbol]
+            closed = self._cursors[symbol]
+            current_open = self.now // tf_ms * tf_ms
+            first = since if since is not None else current_open - (limit - 1) * tf_ms
+            lo = int(np.searchsorted(data['timestamp'], first // tf_ms * tf_ms, side='left'))
+            rows = {field: data[field][lo:closed] for field in _FIELDS}
+            if closed < len(data['timestamp']) and data['timestamp'][closed] <= self.now:
+                # Начавшаяся базовая свеча: известна только цена открытия
+                price = data['open'][closed]
+                partial = (data['timestamp'][closed], price, price, price, price, 0.0)
+                rows = {field: np.append(rows[field], value) for field, value in zip(_FIELDS, partial)}
+
+        if len(rows['timestamp']) == 0:
+            return []
+        ohlcv = resample(*(rows[field] for field in _FIELDS), tf_ms)
+        ohlcv = ohlcv[:limit] if since is not None else ohlcv[-limit:]
+        return [list(row) for row in ohlcv.tolist()]
+
+    def fetch_ticker(self, symbol, params=None):
+        self._check_symbol(symbol)
+        with self._lock:
+            last = self._current_price(symbol)
+        half_spread = last * self.slippage
+        return {
+            'symbol': symbol, 'timestamp': self.now, 'datetime': self.iso8601(self.now),
+            'last': last, 'close': last, 'bid': last - half_spread, 'ask': last + half_spread,
+        }
+
+    def fetch_tickers(self, symbols=None, params=None):
+        return {symbol: self.fetch_ticker(symbol) for symbol in (symbols or self.data)}
+
+    # --- Баланс ---
+
+    def fetch_balance(self, params=None):
+        with self._lock:
+            balance = {'free': {}, 'used': {}, 'total': {}}
+            for currency, amount in self.balances.items():
+                used = self._used(currency)
+                balance[currency] = {'free': amount - used, 'used': used, 'total': amount}
+                for key in ('free', 'used', 'total'):
+                    balance[key][currency] = balance[currency][key]
+            return balance
+
+    def _used(self, currency):
+        return sum(amount for held, amount in self.reserved.values() if held == currency)
+
+    def _free(self, currency):
+        return self.balances.get(currency, 0.0) - self._used(currency)
+
+    def _requirement(self, order, price):
+        """
+        Средства, которые блокирует ордер: базовая валюта для продажи, котируемая с комиссией для покупки
+        """
+        if order['side'] == 'sell':
+            return order['symbol'].split('/')[0], order['amount']
+        return QUOTE_CURRENCY, order['amount'] * price * (1 + max(self.taker_fee, self.maker_fee))
+
+    def _reserve(self, order):
+        """
+        Перевод средств открытого ордера из free в used (как на бирже при размещении)
+        """
+        currency, amount = self._requirement(order, order['stopPrice'] or order['price'])
+        available = self._free(currency)
+        if available + 1e-12 < amount:
+            raise ccxt.InsufficientFunds(
+                f"Недостаточно средств для {order['side']} {order['symbol']}: {available} < {amount}"
+            )
+        self.reserved[order['id']] = (currency, amount)
+
+    def equity(self):
+        """
+        Стоимость портфеля в валюте котировки по текущим ценам
+        """
+        with self._lock:
+            total = self.balances.get(QUOTE_CURRENCY, 0.0)
+            for symbol in self.data:
+                base = symbol.split('/')[0]
+                if self.balances.get(base):
+                    total += self.balances[base] * self._current_price(symbol)
+            return total
+
+    # --- Ордера ---
+
+    @staticmethod
+    def iso8601(timestamp):
+        return ccxt.Exchange.iso8601(timestamp)
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        with self._lock:
+            order = self._place(symbol, type, side, amount, price, params)
+            if order['status'] == 'open':
+                self._reserve(order)
+            self._register(order)
+            return dict(order)
+
+    def _place(self, symbol, type, side, amount, price=None, params=None):
+        """
+        Новый ордер; рыночный и исполнимый сразу лимитный исполняются при размещении
+        """
+        self._check_symbol(symbol)
+        params = params or {}
+        stop_price = params.get('stopPrice') or params.get('triggerPrice')
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f"Некорректный объем ордера {amount}")
+        if type == 'limit' and not price:
+            raise ccxt.InvalidOrder("Лимитный ордер без цены")
+
+        with self._lock:
+            order = {
+                'id': str(next(self._ids)),
+                'clientOrderId': params.get('clientOrderId'),
+                'timestamp': self.now,
+                'datetime': self.iso8601(self.now),
+                'lastTradeTimestamp': None,
+                'symbol': symbol,
+                'type': type,
+                'side': side,
+                'price': price,
+                'stopPrice': stop_price,
+                'triggerPrice': stop_price,
+                'amount': float(amount),
+                'filled': 0.0,
+                'remaining': float(amount),
+                'average': None,
+                'cost': 0.0,
+                'status': 'open',
+                'fee': {'cost': 0.0, 'currency': QUOTE_CURRENCY},
+                'trades': [],
+            }
+
+            if not stop_price:
+                current = self._current_price(symbol)
+                if type == 'market':
+                    fill = current * (1 + self.slippage if side == 'buy' else 1 - self.slippage)
+                    self._fill(order, fill, self.taker_fee, strict=True)
+                elif (side == 'buy' and price >= current) or (side == 'sell' and price <= current):
+                    # Лимитный ордер, исполнимый сразу, исполняется как taker
+                    self._fill(order, current, self.taker_fee, strict=True)
+            return order
+
+    def _register(self, order):
+        self.orders[order['id']] = order
+        if order['status'] == 'open':
+            self.open_orders[order['id']] = order
+
+    def create_orders(self, orders, params=None):
+        """
+        Пакет ордеров как batchOrders MEXC: каждый ордер размещается отдельно,
+        вместо отклоненного в ответе ошибка без id
+        """
+        results = []
+        for o in orders:
+            try:
+                results.append(self.create_order(
+                    o['symbol'], o['type'], o['side'], o['amount'], o.get('price'), o.get('params')
+                ))
+            except ccxt.ExchangeError as e:
+                params = o.get('params') or {}
+                results.append({
+                    'id': None, 'clientOrderId': params.get('clientOrderId'), 'symbol': o['symbol'],
+                    'status': 'rejected', 'info': {'msg': str(e)},
+                })
+        return results
+
+    def _fill(self, order, price, fee_rate, strict=False):
+        """
+        Исполнение ордера целиком. При нехватке средств ордер отклоняется
+        (strict - с исключением, как ответ биржи на новый ордер).
+        """
+        base = order['symbol'].split('/')[0]
+        amount = order['amount']
+        cost = amount * price
+        fee = cost * fee_rate
+        # Ордеру доступны свободные средства и его собственный резерв (снимается при исполнении и отклонении)
+        reserve = self.reserved.pop(order['id'], None)
+        if order['side'] == 'buy':
+            available, required = self._free(QUOTE_CURRENCY), cost + fee
+        else:
+            available, required = self._free(base), amount
+        if reserve:
+            available += reserve[1]
+        if available + 1e-12 < required:
+            if strict:
+                raise ccxt.InsufficientFunds(
+                    f"Недостаточно средств для {order['side']} {order['symbol']}: {available} < {required}"
+                )
+            order['status'] = 'rejected'
+            logging.debug(f"[SIM] Ордер {order['id']} отклонен: недостаточно средств")
+            return False
+
+        if order['side'] == 'buy':
+            self.balances[QUOTE_CURRENCY] -= cost + fee
+            self.balances[base] = self.balances.get(base, 0.0) + amount
+        else:
+            self.balances[base] -= amount
+            self.balances[QUOTE_CURRENCY] = self.balances.get(QUOTE_CURRENCY, 0.0) + cost - fee
+
+        trade = {
+            'order': order['id'], 'symbol': order['symbol'], 'side': order['side'],
+            'timestamp': self.now, 'price': price, 'amount': amount, 'cost': cost,
+            'fee': {'cost': fee, 'currency': QUOTE_CURRENCY},
+        }
+        self.trades.append(trade)
+        order.update({
+            'filled': amount, 'remaining': 0.0, 'average': price, 'cost': cost,
+            'status': 'closed', 'lastTradeTimestamp': self.now,
+            'fee': {'cost': fee, 'currency': QUOTE_CURRENCY}, 'trades': [trade],
+        })
+        return True
+
+    def _trigger_index(self, order, data, lo, hi):
+        """
+        Первая свеча в [lo, hi), на которой срабатывает ордер, и цена исполнения
+        """
+        high, low, opens = data['high'][lo:hi], data['low'][lo:hi], data['open'][lo:hi]
+        buy = order['side'] == 'buy'
+        level = order['stopPrice'] or order['price']
+        if order['stopPrice']:
+            hits = high >= level if buy else low <= level
+        else:
+            hits = low <= level if buy else high >= level
+        pos = int(np.argmax(hits)) if len(hits) else 0
+        if not len(hits) or not hits[pos]:
+            return None, None
+
+        # Гэп через уровень - исполнение по цене открытия
+        if order['stopPrice']:
+            price = max(opens[pos], level) if buy else min(opens[pos], level)
+            price *= (1 + self.slippage) if buy else (1 - self.slippage)
+        else:
+            price = min(opens[pos], level) if buy else max(opens[pos], level)
+        return lo + pos, float(price)
+
+    def _match_ticks(self, symbol, orders):
+        """
+        События исполнения ордеров пары по тикам, прошедшим с прошлого шага:
+        первый тик, достигший уровня ордера (время тика, приоритет, ордер, цена, время исполнения)
+        """
+        ticks = self.ticks[symbol]
+        lo = self._tick_cursors[symbol]
+        hi = self._tick_cursors[symbol] = self._tick_count(symbol)
+        if hi <= lo or not orders:
+            return []
+        starts, belows, aboves = [], [], []
+        for order in orders:
+            # Ордер учитывает только тики после его создания
+            starts.append(max(lo, int(np.searchsorted(ticks['timestamp'], order['timestamp'], side='right'))))
+            level = order['stopPrice'] or order['price']
+            buy = order['side'] == 'buy'
+            # Стоп на покупку и лимит на продажу срабатывают при росте цены до уровня
+            rising = buy if order['stopPrice'] else not buy
+            belows.append(-np.inf if rising else level)
+            aboves.append(level if rising else np.inf)
+        indexes, codes = first_crosses(ticks['price'], starts, [hi] * len(orders), belows, aboves)
+
+        events = []
+        for order, index, code in zip(orders, indexes, codes):
+            if index < 0:
+                continue
+            timestamp = int(ticks['timestamp'][index])
+            if order['stopPrice']:
+                price = float(ticks['price'][index])
+                price *= (1 - self.slippage) if code == CROSS_BELOW else (1 + self.slippage)
+                events.append((timestamp, 0, order, price, timestamp))
+            else:
+                events.append((timestamp, 1, order, float(order['price']), timestamp))
+        return events
+
+    def _match_orders(self):
+        """
+        Исполнение лимитных и стоп-ордеров по тикам или свечам, закрывшимся с прошлого шага
+        """
+        events = []
+        open_orders = list(self.open_orders.values())
+        for symbol, data in self.data.items():
+            lo = self._cursors[symbol]
+            hi = self._closed_count(symbol)
+            self._cursors[symbol] = hi
+            if symbol in self.ticks:
+                events.extend(self._match_ticks(symbol, [o for o in open_orders if o['symbol'] == symbol]))
+                continue
+            if hi <= lo:
+                continue
+            for order in open_orders:
+                if order['symbol'] != symbol:
+                    continue
+                # Ордер учитывает только свечи, открывшиеся после его создания
+                start = max(lo, int(np.searchsorted(data['timestamp'], order['timestamp'], side='left')))
+                index, price = self._trigger_index(order, data, start, hi)
+                if index is not None:
+                    # При совпадении времени стоп-ордер считается сработавшим первым
+                    timestamp = int(data['timestamp'][index])
+                    events.append((timestamp, 0 if order['stopPrice'] else 1, order, price, timestamp + self.base_ms))
+
+        now = self.now
+        for _, _, order, price, fill_time in sorted(events, key=lambda e: (e[0], e[1], int(e[2]['id']))):
+            if order['status'] != 'open':
+                continue
+            self.now = fill_time
+            fee_rate = self.taker_fee if order['stopPrice'] or order['type'] == 'market' else self.maker_fee
+            if self._fill(order, price, fee_rate):
+                logging.debug(f"[SIM] Исполнен {order['side']} {order['symbol']} {order['amount']} по {price}")
+            self.open_orders.pop(order['id'], None)
+        self.now = now
+
+    def cancel_order(self, id, symbol=None, params=None):
+        with self._lock:
+            order = self.orders.get(id)
+            if order is None or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"Ордер {id} не найден или уже неактивен")
+            order['status'] = 'canceled'
+            self.open_orders.pop(id, None)
+            self.reserved.pop(id, None)
+            return dict(order)
+
+    def cancel_orders(self, ids, symbol=None, params=None):
+        return [self.cancel_order(id, symbol) for id in ids]
+
+    def fetch_order(self, id, symbol=None, params=None):
+        with self._lock:
+            if id not in self.orders:
+                raise ccxt.OrderNotFound(f"Ордер {id} не найден")
+            return dict(self.orders[id])
+
+    def _orders(self, symbol, statuses, since=None, limit=None):
+        with self._lock:
+            orders = [
+                dict(order) for order in self.orders.values()
+                if order['status'] in statuses
+                and (symbol is None or order['symbol'] == symbol)
+                and (since is None or order['timestamp'] >= since)
+            ]
+        return orders[-limit:] if limit else orders
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._orders(symbol, ('open',), since, limit)
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._orders(symbol, ('closed', 'canceled', 'rejected'), since, limit)
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        with self._lock:
+            trades = [t for t in self.trades if (symbol is None or t['symbol'] == symbol)
+                      and (since is None or t['timestamp'] >= since)]
+        return trades[-limit:] if limit else trades
+
+    # --- Запуск бота ---
+
+    def attach(self, bot):
+        """
+        Подключение бота к симулятору: биржа, часы, пауза цикла и остановка
+        по окончании данных. Локальное хранилище свечей не используется.
+        """
+        from order_execution import OrderExecutor
+
+        bot.exchange = self
+        bot.executor = OrderExecutor(self)
+        bot.account.exchange = self
+        bot.account.clock = lambda: self.now / 1000
+        bot.account.invalidate()
+        bot.candle_store = None
+        bot.journal = None
+        bot.trade_store = None
+        bot.now = self.datetime_now
+        bot.sleep = self.sleep
+        self.on_finished(bot.stop)
+        return bot
+
+    def report(self):
+        """
+        Итоги симуляции
+        """
+        statuses = {}
+        for order in self.orders.values():
+            statuses[order['status']] = statuses.get(order['status'], 0) + 1
+        equity = self.equity()
+        return {
+            'start': self.iso8601(int(self.start)),
+            'end': self.iso8601(self.now),
+            'initial_balance': self.initial_balance,
+            'equity': equity,
+            'return_pct': (equity - self.initial_balance) / self.initial_balance * 100,
+            'fills': len(self.trades),
+            'fees': sum(t['fee']['cost'] for t in self.trades),
+            'orders': statuses,
+            'balances': dict(self.balances),
+        }
+
+
+def run_simulation(bot, exchange):
+    """
+    Прогон основного цикла бота до конца записанных данных
+    """
+    exchange.attach(bot)
+    started = time.perf_counter()
+    bot.run_bot()
+    report = exchange.report()
+    report['wall_seconds'] = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бумажная торговля на записанных данных')
+    parser.add_argument('--symbols', default=','.join(TradingConfig.TRADING_PAIRS))
+    parser.add_argument('--store', default=TradingConfig.CANDLE_CACHE_DIR or 'candle_cache',
+                        help='Каталог CandleStore с записанными свечами')
+    parser.add_argument('--files', nargs='*', default=None,
+                        help='Записанные файлы в виде ПАРА=путь (.bin, .json, .csv)')
+    parser.add_argument('--ticks', nargs='*', default=None,
+                        help='Тики в виде ПАРА=путь (.npy, .bin, .csv) для исполнения ордеров по тикам')
+    parser.add_argument('--base-timeframe', default='1m', help='Таймфрейм записанных свечей')
+    parser.add_argument('--since', default=None, help='Начало данных (YYYY-MM-DD)')
+    parser.add_argument('--until', default=None, help='Конец данных (YYYY-MM-DD)')
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--taker-fee', type=float, default=0.001)
+    parser.add_argument('--maker-fee', type=float, default=0.0)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    parser.add_argument('--speed', type=float, default=None,
+                        help='Ускорение относительно реального времени (по умолчанию без пауз)')
+    args = parser.parse_args()
+
+    configure_logging()
+    to_ms = lambda value: int(pd.Timestamp(value).timestamp() * 1000) if value else None
+    settings = dict(initial_balance=args.balance, taker_fee=args.taker_fee, maker_fee=args.maker_fee,
+                    slippage=args.slippage, speed=args.speed)
+    if args.ticks:
+        settings['ticks'] = {symbol: load_ticks(path) for symbol, path in (item.split('=', 1) for item in args.ticks)}
+    if args.files:
+        paths = dict(item.split('=', 1) for item in args.files)
+        exchange = SimulatedExchange.from_files(paths, base_timeframe=args.base_timeframe, **settings)
+    else:
+        exchange = SimulatedExchange.from_candle_store(
+            CandleStore(args.store), args.symbols.split(','), args.base_timeframe,
+            to_ms(args.since), to_ms(args.until), **settings
+        )
+
+    # Прогрев: к старту симуляции доступна история для расчета индикаторов
+    warmup = TradingUtils.timeframe_to_ms(TradingConfig.TIMEFRAME) * TradingConfig.HISTORICAL_PERIODS
+    exchange.advance(exchange.start + warmup)
+
+    from mexc_trading_bot import MexcTrendBot
+
+    bot = MexcTrendBot(exchange=exchange, persist=False)
+    bot.symbols = list(exchange.data)
+    report = run_simulation(bot, exchange)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+from aiohttp import web
+
+from config import TradingConfig
+from metrics import metrics
+from utils import TradingUtils
+from candle_store import to_records
+from candle_series import CandleSeries
+
+# Потоковый режим: свечи и цены приходят по WebSocket вместо периодического опроса.
+# Источники событий выдают словари вида
+#   {'type': 'kline', 'symbol': ..., 'timeframe': ..., 'candle': [ts, o, h, l, c, v], 'closed': bool}
+#   {'type': 'ticker', 'symbol': ..., 'last': ..., 'timestamp': ...}
+# и сами переподключаются при обрыве соединения.
+
+
+class CcxtProStreamSource:
+    """
+    Источник событий MEXC через ccxt.pro (kline и ticker каналы)
+    """
+    def __init__(self, bot, symbols, timeframe=None, reconnect_delay=None):
+        import ccxt.pro as ccxtpro
+
+        self.exchange = ccxtpro.mexc({
+            'apiKey': bot.api_key,
+            'secret': bot.secret_key,
+            'sandbox': bot.sandbox,
+            'enableRateLimit': True,
+        })
+        self.symbols = list(symbols)
+        self.timeframe = timeframe or TradingConfig.TIMEFRAME
+        self.reconnect_delay = reconnect_delay or TradingConfig.STREAM_RECONNECT_DELAY
+
+    async def _watch(self, queue, name, watch, make_events):
+        while True:
+            try:
+                data = await watch()
+                for event in make_events(data):
+                    await queue.put(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # ccxt.pro заново открывает соединение при следующем вызове watch_*
+                logging.warning(f"Обрыв потока {name}: {e}. Переподключение через {self.reconnect_delay} c")
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _kline_events(self, symbol):
+        def make_events(ohlcv):
+            return [
+                {'type': 'kline', 'symbol': symbol, 'timeframe': self.timeframe, 'candle': candle, 'closed': False}
+                for candle in ohlcv[-2:]
+            ]
+        return make_events
+
+    @staticmethod
+    def _ticker_events(symbol):
+        def make_events(ticker):
+            return [{'type': 'ticker', 'symbol': symbol, 'last': ticker['last'], 'timestamp': ticker['timestamp']}]
+        return make_events
+
+    async def events(self):
+        queue = asyncio.Queue()
+        tasks = []
+        for symbol in self.symbols:
+            tasks.append(asyncio.create_task(self._watch(
+                queue, f"kline {symbol}",
+                lambda s=symbol: self.exchange.watch_ohlcv(s, self.timeframe),
+                self._kline_events(symbol)
+            )))
+            tasks.append(asyncio.create_task(self._watch(
+                queue, f"ticker {symbol}",
+                lambda s=symbol: self.exchange.watch_ticker(s),
+                self._ticker_events(symbol)
+            )))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.exchange.close()
+
+
+class ReplayStreamSource:
+    """
+    Источник событий из локального FakeStreamServer.
+    При переподключении запрашивает продолжение с последней полученной свечи.
+    """
+    def __init__(self, url, symbols, reconnect_delay=1):
+        self.url = url
+        self.symbols = list(symbols)
+        self.reconnect_delay = reconnect_delay
+        self.last_seen = {}
+        self.finished = False
+
+    async def events(self):
+        async with aiohttp.ClientSession() as session:
+            while not self.finished:
+                try:
+                    async with session.ws_connect(self.url) as ws:
+                        await ws.send_json({'op': 'subscribe', 'symbols': self.symbols, 'since': self.last_seen})
+                        async for message in ws:
+                            if message.type != aiohttp.WSMsgType.TEXT:
+                                break
+                            event = json.loads(message.data)
+                            if event['type'] == 'end':
+                                self.finished = True
+                                break
+                            if event['type'] == 'kline':
+                                self.last_seen[event['symbol']] = event['candle'][0]
+                            yield event
+                except (aiohttp.ClientError, ConnectionError) as e:
+                    logging.warning(f"Обрыв потока {self.url}: {e}")
+                if not self.finished:
+                    await asyncio.sleep(self.reconnect_delay)
+
+
+class FakeStreamServer:
+    """
+    Локальный WebSocket-сервер, воспроизводящий записанные свечи.
+    Каждая свеча отдается несколькими промежуточными обновлениями (open, high/low, close)
+    и соответствующими тикерами. speed - ускорение относительно реального времени.
+    disconnect_after - принудительный обрыв соединения после N сообщений (проверка переподключения).
+    """
+    def __init__(self, candles, timeframe=None, speed=1000.0, host='127.0.0.1', port=0, disconnect_after=None):
+        self.candles = {symbol: [list(map(float, c)) for c in ohlcv] for symbol, ohlcv in candles.items()}
+        self.timeframe = timeframe or TradingConfig.TIMEFRAME
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.disconnect_after = disconnect_after
+        self._runner = None
+
+    @classmethod
+    def from_candle_store(cls, store, symbols, timeframe, since, until=None, **kwargs):
+        candles = {}
+        for symbol in symbols:
+            records = store.load_range(symbol, timeframe, since, until)
+            candles[symbol] = [list(row) for row in records.tolist()]
+        return cls(candles, timeframe, **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def _timeline(self, symbols, since):
+        """Свечи всех пар, упорядоченные по времени, начиная после since"""
+        rows = []
+        for symbol in symbols:
+            start = since.get(symbol)
+            for candle in self.candles.get(symbol, []):
+                if start is None or candle[0] >= start:
+                    rows.append((candle[0], symbol, candle))
+        rows.sort(key=lambda row: row[0])
+        return rows
+
+    def _updates(self, symbol, candle):
+        ts, o, h, l, c, v = candle
+        steps = [
+            ([ts, o, o, o, o, 0.0], False),
+            ([ts, o, h, l, (h + l) / 2, v / 2], False),
+            ([ts, o, h, l, c, v], True),
+        ]
+        for partial, closed in steps:
+            yield {'type': 'kline', 'symbol': symbol, 'timeframe': self.timeframe, 'candle': partial, 'closed': closed}
+            yield {'type': 'ticker', 'symbol': symbol, 'last': partial[4], 'timestamp': ts}
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscription = await ws.receive_json()
+        delay = TradingUtils.timeframe_to_ms(self.timeframe) / 1000 / self.speed / 3
+        sent = 0
+        previous_ts = None
+
+        for ts, symbol, candle in self._timeline(subscription['symbols'], subscription.get('since', {})):
+            if previous_ts is not None and ts != previous_ts:
+                await asyncio.sleep(delay)
+            previous_ts = ts
+            for event in self._updates(symbol, candle):
+                await ws.send_json(event)
+                sent += 1
+                if self.disconnect_after and sent >= self.disconnect_after:
+                    self.disconnect_after = None
+                    await ws.close()
+                    return ws
+
+        await ws.send_json({'type': 'end'})
+        await ws.close()
+        return ws
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/ws', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logging.info(f"Тестовый поток свечей запущен: {self.url}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class StreamRunner:
+    """
+    Потоковый режим бота: анализ запускается в момент закрытия свечи,
+    цены открытых позиций обновляются по тикерам. Раз в check_interval
+    проверяются защитные ордера и фиксируется журнал, как в конце цикла run_bot.
+    """
+    def __init__(self, bot, source, timeframe=None, check_interval=None):
+        self.bot = bot
+        self.source = source
+        self.timeframe = timeframe or TradingConfig.TIMEFRAME
+        self.check_interval = TradingConfig.CHECK_INTERVAL if check_interval is None else check_interval
+        self.windows = {}
+        self.current = {}
+        self.last_prices = {}
+        self.last_status_log = 0.0
+        # Сделки по сигналу и проверка защитных ордеров меняют позиции - по очереди
+        self.trading_lock = asyncio.Lock()
+        self._stopped = asyncio.Event()
+
+    def _window(self, symbol):
+        if symbol not in self.windows:
+            limit = self.bot.base_history_limit()
+            window = CandleSeries(limit)
+            # Начальная история загружается один раз через REST
+            try:
+                candles = self.bot.fetch_candles(symbol, self.timeframe, limit)
+                # Незакрытая свеча придет из потока (хранилище свечей отдает только закрытые)
+                timeframe_ms = TradingUtils.timeframe_to_ms(self.timeframe)
+                if len(candles) and candles[-1][0] + timeframe_ms > self.bot.exchange.milliseconds():
+                    candles = candles[:-1]
+                window.extend(candles)
+            except Exception as e:
+                logging.error(f"Ошибка получения данных для {symbol}: {e}")
+            self.windows[symbol] = window
+        return self.windows[symbol]
+
+    def on_kline(self, event):
+        """
+        Обработка обновления свечи. Возвращает закрытую свечу или None.
+        """
+        symbol = event['symbol']
+        candle = event['candle']
+        current = self.current.get(symbol)
+
+        if current is not None and candle[0] < current[0]:
+            # Запоздавшее обновление уже закрытой свечи
+            return None
+
+        closed_candle = None
+        if current is not None and candle[0] > current[0]:
+            # Пришла новая свеча - предыдущая закрыта
+            closed_candle = current
+        self.current[symbol] = candle
+
+        if event.get('closed'):
+            closed_candle = candle
+            self.current.pop(symbol, None)
+
+        if closed_candle is None:
+            return None
+
+        window = self._window(symbol)
+        if len(window) and window.last_timestamp >= closed_candle[0]:
+            return None
+        window.append(*closed_candle)
+        if self.bot.candle_store:
+            self.bot.candle_store.append(symbol, self.timeframe, to_records([closed_candle]))
+        return closed_candle
+
+    async def on_candle_close(self, symbol):
+        """
+        Анализ пары сразу после закрытия свечи
+        """
+        analysis = self.bot.analyze_candles(symbol, self.windows[symbol])
+        if analysis:
+            async with self.trading_lock:
+                await asyncio.to_thread(self.bot.execute_signal, symbol, analysis)
+
+    async def housekeeping(self):
+        """
+        Позиции, закрытые на бирже stop-loss / take-profit, и фиксация журнала
+        """
+        async with self.trading_lock:
+            await asyncio.to_thread(self.bot.check_brackets)
+        metrics.set_gauge('open_positions', len(self.bot.positions))
+        await asyncio.to_thread(self.bot.save_state)
+
+    async def _housekeeping_loop(self):
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                try:
+                    await self.housekeeping()
+                except Exception as e:
+                    logging.error(f"Ошибка периодической проверки позиций: {e}")
+
+    def on_ticker(self, event):
+        self.last_prices[event['symbol']] = event['last']
+        if event['symbol'] in self.bot.positions:
+            self.bot.publish_position(event['symbol'], event['last'])
+
+        now = time.monotonic()
+        if now - self.last_status_log >= TradingConfig.CHECK_INTERVAL:
+            self.last_status_log = now
+            for symbol, position in list(self.bot.positions.items()):
+                if symbol in self.last_prices:
+                    self.bot.log_position(symbol, position, self.last_prices[symbol])
+
+    async def run(self):
+        """
+        Основной цикл потокового режима
+        """
+        logging.info("Запуск торгового бота в потоковом режиме...")
+        self._stopped.clear()
+        housekeeping = asyncio.create_task(self._housekeeping_loop())
+        try:
+            async for event in self.source.events():
+                try:
+                    if event['type'] == 'kline':
+                        if self.on_kline(event):
+                            await self.on_candle_close(event['symbol'])
+                    elif event['type'] == 'ticker':
+                        self.on_ticker(event)
+                except Exception as e:
+                    logging.error(f"Ошибка обработки события {event.get('type')} {event.get('symbol')}: {e}")
+        finally:
+            # Текущая проверка завершается до выхода, чтобы не гоняться с итоговым снимком журнала
+            self._stopped.set()
+            await housekeeping
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Режим супервизора: пары TRADING_PAIRS и аккаунты распределяются по процессам.
+Свечи всех пар загружает один поток супервизора и записывает в общую память,
+процессы-боты читают их оттуда вместо собственных запросов fetch_ohlcv.
+Процессы присылают баланс и позиции, супервизор сводит их по аккаунтам
+и перезапускает упавшие или зависшие процессы с нарастающей паузой.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import ccxt
+import numpy as np
+
+from config import TradingConfig, configure_logging
+from candle_store import CandleStore, CANDLE_DTYPE, to_records
+from metrics import metrics, instrument_exchange
+from market_cache import load_markets
+from resample import base_history_limit
+from scheduler import RequestScheduler, install_scheduler
+from trade_store import to_ms
+from mexc_trading_bot import MexcTrendBot
+
+# Интервал сигналов процесса супервизору во время паузы между циклами (секунды)
+HEARTBEAT_INTERVAL = 5
+
+# Процесс, проработавший дольше, считается стабильным: пауза перезапуска сбрасывается
+STABLE_UPTIME = 600
+
+_mp = multiprocessing.get_context('spawn')
+
+
+class SharedCandleFeed:
+    """
+    Последние свечи базового таймфрейма всех пар в одном блоке общей памяти:
+    счетчики свечей по парам и матрица записей CANDLE_DTYPE (пары x capacity).
+    Супервизор пишет, процессы-боты читают копии под общей блокировкой.
+    """
+    def __init__(self, symbols, timeframe, capacity, lock=None, name=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.timeframe = timeframe
+        self.capacity = int(capacity)
+        self.lock = lock or _mp.Lock()
+        count = len(self.symbols)
+        size = count * 8 + count * self.capacity * CANDLE_DTYPE.itemsize
+        self._owner = name is None
+        self._block = shared_memory.SharedMemory(name=name, create=self._owner, size=max(size, 1))
+        self._counts = np.ndarray(count, dtype=np.int64, buffer=self._block.buf)
+        self._records = np.ndarray((count, self.capacity), dtype=CANDLE_DTYPE, buffer=self._block.buf, offset=count * 8)
+        if self._owner:
+            self._counts[:] = 0
+
+    def descriptor(self):
+        """
+        Параметры для подключения из другого процесса
+        """
+        return {
+            'name': self._block.name, 'symbols': self.symbols, 'timeframe': self.timeframe,
+            'capacity': self.capacity, 'lock': self.lock,
+        }
+
+    @classmethod
+    def attach(cls, descriptor):
+        return cls(
+            descriptor['symbols'], descriptor['timeframe'], descriptor['capacity'],
+            descriptor['lock'], descriptor['name']
+        )
+
+    def write(self, symbol, records):
+        records = records[-self.capacity:]
+        i = self.index[symbol]
+        with self.lock:
+            self._records[i, :len(records)] = records
+            self._counts[i] = len(records)
+
+    def read(self, symbol, limit, since=None):
+        """
+        Копия последних limit свечей пары (начиная с since, если задано) или None
+        """
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        with self.lock:
+            records = self._records[i, :self._counts[i]]
+            if since is not None:
+                records = records[records['timestamp'].searchsorted(since):]
+            return records[-limit:].copy()
+
+    def close(self):
+        self._counts = self._records = None
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+
+
+def share_rate_limit(exchange, scheduler, share):
+    """
+    Доля лимита запросов MEXC (общего для IP) для одного клиента:
+    скорость планировщика, а без него - интервал rateLimit ccxt
+    """
+    if scheduler:
+        scheduler.rate *= share
+    else:
+        exchange.rateLimit /= share
+
+
+class MarketFeed:
+    """
+    Загрузка свечей всех пар одним клиентом без ключей (через планировщик и
+    локальное хранилище свечей) и публикация в SharedCandleFeed.
+    Собственный клиент получает долю лимита запросов SUPERVISOR_FEED_RATE_SHARE.
+    """
+    def __init__(self, feed, exchange=None, candle_store=None, interval=None):
+        self.feed = feed
+        if exchange is None:
+            exchange = ccxt.mexc({'enableRateLimit': True})
+            try:
+                load_markets(exchange)
+            except Exception as e:
+                logging.error(f"Ошибка загрузки рынков: {e}")
+            scheduler = None
+            if TradingConfig.SCHEDULER_ENABLED:
+                scheduler = RequestScheduler.for_exchange(exchange)
+                install_scheduler(exchange, scheduler)
+            share_rate_limit(exchange, scheduler, TradingConfig.SUPERVISOR_FEED_RATE_SHARE)
+            instrument_exchange(exchange)
+        self.exchange = exchange
+        if candle_store is None and TradingConfig.CANDLE_CACHE_DIR:
+            candle_store = CandleStore(TradingConfig.CANDLE_CACHE_DIR)
+        self.candle_store = candle_store
+        self.interval = interval or TradingConfig.CHECK_INTERVAL
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        with metrics.timer('feed_refresh'):
+            for symbol in self.feed.symbols:
+                try:
+                    if self.candle_store:
+                        records = self.candle_store.sync(self.exchange, symbol, self.feed.timeframe, self.feed.capacity)
+                    else:
+                        records = to_records(
+                            self.exchange.fetch_ohlcv(symbol, self.feed.timeframe, limit=self.feed.capacity)
+                        )
+                    self.feed.write(symbol, records)
+                except Exception as e:
+                    logging.error(f"Ошибка загрузки свечей {symbol} для общего потока: {e}")
+
+    def start(self):
+        def loop():
+            while not self._stop.wait(self.interval):
+                self.refresh()
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def feed_fetcher(bot, feed):
+    """
+    Замена bot.fetch_candles: базовый таймфрейм из общей памяти,
+    остальное (история старших таймфреймов) - обычным запросом к бирже
+    """
+    fallback = bot.fetch_candles
+
+    def fetch_candles(symbol, timeframe, limit, since=None):
+        if timeframe == feed.timeframe and limit <= feed.capacity:
+            candles = feed.read(symbol, limit, since)
+            if candles is not None and len(candles):
+                return candles
+        return fallback(symbol, timeframe, limit, since)
+
+    return fetch_candles
+
+
+def load_accounts(path=None):
+    """
+    Аккаунты из JSON-файла SUPERVISOR_ACCOUNTS:
+    [{"name": "main", "api_key": "...", "secret_key": "...", "pairs": ["BTC/USDT"],
+      "workers": 2, "params": {"STOP_LOSS_PCT": 0.03}}]
+    Без файла - один аккаунт из .env с парами TRADING_PAIRS.
+    params переопределяют настройки TradingConfig (другая стратегия на том же или другом ключе).
+    """
+    path = path if path is not None else TradingConfig.SUPERVISOR_ACCOUNTS
+    if not path:
+        return [{'name': 'main', 'api_key': TradingConfig.API_KEY, 'secret_key': TradingConfig.SECRET_KEY}]
+    with open(path) as f:
+        accounts = json.load(f)
+    names = set()
+    for i, account in enumerate(accounts):
+        account.setdefault('name', f'account{i}')
+        if account['name'] in names:
+            raise ValueError(f"Повторяющееся имя аккаунта {account['name']}")
+        names.add(account['name'])
+        unknown = [key for key in account.get('params', {}) if not hasattr(TradingConfig, key)]
+        if unknown:
+            raise ValueError(f"Неизвестные параметры аккаунта {account['name']}: {', '.join(unknown)}")
+    return accounts
+
+
+def shard_symbols(symbols, shards):
+    """
+    Распределение пар по процессам по кругу (без пустых частей)
+    """
+    shards = max(1, min(shards, len(symbols)))
+    return [symbols[i::shards] for i in range(shards)]
+
+
+def worker_path(path, name):
+    """
+    Отдельный файл процесса: state/journal.db -> state/journal-main-0.db
+    (процессы не пишут в один журнал, хранилище сделок и лог)
+    """
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{name}{ext}"
+
+
+def plan_workers(accounts, workers=None):
+    """
+    Описания процессов: пары аккаунта делятся на части, лимиты позиций и
+    суммарного риска аккаунта - поровну между его процессами.
+    Лимит запросов без доли общего потока свечей делится поровну между всеми процессами.
+    """
+    workers = workers if workers is not None else TradingConfig.SUPERVISOR_WORKERS
+    specs = []
+    for account in accounts:
+        params = account.get('params', {})
+        pairs = list(account.get('pairs') or params.get('TRADING_PAIRS') or TradingConfig.TRADING_PAIRS)
+        shards = shard_symbols(pairs, account.get('workers') or workers or os.cpu_count() or 1)
+        max_positions = params.get('MAX_OPEN_POSITIONS', TradingConfig.MAX_OPEN_POSITIONS)
+        max_risk = params.get('MAX_TOTAL_RISK', TradingConfig.MAX_TOTAL_RISK)
+        for i, symbols in enumerate(shards):
+            name = f"{account['name']}-{i}"
+            config = {
+                'JOURNAL_PATH': worker_path(TradingConfig.JOURNAL_PATH, name),
+                'TRADE_STORE_PATH': worker_path(TradingConfig.TRADE_STORE_PATH, name),
+                'LOG_FILE': worker_path(TradingConfig.LOG_FILE, name),
+                'MAX_OPEN_POSITIONS': max(1, -(-max_positions // len(shards))),
+                'MAX_TOTAL_RISK': max_risk / len(shards),
+                # Пары заданы супервизором, свечи приходят из общего потока
+                'SCANNER_ENABLED': False,
+                'CANDLE_CACHE_DIR': '',
+                'API_PORT': 0,
+                'METRICS_PORT': TradingConfig.METRICS_PORT + 1 + len(specs) if TradingConfig.METRICS_PORT else 0,
+            }
+            config.update(params)
+            config['TRADING_PAIRS'] = symbols
+            specs.append({
+                'name': name,
+                'account': account['name'],
+                'api_key': account.get('api_key') or TradingConfig.API_KEY,
+                'secret_key': account.get('secret_key') or TradingConfig.SECRET_KEY,
+                'symbols': symbols,
+                'config': config,
+            })
+    rate_share = (1 - TradingConfig.SUPERVISOR_FEED_RATE_SHARE) / max(len(specs), 1)
+    for spec in specs:
+        spec['processes'] = len(specs)
+        spec['rate_share'] = rate_share
+    return specs
+
+
+def worker_report(bot, name, account):
+    """
+    Состояние процесса для супервизора (без запросов к бирже)
+    """
+    balance = bot.account.cached() or {}
+    usdt = balance.get('USDT') or {}
+    positions = {}
+    for symbol, position in list(bot.positions.items()):
+        series = bot.candle_series.get((symbol, TradingConfig.TIMEFRAME))
+        positions[symbol] = {
+            'size': position['size'],
+            'entry_price': position['entry_price'],
+            'price': float(series.close[-1]) if series is not None and len(series) else position['entry_price'],
+            'stop_loss': position.get('stop_loss'),
+            'take_profit': position.get('take_profit'),
+            'timestamp': to_ms(position.get('timestamp')),
+        }
+    return {
+        'worker': name, 'account': account, 'pid': os.getpid(), 'time': time.time(),
+        'free': usdt.get('free'), 'total': usdt.get('total'), 'positions': positions,
+    }
+
+
+def run_worker(spec, feed_descriptor, reports, stop_event):
+    """
+    Точка входа процесса-бота: настройки шарда, свечи из общей памяти,
+    обычный цикл run_bot с отчетами супервизору во время пауз
+    """
+    for key, value in spec['config'].items():
+        setattr(TradingConfig, key, value)
+    feed = SharedCandleFeed.attach(feed_descriptor)
+    bot = MexcTrendBot(spec['api_key'], spec['secret_key'])
+    bot.symbols = list(spec['symbols'])
+    bot.owned_symbols = set(spec['symbols'])
+    bot.fetch_candles = feed_fetcher(bot, feed)
+    # Лимит запросов MEXC общий для IP: доля общего потока свечей и процессов
+    share_rate_limit(bot.exchange, bot.scheduler, spec['rate_share'])
+
+    def report():
+        try:
+            reports.put_nowait(worker_report(bot, spec['name'], spec['account']))
+        except Exception as e:
+            logging.debug(f"Отчет {spec['name']} не отправлен: {e}")
+
+    def sleep(seconds):
+        deadline = time.monotonic() + seconds
+        while True:
+            report()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if stop_event.wait(min(remaining, HEARTBEAT_INTERVAL)):
+                bot.stop()
+                return
+
+    bot.sleep = sleep
+    logging.info(f"Процесс {spec['name']} запущен: {', '.join(bot.symbols)}")
+    try:
+        bot.run_bot()
+    finally:
+        report()
+        feed.close()
+
+
+class WorkerHandle:
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec['name']
+        self.process = None
+        self.started = 0.0
+        self.last_seen = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.restart_at = 0.0
+        self.report = None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class BotSupervisor:
+    def __init__(self, accounts=None, workers=None, heartbeat_timeout=None, max_restart_delay=None,
+                 feed_exchange=None, clock=time.monotonic):
+        self.specs = plan_workers(load_accounts() if accounts is None else accounts, workers)
+        self.heartbeat_timeout = heartbeat_timeout or TradingConfig.SUPERVISOR_HEARTBEAT_TIMEOUT
+        self.max_restart_delay = max_restart_delay or TradingConfig.SUPERVISOR_MAX_RESTART_DELAY
+        self.clock = clock
+        self.workers = {spec['name']: WorkerHandle(spec) for spec in self.specs}
+
+        symbols = list(dict.fromkeys(symbol for spec in self.specs for symbol in spec['symbols']))
+        capacity = base_history_limit(
+            TradingConfig.TIMEFRAME, TradingConfig.HIGHER_TIMEFRAMES, TradingConfig.HISTORICAL_PERIODS
+        )
+        self.feed = SharedCandleFeed(symbols, TradingConfig.TIMEFRAME, capacity)
+        self.market_feed = MarketFeed(self.feed, feed_exchange)
+        self.reports = _mp.Queue()
+        self.stop_event = _mp.Event()
+        self.running = False
+
+    def _spawn(self, worker):
+        worker.process = _mp.Process(
+            target=run_worker, name=f"bot-{worker.name}",
+            args=(worker.spec, self.feed.descriptor(), self.reports, self.stop_event), daemon=True
+        )
+        worker.process.start()
+        worker.started = worker.last_seen = self.clock()
+        logging.info(f"Запущен процесс {worker.name} (pid {worker.process.pid})")
+
+    def _on_exit(self, worker, reason):
+        """
+        Планирование перезапуска: пауза удваивается при частых падениях
+        """
+        uptime = self.clock() - worker.started
+        worker.failures = 1 if uptime > STABLE_UPTIME else worker.failures + 1
+        delay = min(2 ** (worker.failures - 1), self.max_restart_delay)
+        worker.process = None
+        worker.restart_at = self.clock() + delay
+        worker.restarts += 1
+        metrics.inc('supervisor_restarts_total', worker=worker.name)
+        logging.error(f"Процесс {worker.name} {reason}, перезапуск через {delay:.0f}s")
+
+    def _drain_reports(self):
+        while True:
+            try:
+                report = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers.get(report['worker'])
+            if worker:
+                worker.report = report
+                worker.last_seen = self.clock()
+
+    def check_workers(self):
+        """
+        Запуск, проверка и перезапуск процессов (один проход)
+        """
+        self._drain_reports()
+        now = self.clock()
+        for worker in self.workers.values():
+            if worker.process is None:
+                if now >= worker.restart_at:
+                    self._spawn(worker)
+            elif not worker.process.is_alive():
+                self._on_exit(worker, f"завершился с кодом {worker.process.exitcode}")
+            elif now - worker.last_seen > self.heartbeat_timeout:
+                worker.process.terminate()
+                worker.process.join(5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                self._on_exit(worker, f"не отвечает {now - worker.last_seen:.0f}s")
+        metrics.set_gauge('supervisor_workers_alive', sum(worker.alive for worker in self.workers.values()))
+
+    def status(self):
+        """
+        Сводка по процессам: баланс USDT по аккаунтам (последний отчет любого
+        процесса аккаунта) и все открытые позиции
+        """
+        accounts = {}
+        positions = []
+        workers = {}
+        for worker in self.workers.values():
+            report = worker.report
+            workers[worker.name] = {
+                'alive': worker.alive, 'pid': worker.process.pid if worker.process else None,
+                'symbols': worker.spec['symbols'], 'restarts': worker.restarts,
+                'last_seen': self.clock() - worker.last_seen if worker.last_seen else None,
+            }
+            if not report:
+                continue
+            current = accounts.get(report['account'])
+            if report['total'] is not None and (current is None or report['time'] > current['time']):
+                accounts[report['account']] = {'free': report['free'], 'total': report['total'], 'time': report['time']}
+            for symbol, position in report['positions'].items():
+                positions.append(dict(position, symbol=symbol, account=report['account'], worker=worker.name))
+        return {
+            'workers': workers,
+            'accounts': {name: {'free': a['free'], 'total': a['total']} for name, a in accounts.items()},
+            'total_balance': sum(a['total'] for a in accounts.values()),
+            'positions': positions,
+        }
+
+    def publish(self, log=False):
+        status = self.status()
+        for name, account in status['accounts'].items():
+            metrics.set_gauge('account_balance_usdt', account['total'], account=name)
+        metrics.set_gauge('open_positions', len(status['positions']))
+        if log:
+            alive = sum(worker['alive'] for worker in status['workers'].values())
+            logging.info(
+                f"[SUPERVISOR] процессов {alive}/{len(status['workers'])}, "
+                f"баланс USDT {status['total_balance']:.2f}, позиций {len(status['positions'])}"
+            )
+        return status
+
+    def start(self):
+        """
+        Первая загрузка свечей (чтобы процессы сразу получили данные) и запуск процессов
+        """
+        logging.info(f"Супервизор: {len(self.specs)} процессов, {len(self.feed.symbols)} пар")
+        self.market_feed.refresh()
+        self.market_feed.start()
+        self.running = True
+        self.check_workers()
+
+    def run(self):
+        """
+        Основной цикл супервизора до Ctrl+C или stop()
+        """
+        self.start()
+        last_log = 0.0
+        try:
+            while self.running:
+                self.check_workers()
+                log = self.clock() - last_log >= TradingConfig.CHECK_INTERVAL
+                self.publish(log)
+                if log:
+                    last_log = self.clock()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info("Остановка супервизора...")
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self.running = False
+
+    def shutdown(self, timeout=30):
+        """
+        Остановка процессов после текущего цикла (принудительно по истечении timeout)
+        """
+        self.running = False
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(max(deadline - time.monotonic(), 0))
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(5)
+                worker.process = None
+        self._drain_reports()
+        self.market_feed.stop()
+        self.feed.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запуск ботов в нескольких процессах')
+    parser.add_argument('--workers', type=int, default=None, help='процессов на аккаунт (0 - по числу ядер)')
+    parser.add_argument('--accounts', default=None, help='JSON-файл аккаунтов (по умолчанию SUPERVISOR_ACCOUNTS)')
+    parser.add_argument('--plan', action='store_true', help='только показать распределение пар')
+    args = parser.parse_args()
+
+    configure_logging()
+    accounts = load_accounts(args.accounts)
+    if args.plan:
+        for spec in plan_workers(accounts, args.workers):
+            print(f"{spec['name']}: {', '.join(spec['symbols'])}")
+        return
+
+    supervisor = BotSupervisor(accounts, args.workers)
+    if TradingConfig.METRICS_PORT:
+        metrics.start_http_server(TradingConfig.METRICS_PORT)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import sys
+
+import numpy as np
+
+# Модули бота лежат плоско в src/python-script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Тесты не пишут состояние бота (журнал, сделки, кэши) в рабочий каталог
+# и не поднимают HTTP-эндпоинты. Переменные задаются до импорта config.
+for _name in ('JOURNAL_PATH', 'TRADE_STORE_PATH', 'CANDLE_CACHE_DIR', 'MARKETS_CACHE_PATH', 'SUPERVISOR_ACCOUNTS'):
+    os.environ[_name] = ''
+for _name in ('API_PORT', 'METRICS_PORT', 'METRICS_SUMMARY_INTERVAL'):
+    os.environ[_name] = '0'
+os.environ['LOG_FILE'] = os.devnull
+os.environ['SANDBOX_MODE'] = 'false'
+
+MINUTE_MS = 60_000
+START_MS = 1_700_000_000_000 // MINUTE_MS * MINUTE_MS
+
+
+def make_candles(closes, start=START_MS, step=MINUTE_MS, spread=0.001):
+    """
+    Свечи ccxt [ts, open, high, low, close, volume] по ценам закрытия:
+    open - закрытие предыдущей свечи, high/low - на spread шире тела
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + spread)
+    lows = np.minimum(opens, closes) * (1 - spread)
+    return [
+        [start + i * step, float(o), float(h), float(l), float(c), 10.0]
+        for i, (o, h, l, c) in enumerate(zip(opens, highs, lows, closes))
+    ]
+
+
+def random_walk(n, seed=1, start=100.0, volatility=0.01):
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+
+
+class StubExchange:
+    """
+    Биржа в памяти для тестов исполнения ордеров.
+    failures - исключения, которые метод выбросит при следующих вызовах;
+    lost_responses - сколько раз create_order примет ордер, но ответ «потеряется».
+    """
+    def __init__(self, has=None, price=100.0):
+        self.has = dict(has or {})
+        self.price = price
+        self.orders = {}
+        self.calls = []
+        self.failures = {}
+        self.lost_responses = 0
+        self.time = START_MS
+
+    def _call(self, method):
+        self.calls.append(method)
+        errors = self.failures.get(method)
+        if errors:
+            raise errors.pop(0)
+
+    def milliseconds(self):
+        return self.time
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        import ccxt
+
+        self._call('create_order')
+        params = params or {}
+        order = {
+            'id': str(len(self.orders) + 1), 'clientOrderId': params.get('clientOrderId'), 'symbol': symbol,
+            'type': type, 'side': side, 'amount': amount, 'price': price, 'stopPrice': params.get('stopPrice'),
+            'status': 'open', 'filled': 0.0, 'average': None, 'timestamp': self.time,
+        }
+        self.orders[order['id']] = order
+        if type == 'market' and not order['stopPrice']:
+            self.fill(order['id'], self.price)
+        if self.lost_responses:
+            self.lost_responses -= 1
+            raise ccxt.NetworkError('connection reset')
+        return dict(order)
+
+    def create_orders(self, orders, params=None):
+        self._call('create_orders')
+        return [self.create_order(o['symbol'], o['type'], o['side'], o['amount'], o.get('price'), o.get('params'))
+                for o in orders]
+
+    def fill(self, id, price, ts=None):
+        order = self.orders[id]
+        order.update(status='closed', filled=order['amount'], average=price, lastTradeTimestamp=ts or self.time)
+        return order
+
+    def cancel_order(self, id, symbol=None, params=None):
+        import ccxt
+
+        self._call('cancel_order')
+        order = self.orders.get(id)
+        if not order or order['status'] != 'open':
+            raise ccxt.OrderNotFound(id)
+        order['status'] = 'canceled'
+        return dict(order)
+
+    def cancel_orders(self, ids, symbol=None, params=None):
+        self._call('cancel_orders')
+        for id in ids:
+            if self.orders[id]['status'] == 'open':
+                self.orders[id]['status'] = 'canceled'
+        return [dict(self.orders[id]) for id in ids]
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._call('fetch_order')
+        return dict(self.orders[id])
+
+    def _by_status(self, symbol, status):
+        return [dict(o) for o in self.orders.values() if o['status'] == status and (symbol is None or o['symbol'] == symbol)]
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._call('fetch_open_orders')
+        return self._by_status(symbol, 'open')
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._call('fetch_closed_orders')
+        return self._by_status(symbol, 'closed')[-limit:] if limit else self._by_status(symbol, 'closed')
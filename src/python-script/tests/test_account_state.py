@@ -0,0 +1,67 @@
+from candle_store import to_records
+from conftest import MINUTE_MS, START_MS, make_candles
+from account_state import AccountState
+from mexc_trading_bot import MexcTrendBot
+from simulator import SimulatedExchange
+
+SYMBOL = 'BTC/USDT'
+
+
+class CountingExchange:
+    def __init__(self, balance):
+        self.balance = balance
+        self.calls = 0
+
+    def fetch_balance(self):
+        self.calls += 1
+        return {currency: dict(entry) for currency, entry in self.balance.items()}
+
+
+def test_balance_is_cached_until_ttl():
+    now = [0.0]
+    exchange = CountingExchange({'USDT': {'free': 100.0, 'used': 0.0, 'total': 100.0}})
+    account = AccountState(exchange, ttl=10, clock=lambda: now[0])
+
+    account.get_balance()
+    now[0] = 5.0
+    account.get_balance()
+    assert exchange.calls == 1
+
+    now[0] = 11.0
+    account.get_balance()
+    assert exchange.calls == 2
+    account.get_balance(force=True)
+    assert exchange.calls == 3
+
+
+def test_own_order_response_updates_balance_locally():
+    exchange = CountingExchange({'USDT': {'free': 1000.0, 'used': 0.0, 'total': 1000.0}})
+    account = AccountState(exchange, ttl=60)
+    account.get_balance()
+
+    account.on_order(SYMBOL, 'buy', {'filled': 2.0, 'average': 100.0, 'fee': {'cost': 0.2}})
+    balance = account.get_balance()
+    assert exchange.calls == 1
+    assert balance['USDT']['free'] == 1000.0 - 200.2
+    assert balance['BTC'] == {'free': 2.0, 'used': 0.0, 'total': 2.0}
+
+    # Без данных об исполнении кэш сбрасывается
+    account.on_order(SYMBOL, 'sell', {})
+    assert account.cached() is None
+
+
+def test_bracket_fill_refetches_balance(tmp_path):
+    exchange = SimulatedExchange({SYMBOL: to_records(make_candles([100.0] * 6 + [90.0] * 10))},
+                                 base_timeframe='1m', slippage=0.0)
+    exchange.advance(START_MS + MINUTE_MS)
+    bot = exchange.attach(MexcTrendBot(exchange=exchange, persist=False))
+    bracket = bot.executor.open_bracket(SYMBOL, 1.0, 0.05, 0.10, 100.0)
+    bot.positions[SYMBOL] = dict(bracket, timestamp=bot.now(), risk=0.0, regime='UPTREND')
+    bot.get_balance()
+
+    exchange.advance(START_MS + 12 * MINUTE_MS)
+    assert list(bot.check_brackets()) == [SYMBOL]
+
+    # Баланс после stop-loss берется с биржи, а не пересчитывается по резерву, о котором бот не знает
+    assert bot.account.cached() is None
+    assert bot.get_balance() == exchange.fetch_balance()
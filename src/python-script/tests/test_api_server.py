@@ -0,0 +1,105 @@
+import json
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from api_server import MAX_LIMIT, ApiServer
+from candle_series import CandleSeries
+from config import TradingConfig
+from conftest import START_MS, make_candles
+from trade_store import DAY_MS, HOUR_MS, TradeStore
+
+DAY_START = START_MS // DAY_MS * DAY_MS
+
+
+def trade(symbol, exit_time, pnl):
+    return {'symbol': symbol, 'entry_time': exit_time - HOUR_MS, 'exit_time': exit_time,
+            'entry_price': 100.0, 'exit_price': 100.0 + pnl, 'size': 1.0, 'pnl': pnl, 'regime': 'UPTREND'}
+
+
+class FakeBot:
+    def __init__(self):
+        series = CandleSeries(10)
+        series.extend(make_candles([100.0, 110.0]))
+        self.candle_series = {('BTC/USDT', TradingConfig.TIMEFRAME): series}
+        self.positions = {
+            'BTC/USDT': {'entry_price': 100.0, 'size': 2.0, 'stop_loss': 95.0, 'take_profit': 110.0,
+                         'timestamp': START_MS},
+            'ETH/USDT': {'entry_price': 50.0, 'size': 1.0, 'timestamp': START_MS},
+        }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TradeStore(str(tmp_path / 'trades.db'))
+    store.record_trades([
+        trade('BTC/USDT', DAY_START + HOUR_MS, 10.0),
+        trade('ETH/USDT', DAY_START + 2 * HOUR_MS, -4.0),
+        trade('BTC/USDT', DAY_START + DAY_MS, 6.0),
+    ], source='live')
+    yield store
+    store.close()
+
+
+def test_routes_query_trade_store(store):
+    api = ApiServer(store)
+
+    status, trades = api.handle('/api/trades', {'limit': ['2']})
+    assert status == 200
+    assert [t['exit_time'] for t in trades] == [DAY_START + DAY_MS, DAY_START + 2 * HOUR_MS]
+    # Следующая страница - сделки раньше последней полученной
+    _, older = api.handle('/api/trades/', {'before': [str(trades[-1]['exit_time'])]})
+    assert [t['pnl'] for t in older] == [10.0]
+
+    _, summary = api.handle('/api/stats/summary', {'since': [str(DAY_START + DAY_MS)]})
+    assert summary['trades'] == 1
+    _, equity = api.handle('/api/stats/equity', {'initial': ['1000']})
+    assert [day['equity'] for day in equity] == [1006.0, 1012.0]
+    _, symbols = api.handle('/api/stats/symbols', {})
+    assert {row['symbol']: row['pnl'] for row in symbols} == {'BTC/USDT': 16.0, 'ETH/USDT': -4.0}
+
+
+def test_bad_requests(store):
+    api = ApiServer(store)
+
+    assert api.handle('/api/unknown', {}) == (404, {'error': 'not found'})
+    assert api.handle('/api/trades', {'limit': ['abc']})[0] == 400
+    # Без хранилища сделок доступен только портфель
+    assert ApiServer(None).handle('/api/trades', {})[0] == 404
+    assert ApiServer(None).handle('/api/portfolio', {}) == (200, [])
+
+
+def test_limit_is_capped(store, monkeypatch):
+    calls = []
+    monkeypatch.setattr(store, 'recent_trades', lambda limit, symbol, before: calls.append(limit) or [])
+
+    ApiServer(store).handle('/api/trades', {'limit': [str(MAX_LIMIT * 10)]})
+    assert calls == [MAX_LIMIT]
+
+
+def test_portfolio_uses_last_known_price():
+    _, portfolio = ApiServer(None, FakeBot()).handle('/api/portfolio', {})
+    by_symbol = {row['symbol']: row for row in portfolio}
+
+    assert by_symbol['BTC/USDT']['price'] == 110.0
+    assert by_symbol['BTC/USDT']['value'] == 220.0
+    assert by_symbol['BTC/USDT']['change'] == pytest.approx(10.0)
+    # Нет свечей пары - цена входа
+    assert by_symbol['ETH/USDT']['price'] == 50.0
+
+
+def test_http_server_serves_json(store):
+    api = ApiServer(store)
+    server = api.start(0)
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        response = urlopen(f"{base}/api/stats/summary", timeout=5)
+        assert response.headers['Access-Control-Allow-Origin'] == TradingConfig.API_CORS_ORIGIN
+        assert json.loads(response.read())['trades'] == 3
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base}/api/missing", timeout=5)
+        assert error.value.code == 404
+    finally:
+        api.stop()
+        server.server_close()
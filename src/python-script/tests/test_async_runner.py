@@ -0,0 +1,56 @@
+import asyncio
+
+from async_runner import AsyncBotRunner
+from candle_series import CandleSeries
+from candle_store import to_records
+from config import TradingConfig
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+from mexc_trading_bot import MexcTrendBot
+from simulator import SimulatedExchange
+
+SYMBOL = 'BTC/USDT'
+
+
+class AsyncCandles:
+    """
+    Асинхронный клиент поверх SimulatedExchange: только fetch_ohlcv с записью запросов
+    """
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.requests = []
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self.requests.append((since, limit))
+        return self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+
+def test_async_analysis_uses_candle_series(monkeypatch):
+    monkeypatch.setattr(TradingConfig, 'TIMEFRAME', '1m')
+    candles = make_candles(random_walk(400), step=MINUTE_MS)
+    exchange = SimulatedExchange({SYMBOL: to_records(candles)}, base_timeframe='1m')
+    exchange.advance(START_MS + 300 * MINUTE_MS)
+    bot = exchange.attach(MexcTrendBot(exchange=exchange))
+    bot.higher_timeframes = []
+    reference = exchange.attach(MexcTrendBot(exchange=exchange))
+    reference.higher_timeframes = []
+
+    async def run():
+        runner = AsyncBotRunner(bot, max_concurrency=2)
+        await runner.exchange.close()
+        runner.exchange = AsyncCandles(exchange)
+        runner.semaphore = asyncio.Semaphore(2)
+        results = []
+        for step in range(3):
+            exchange.advance(START_MS + (300 + step * 5) * MINUTE_MS)
+            results.append((await runner.analyze_trend(SYMBOL), reference.analyze_trend(SYMBOL)))
+        return runner, results
+
+    runner, results = asyncio.run(run())
+
+    assert isinstance(bot.candle_series[(SYMBOL, '1m')], CandleSeries)
+    # После первой загрузки запрашиваются только свечи с последней известной
+    assert runner.exchange.requests[0][0] is None
+    assert all(since is not None for since, _ in runner.exchange.requests[1:])
+    for analysis, expected in results:
+        assert analysis is not None
+        assert analysis == expected
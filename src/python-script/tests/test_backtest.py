@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from backtest import EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, ohlcv_to_arrays, simulate_trades
+from conftest import MINUTE_MS, START_MS
+from tick_kernel import _first_crosses_loop, _first_crosses_numpy, to_ticks
+
+PARAMS = {'stop_loss_pct': 0.05, 'take_profit_pct': 0.10, 'risk_per_trade': 0.02}
+SLIPPAGE = 0.001
+# Вход по закрытию бара 0 по 100: stop-loss 95, take-profit 110.
+# Бар 2 задевает оба уровня - по свечам неизвестно, какой сработал первым.
+BARS = [
+    [START_MS, 100.0, 100.5, 99.5, 100.0, 1.0],
+    [START_MS + MINUTE_MS, 100.0, 100.5, 99.5, 100.0, 1.0],
+    [START_MS + 2 * MINUTE_MS, 100.0, 112.0, 92.0, 100.0, 1.0],
+    [START_MS + 3 * MINUTE_MS, 100.0, 100.5, 99.5, 100.0, 1.0],
+]
+
+
+def run(ticks=None):
+    data = ohlcv_to_arrays(BARS)
+    buy_mask = np.zeros(len(BARS), dtype=bool)
+    buy_mask[0] = True
+    trades, _ = simulate_trades(data, buy_mask, np.zeros(len(BARS), dtype=bool), PARAMS,
+                                ticks=ticks, slippage=SLIPPAGE)
+    assert len(trades) == 1
+    return trades[0]
+
+
+def bar_ticks(bar, prices):
+    start = START_MS + bar * MINUTE_MS
+    return [start + i * 1000 for i in range(len(prices))], prices
+
+
+def make_ticks(*bars):
+    timestamps, prices = zip(*(bar_ticks(bar, p) for bar, p in bars))
+    return to_ticks(np.concatenate(timestamps), np.concatenate(prices))
+
+
+def test_bars_assume_stop_loss_first():
+    trade = run()
+    assert trade['reason'] == EXIT_STOP_LOSS
+    assert trade['exit_price'] == pytest.approx(95.0)
+    assert trade['exit_time'] == START_MS + 2 * MINUTE_MS
+
+
+def test_ticks_take_profit_first():
+    trade = run(make_ticks((1, [100.0, 100.2]), (2, [100.0, 105.0, 111.0, 93.0]), (3, [100.0])))
+    assert trade['reason'] == EXIT_TAKE_PROFIT
+    # Лимитный ордер исполняется по своей цене, время выхода - время тика
+    assert trade['exit_price'] == pytest.approx(110.0)
+    assert trade['exit_time'] == START_MS + 2 * MINUTE_MS + 2000
+
+
+def test_ticks_stop_loss_gap_with_slippage():
+    trade = run(make_ticks((1, [100.0]), (2, [100.0, 94.0, 111.0]), (3, [100.0])))
+    assert trade['reason'] == EXIT_STOP_LOSS
+    assert trade['exit_price'] == pytest.approx(94.0 * (1 - SLIPPAGE))
+    assert trade['exit_time'] == START_MS + 2 * MINUTE_MS + 1000
+
+
+def test_ticks_before_entry_close_are_ignored():
+    # Тик бара входа за уровнем не закрывает сделку
+    trade = run(make_ticks((0, [100.0, 120.0]), (1, [100.0]), (2, [94.0]), (3, [100.0])))
+    assert trade['reason'] == EXIT_STOP_LOSS
+    assert trade['exit_time'] == START_MS + 2 * MINUTE_MS
+
+
+def test_bars_after_end_of_ticks():
+    trade = run(make_ticks((1, [100.0, 100.2])))
+    assert trade == run()
+
+
+def test_tick_kernel_loop_matches_numpy():
+    rng = np.random.default_rng(7)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, 20_000)))
+    starts = rng.integers(0, len(prices), 50)
+    ends = np.minimum(starts + rng.integers(0, 10_000, 50), len(prices))
+    belows = prices[starts] * (1 - rng.uniform(0.0, 0.05, 50))
+    aboves = prices[starts] * (1 + rng.uniform(0.0, 0.05, 50))
+    belows[:5], aboves[5:10] = -np.inf, np.inf
+
+    loop = _first_crosses_loop(prices, starts, ends, belows, aboves)
+    vectorized = _first_crosses_numpy(prices, starts, ends, belows, aboves)
+
+    assert loop[0].tolist() == vectorized[0].tolist()
+    assert loop[1].tolist() == vectorized[1].tolist()
+    assert (loop[0] >= 0).any() and (loop[0] < 0).any()
@@ -0,0 +1,15 @@
+from benchmark import SyntheticExchange, make_bot
+from config import TradingConfig
+
+
+def test_make_bot_does_not_create_live_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(TradingConfig, 'JOURNAL_PATH', 'state/journal.db')
+    monkeypatch.setattr(TradingConfig, 'TRADE_STORE_PATH', 'state/trades.db')
+    monkeypatch.setattr(TradingConfig, 'CANDLE_CACHE_DIR', 'candle_cache')
+
+    bot = make_bot(SyntheticExchange.synthetic(['SYM0/USDT'], 50), ['SYM0/USDT'])
+    bot.executor.pool.shutdown(wait=False)
+
+    assert bot.journal is None and bot.trade_store is None and bot.candle_store is None
+    assert list(tmp_path.iterdir()) == []
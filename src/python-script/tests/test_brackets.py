@@ -0,0 +1,64 @@
+import pytest
+
+from candle_store import to_records
+from conftest import MINUTE_MS, START_MS, make_candles
+from journal import REASON_STOP_LOSS, REASON_TAKE_PROFIT, TradeJournal
+from mexc_trading_bot import MexcTrendBot
+from simulator import SimulatedExchange
+from trade_store import TradeStore
+
+SYMBOL = 'BTC/USDT'
+
+
+def make_bot(tmp_path, closes):
+    exchange = SimulatedExchange({SYMBOL: to_records(make_candles(closes))}, base_timeframe='1m', slippage=0.0)
+    exchange.advance(START_MS + MINUTE_MS)
+    bot = exchange.attach(MexcTrendBot(exchange=exchange))
+    bot.symbols = [SYMBOL]
+    bot.trade_store = TradeStore(str(tmp_path / 'trades.db'))
+    bot.journal = TradeJournal(str(tmp_path / 'journal.db'))
+    return bot, exchange
+
+
+def open_position(bot):
+    bracket = bot.executor.open_bracket(SYMBOL, 1.0, 0.05, 0.10, 100.0)
+    bot.positions[SYMBOL] = dict(bracket, timestamp=bot.now(), risk=0.0, regime='UPTREND')
+    return bracket
+
+
+@pytest.mark.parametrize('exit_price, reason', [(90.0, REASON_STOP_LOSS), (120.0, REASON_TAKE_PROFIT)])
+def test_bracket_exit_is_recorded_with_fill_time(tmp_path, exit_price, reason):
+    # Цена держится 5 свечей, затем уходит за уровень защитного ордера
+    bot, exchange = make_bot(tmp_path, [100.0] * 6 + [exit_price] * 10)
+    # Запас монеты на счете: оба защитных ордера на полный объем проходят резервирование
+    exchange.balances['BTC'] = 1.0
+    open_position(bot)
+
+    exchange.advance(START_MS + 12 * MINUTE_MS)
+    closed = bot.check_brackets()
+
+    assert list(closed) == [SYMBOL]
+    assert closed[SYMBOL][2] == reason
+    assert SYMBOL not in bot.positions
+    # Второй защитный ордер отменен, на бирже ничего не осталось
+    assert exchange.fetch_open_orders(SYMBOL) == []
+
+    trade = bot.trade_store.recent_trades()[0]
+    assert trade['reason'] == reason
+    # Время закрытия - конец свечи, на которой сработал ордер, а не время проверки
+    assert trade['exit_time'] == START_MS + 7 * MINUTE_MS
+    assert trade['exit_time'] < exchange.now
+    fill = bot.trade_store.recent_fills()[0]
+    assert fill['role'] == ('stop' if reason == REASON_STOP_LOSS else 'take')
+    assert fill['ts'] == trade['exit_time']
+    assert bot.journal.load_state() == {}
+
+
+def test_open_brackets_keep_position(tmp_path):
+    bot, exchange = make_bot(tmp_path, [100.0] * 20)
+    open_position(bot)
+    exchange.advance(START_MS + 10 * MINUTE_MS)
+
+    assert bot.check_brackets() == {}
+    assert SYMBOL in bot.positions
+    assert bot.trade_store.recent_trades() == []
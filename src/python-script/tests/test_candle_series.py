@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from candle_series import CandleSeries
+from conftest import MINUTE_MS, make_candles, random_walk
+
+CAPACITY = 5
+
+
+def assert_series(series, candles):
+    expected = np.asarray(candles, dtype=np.float64)
+    assert len(series) == len(candles)
+    assert series.timestamp.tolist() == expected[:, 0].astype(np.int64).tolist()
+    for i, field in enumerate(('open', 'high', 'low', 'close', 'volume'), start=1):
+        assert series[field].tolist() == expected[:, i].tolist()
+    assert series.last_timestamp == int(expected[-1, 0])
+
+
+@pytest.mark.parametrize('total', [CAPACITY - 1, CAPACITY, CAPACITY + 1, 3 * CAPACITY + 2])
+def test_append_wraps_around(total):
+    candles = make_candles(random_walk(total))
+    series = CandleSeries(CAPACITY)
+    for count, candle in enumerate(candles, start=1):
+        assert series.append(*candle)
+        assert_series(series, candles[max(0, count - CAPACITY):count])
+
+
+def test_extend_across_boundary_matches_append():
+    candles = make_candles(random_walk(4 * CAPACITY))
+    appended, extended = CandleSeries(CAPACITY), CandleSeries(CAPACITY)
+    for candle in candles:
+        appended.append(*candle)
+    # Пачки разного размера, в том числе больше емкости и с перекрытием уже записанных свечей
+    for lo, hi in ((0, 3), (1, 4), (4, 11), (9, 20)):
+        extended.extend(candles[lo:hi])
+
+    assert_series(extended, candles[-CAPACITY:])
+    assert extended.to_records().tolist() == appended.to_records().tolist()
+
+
+def test_update_of_unclosed_candle_after_wraparound():
+    candles = make_candles(random_walk(CAPACITY + 3))
+    series = CandleSeries(CAPACITY)
+    series.extend(candles)
+    updated = list(candles[-1])
+    updated[4] += 1.0
+
+    assert series.append(*updated)
+    assert not series.append(*candles[0])
+    assert series.extend([candles[-2], updated]) == 0
+
+    assert_series(series, candles[-CAPACITY:-1] + [updated])
+
+
+def test_columns_are_read_only_views():
+    series = CandleSeries(CAPACITY)
+    series.extend(make_candles(random_walk(CAPACITY + 2)))
+    close = series.close
+    with pytest.raises(ValueError):
+        close[0] = 0.0
+    assert np.all(np.diff(series.timestamp) == MINUTE_MS)
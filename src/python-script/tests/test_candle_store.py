@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+
+import candle_store
+from candle_store import CandleStore, to_records
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+
+SYMBOL = 'BTC/USDT'
+
+
+class OhlcvExchange:
+    """
+    Биржа со свечами 1m: свечи с открытием не позже now, последняя из них может быть незакрытой
+    """
+    def __init__(self, candles, now):
+        self.candles = candles
+        self.now = now
+        self.requests = []
+
+    def milliseconds(self):
+        return self.now
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None, params=None):
+        self.requests.append(since)
+        available = [c for c in self.candles if c[0] <= self.now]
+        if since is None:
+            return available[-limit:]
+        return [c for c in available if c[0] >= since][:limit]
+
+
+class AsyncOhlcvExchange(OhlcvExchange):
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None, params=None):
+        return OhlcvExchange.fetch_ohlcv(self, symbol, timeframe, since, limit, params)
+
+
+def minute(i):
+    return START_MS + i * MINUTE_MS
+
+
+def candles(count=200):
+    return make_candles(random_walk(count))
+
+
+def test_sync_fetches_only_new_candles(tmp_path):
+    exchange = OhlcvExchange(candles(), minute(50) + 1000)
+    store = CandleStore(str(tmp_path))
+
+    first = store.sync(exchange, SYMBOL, '1m', 20)
+    # Незакрытая свеча 50 возвращается, но не сохраняется
+    assert list(first['timestamp']) == [minute(i) for i in range(31, 51)]
+    assert store.last_timestamp(SYMBOL, '1m') == minute(49)
+
+    exchange.now = minute(55) + 1000
+    second = store.sync(exchange, SYMBOL, '1m', 20)
+    assert exchange.requests == [None, minute(50)]
+    assert list(second['timestamp']) == [minute(i) for i in range(36, 56)]
+    np.testing.assert_array_equal(second, to_records(exchange.candles[36:56]))
+    assert list(store.load(SYMBOL, '1m')['timestamp']) == [minute(i) for i in range(31, 55)]
+
+
+def test_sync_pages_through_long_gap(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, 'FETCH_LIMIT', 10)
+    exchange = OhlcvExchange(candles(), minute(10) + 1000)
+    store = CandleStore(str(tmp_path))
+    store.sync(exchange, SYMBOL, '1m', 10)
+
+    exchange.now = minute(45) + 1000
+    result = store.sync(exchange, SYMBOL, '1m', 10)
+
+    assert exchange.requests[1:] == [minute(10), minute(20), minute(30), minute(40)]
+    assert list(store.load(SYMBOL, '1m')['timestamp']) == [minute(i) for i in range(1, 45)]
+    assert result['timestamp'][-1] == minute(45)
+
+
+def test_async_sync_matches_sync(tmp_path):
+    data = candles()
+    sync_exchange = OhlcvExchange(data, minute(40) + 1000)
+    async_exchange = AsyncOhlcvExchange(data, minute(40) + 1000)
+    sync_store, async_store = CandleStore(str(tmp_path / 'sync')), CandleStore(str(tmp_path / 'async'))
+
+    for now in (minute(40) + 1000, minute(47) + 1000):
+        sync_exchange.now = async_exchange.now = now
+        expected = sync_store.sync(sync_exchange, SYMBOL, '1m', 15)
+        result = asyncio.run(async_store.sync_async(async_exchange, SYMBOL, '1m', 15))
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_backfill_adds_older_and_newer_history(tmp_path):
+    exchange = OhlcvExchange(candles(), minute(100) + 1000)
+    store = CandleStore(str(tmp_path))
+    store.append(SYMBOL, '1m', to_records(exchange.candles[50:60]))
+
+    store.backfill(exchange, SYMBOL, '1m', minute(20))
+
+    # Старые свечи дописаны перед сохраненными, новые - после, незакрытая не сохранена
+    timestamps = store.load(SYMBOL, '1m')['timestamp']
+    assert list(timestamps) == [minute(i) for i in range(20, 100)]
+    assert store.last_timestamp(SYMBOL, '1m') == minute(99)
+    np.testing.assert_array_equal(store.load_range(SYMBOL, '1m', minute(55), minute(58)),
+                                  to_records(exchange.candles[55:58]))
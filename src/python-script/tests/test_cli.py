@@ -0,0 +1,56 @@
+import ccxt
+import pytest
+
+import cli
+import env_validator
+import scanner
+from candle_store import to_records
+from config import TradingConfig
+from conftest import MINUTE_MS, START_MS, make_candles
+from metrics import Metrics
+from simulator import SimulatedExchange
+
+
+class FakeScanner:
+    def __init__(self, bot, shortlist_size=None):
+        self.bot = bot
+        self.last_ranking = []
+
+    def scan(self):
+        return []
+
+
+def test_scan_does_not_open_persistent_state(monkeypatch, tmp_path, capsys):
+    exchange = SimulatedExchange({'BTC/USDT': to_records(make_candles([100.0] * 10))}, base_timeframe='1m')
+    exchange.advance(START_MS + MINUTE_MS)
+    monkeypatch.setattr(ccxt, 'mexc', lambda config: exchange)
+    monkeypatch.setattr(scanner, 'MarketScanner', FakeScanner)
+    monkeypatch.setattr(TradingConfig, 'JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    monkeypatch.setattr(TradingConfig, 'TRADE_STORE_PATH', str(tmp_path / 'trades.db'))
+    monkeypatch.setattr(TradingConfig, 'CANDLE_CACHE_DIR', str(tmp_path / 'candles'))
+
+    assert cli.main(['scan']) == 0
+    assert 'Выбрано: -' in capsys.readouterr().out
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('valid, code', [(True, 0), (False, 1)])
+def test_validate_exit_code(monkeypatch, valid, code):
+    monkeypatch.setattr(env_validator, 'validate_env_file', lambda: valid)
+    assert cli.main(['validate']) == code
+
+
+def test_health_checks_metrics_endpoint(monkeypatch):
+    server = Metrics().start_http_server(0)
+    try:
+        monkeypatch.setattr(TradingConfig, 'METRICS_PORT', server.server_port)
+        assert cli.main(['health']) == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Бот не отвечает
+    assert cli.main(['health', '--timeout', '1']) == 1
+    monkeypatch.setattr(TradingConfig, 'METRICS_PORT', 0)
+    monkeypatch.setattr(TradingConfig, 'API_PORT', 0)
+    assert cli.main(['health']) == 2
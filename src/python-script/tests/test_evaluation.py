@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+
+from backtest import ohlcv_to_arrays
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+from evaluation import chain_windows, monte_carlo, slice_data, walk_forward
+from optimizer import evaluate_params
+from utils import PerformanceTracker
+
+
+def tracker(pnls):
+    tracker = PerformanceTracker(1000.0)
+    tracker.add_trades([{'pnl': pnl, 'exit_time': START_MS + i * MINUTE_MS} for i, pnl in enumerate(pnls)])
+    return tracker
+
+
+def test_profit_factor_without_losses_is_serializable():
+    stats = tracker([5.0, 3.0]).get_statistics()
+
+    assert stats['profit_factor'] is None
+    # Отчет evaluation должен оставаться строгим JSON (без Infinity)
+    assert json.loads(json.dumps(stats, allow_nan=False))['profit_factor'] is None
+
+
+def test_profit_factor():
+    assert tracker([6.0, -2.0, -1.0]).get_profit_factor() == pytest.approx(2.0)
+    assert tracker([]).get_profit_factor() is None
+
+
+HOUR_MS = 60 * MINUTE_MS
+BASE_PARAMS = {
+    'ma_short': 5, 'ma_medium': 10, 'ma_long': 20, 'rsi_period': 14, 'rsi_oversold': 30, 'rsi_overbought': 70,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9, 'take_profit_pct': 0.03, 'risk_per_trade': 0.02,
+}
+COMBINATIONS = [dict(BASE_PARAMS, stop_loss_pct=0.01), dict(BASE_PARAMS, stop_loss_pct=0.05)]
+
+
+def history(symbols=('BTC/USDT', 'ETH/USDT'), days=8):
+    return {
+        symbol: ohlcv_to_arrays(make_candles(random_walk(days * 24, seed=i, volatility=0.02), step=HOUR_MS))
+        for i, symbol in enumerate(symbols)
+    }
+
+
+@pytest.mark.parametrize('sort_by', ['return_pct', 'max_drawdown_pct'])
+def test_walk_forward_picks_best_params_in_metric_direction(sort_by):
+    data = history()
+    report = walk_forward(data, COMBINATIONS, train_days=2, test_days=1, workers=1, sort_by=sort_by)
+
+    assert len(report['windows']) == 5
+    for window in report['windows']:
+        train = slice_data(data, window['train_start'], window['train_end'])
+        scores = [evaluate_params(params, train, 10000, 0.001)[sort_by] for params in COMBINATIONS]
+        best = min(scores) if sort_by == 'max_drawdown_pct' else max(scores)
+        assert window['in_sample'][sort_by] == pytest.approx(best)
+
+
+def test_walk_forward_windows_share_capital():
+    report = walk_forward(history(), COMBINATIONS, train_days=2, test_days=1, workers=1)
+    assert report['trades']
+
+    # Окна идут подряд на одном капитале: итог - произведение доходностей окон
+    growth = np.prod([1 + window['out_of_sample']['return_pct'] / 100 for window in report['windows']])
+    assert 10000 + report['stats']['total_pnl'] == pytest.approx(10000 * growth)
+    # Капитал первого окна делится поровну между двумя парами
+    first = {}
+    for trade in report['trades']:
+        first.setdefault(trade['symbol'], trade)
+    assert [t['capital'] - t['pnl'] for t in first.values()] == pytest.approx([5000.0] * len(first))
+
+
+def test_chain_windows_scales_to_running_capital():
+    window = {'out_of_sample': {'total_pnl': 1000.0},
+              'trades': [{'size': 1.0, 'pnl': 1000.0, 'capital': 6000.0, 'exit_time': 1}]}
+    trades = chain_windows([window, window], 10000)
+
+    assert [t['pnl'] for t in trades] == [1000.0, 1100.0]
+    assert trades[1]['size'] == pytest.approx(1.1)
+
+
+def test_monte_carlo_without_replacement_keeps_final_return():
+    trades = [{'pnl': pnl, 'exit_time': START_MS + i * MINUTE_MS} for i, pnl in enumerate([100.0, -50.0, 30.0, -20.0])]
+    result = monte_carlo(trades, simulations=200, initial_capital=1000, seed=7, replace=False,
+                         workers=1, chunk_size=50)
+
+    final = (1000 + 60.0) / 1000 * 100 - 100
+    assert result['trades'] == 4
+    assert result['return_pct']['p5'] == pytest.approx(final)
+    assert result['return_pct']['p95'] == pytest.approx(final)
+    assert result['max_drawdown_pct']['p95'] >= result['max_drawdown_pct']['p5'] > 0
+
+
+def test_monte_carlo_resumes_from_checkpoint(tmp_path):
+    trades = [{'pnl': pnl, 'exit_time': START_MS + i * MINUTE_MS} for i, pnl in enumerate([100.0, -50.0, 30.0])]
+    path = str(tmp_path / 'mc.json')
+    first = monte_carlo(trades, simulations=300, seed=3, workers=1, checkpoint=path, chunk_size=100)
+
+    # Все блоки уже в контрольной точке: повторный прогон их не пересчитывает
+    assert len(json.load(open(path))['results']) == 3
+    assert monte_carlo(trades, simulations=300, seed=3, workers=1, checkpoint=path, chunk_size=100) == first
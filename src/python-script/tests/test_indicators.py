@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from candle_series import CandleSeries
+from candle_store import to_records
+from config import TradingConfig
+from conftest import make_candles, random_walk
+from indicators import IndicatorCache, IndicatorSeries, IndicatorState, analyze_batch
+from mexc_trading_bot import MexcTrendBot
+from simulator import SimulatedExchange
+
+SYMBOL = 'BTC/USDT'
+BARS = 300
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return make_candles(random_walk(BARS, seed=7))
+
+
+@pytest.fixture(scope='module')
+def bot(candles):
+    exchange = SimulatedExchange({SYMBOL: to_records(candles)}, base_timeframe='1m')
+    return exchange.attach(MexcTrendBot(exchange=exchange))
+
+
+def indicators(bot, candles):
+    """
+    Значения calculate_ma / calculate_rsi / calculate_macd по DataFrame или CandleSeries
+    """
+    periods = [bot.ma_short, bot.ma_medium, bot.ma_long]
+    return {
+        'ma_values': bot.calculate_ma(candles, periods),
+        'rsi': bot.calculate_rsi(candles, bot.rsi_period),
+        'macd': bot.calculate_macd(candles, bot.macd_fast, bot.macd_slow, bot.macd_signal),
+    }
+
+
+def assert_same(actual, expected):
+    assert actual['ma_values'] == pytest.approx(expected['ma_values'], rel=1e-9)
+    assert actual['rsi'] == pytest.approx(expected['rsi'], rel=1e-9)
+    assert actual['macd'] == pytest.approx(expected['macd'], rel=1e-9, abs=1e-12)
+
+
+def test_pandas_series_and_streaming_agree(bot, candles):
+    pandas = indicators(bot, bot.candles_to_dataframe(candles))
+    series = CandleSeries(BARS)
+    series.extend(candles)
+
+    state = IndicatorState([bot.ma_short, bot.ma_medium, bot.ma_long], bot.rsi_period,
+                           bot.macd_fast, bot.macd_slow, bot.macd_signal)
+    for candle in candles[:-1]:
+        state.update(candle[4], candle[0])
+
+    assert_same(indicators(bot, series), pandas)
+    assert_same(state.snapshot(candles[-1][4]), pandas)
+
+
+def test_incremental_state_matches_full_history(bot, candles):
+    # Состояние заполняется по первой части, затем догоняет новыми свечами
+    bot.indicator_states.clear()
+    series = CandleSeries(BARS)
+    series.extend(candles[:200])
+    bot.update_indicator_state(SYMBOL, series)
+    series.extend(candles[200:])
+
+    incremental = bot.update_indicator_state(SYMBOL, series)
+
+    assert_same(incremental, indicators(bot, bot.candles_to_dataframe(candles)))
+
+
+def test_batch_matches_series(candles):
+    params = TradingConfig.strategy_params()
+    closes = np.array([candle[4] for candle in candles])
+    series = IndicatorSeries(closes)
+    macd_line, signal_line, _ = series.macd(params['macd_fast'], params['macd_slow'], params['macd_signal'])
+
+    result = analyze_batch(np.vstack([closes, closes[::-1]]), params)[0]
+
+    assert result['ma_long'] == pytest.approx(series.sma(params['ma_long'])[-1])
+    assert result['rsi'] == pytest.approx(series.rsi(params['rsi_period'])[-1])
+    assert result['macd'] == pytest.approx(macd_line[-1])
+    assert result['macd_signal'] == pytest.approx(signal_line[-1])
+
+
+def test_macd_keeps_adjusted_ewm(bot, candles):
+    # Значения стратегии те же, что у исходного ewm(span) с adjust=True
+    close = bot.candles_to_dataframe(candles)['close']
+    macd_line = close.ewm(span=bot.macd_fast).mean() - close.ewm(span=bot.macd_slow).mean()
+    signal_line = macd_line.ewm(span=bot.macd_signal).mean()
+
+    state = IndicatorState([bot.ma_short, bot.ma_medium, bot.ma_long], bot.rsi_period,
+                           bot.macd_fast, bot.macd_slow, bot.macd_signal)
+    for candle in candles[:-1]:
+        state.update(candle[4], candle[0])
+    streamed = state.snapshot(candles[-1][4])['macd']
+
+    assert streamed['macd'] == pytest.approx(macd_line.iloc[-1], rel=1e-9)
+    assert streamed['signal'] == pytest.approx(signal_line.iloc[-1], rel=1e-9)
+
+
+def test_cache_shares_indicators_between_series(candles):
+    cache = IndicatorCache()
+    closes = np.array([candle[4] for candle in candles])
+    plain = IndicatorSeries(closes)
+
+    first = cache.series(closes, SYMBOL, '1m', 1)
+    np.testing.assert_array_equal(first.sma(25), plain.sma(25))
+    np.testing.assert_array_equal(first.rsi(14), plain.rsi(14))
+    misses = cache.misses
+
+    # Тот же ряд (пара, таймфрейм, версия данных) - значения из кэша без пересчета
+    second = cache.series(closes, SYMBOL, '1m', 1)
+    assert second.sma(25) is first.sma(25)
+    second.rsi(14)
+    assert cache.misses == misses and cache.hits >= 2
+
+    # Новая версия данных считается заново
+    cache.series(closes, SYMBOL, '1m', 2).sma(25)
+    assert cache.misses == misses + 2
+
+
+def test_cache_evicts_least_recently_used():
+    values = {name: np.zeros(100) for name in 'abc'}
+    cache = IndicatorCache(max_bytes=2 * values['a'].nbytes)
+
+    cache.get('a', lambda: values['a'])
+    cache.get('b', lambda: values['b'])
+    cache.get('a', lambda: values['a'])
+    cache.get('c', lambda: values['c'])
+
+    # Вытеснена давно не использованная запись b, объем не превышает лимит
+    assert list(cache._entries) == ['a', 'c']
+    assert cache.size == 2 * values['a'].nbytes
+    cache.get('b', lambda: values['b'])
+    assert cache.misses == 4
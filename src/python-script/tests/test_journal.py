@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import StubExchange
+from journal import REASON_STOP_LOSS, REASON_TAKE_PROFIT, TradeJournal, reconcile_positions
+from order_execution import ORDER_FILL, ROLE_ENTRY, ROLE_STOP, OrderExecutor
+
+SYMBOL = 'BTC/USDT'
+OTHER = 'ETH/USDT'
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'journal.db')
+
+
+def open_position(executor, journal, symbol, nonce):
+    bracket = executor.open_bracket(symbol, 1.0, 0.05, 0.10, 100.0, nonce=nonce)
+    position = dict(bracket, timestamp=datetime(2024, 1, 1, 12, 0), risk=5.0, regime='UPTREND')
+    journal.record_open(symbol, position)
+    return position
+
+
+def test_restore_after_restart(path):
+    exchange = StubExchange()
+    journal = TradeJournal(path)
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    first = open_position(executor, journal, SYMBOL, 1)
+    journal.snapshot({SYMBOL: first})
+    second = open_position(executor, journal, OTHER, 2)
+    journal.record_close(SYMBOL, 'SELL_SIGNAL')
+    journal.record_order(OTHER, ORDER_FILL, dict(second['limit_order'], status='closed'))
+    # Незафиксированная пачка сбрасывается при закрытии журнала
+    journal.close()
+
+    restored = TradeJournal(path).load_state()
+
+    assert list(restored) == [OTHER]
+    position = restored[OTHER]
+    assert position['timestamp'] == second['timestamp']
+    assert position['stop_loss'] == pytest.approx(second['stop_loss'])
+    assert position['stop_order']['id'] == second['stop_order']['id']
+    assert position['limit_order']['status'] == 'closed'
+
+
+@pytest.mark.parametrize('filled_key, reason', [('stop_order', REASON_STOP_LOSS), ('limit_order', REASON_TAKE_PROFIT)])
+def test_reconcile_closes_filled_brackets_and_orphans(path, filled_key, reason):
+    exchange = StubExchange()
+    journal = TradeJournal(path)
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    open_position(executor, journal, SYMBOL, 1)
+    open_position(executor, journal, OTHER, 2)
+    journal.close()
+
+    # Пока бот был остановлен: сработал защитный ордер по SYMBOL, остался ордер
+    # бота без позиции и появился ордер, выставленный вручную
+    positions = TradeJournal(path).load_state()
+    filled = positions[SYMBOL][filled_key]
+    exchange.fill(filled['id'], 95.0 if filled_key == 'stop_order' else 110.0)
+    orphan = exchange.create_order(OTHER, 'limit', 'sell', 1.0, 150.0, {'clientOrderId': 'tbETHUSDTT9'})
+    manual = exchange.create_order(OTHER, 'limit', 'sell', 1.0, 150.0, {'clientOrderId': 'manual-1'})
+
+    journal = TradeJournal(path)
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    positions, closed = reconcile_positions(positions, exchange, executor, [SYMBOL, OTHER], journal)
+
+    assert list(positions) == [OTHER]
+    assert list(closed) == [SYMBOL]
+    assert closed[SYMBOL][1]['id'] == filled['id']
+    assert closed[SYMBOL][2] == reason
+    sibling = closed[SYMBOL][0]['limit_order' if filled_key == 'stop_order' else 'stop_order']
+    assert exchange.orders[sibling['id']]['status'] == 'canceled'
+    assert exchange.orders[orphan['id']]['status'] == 'canceled'
+    assert exchange.orders[manual['id']]['status'] == 'open'
+    # Защитные ордера оставшейся позиции не тронуты
+    assert {exchange.orders[positions[OTHER][key]['id']]['status'] for key in ('stop_order', 'limit_order')} == {'open'}
+
+    # Исполнение и отмена попали в журнал: после следующего перезапуска позиции SYMBOL нет
+    journal.record_close(SYMBOL, reason, closed[SYMBOL][1])
+    journal.close()
+    assert list(TradeJournal(path).load_state()) == [OTHER]
+
+
+def test_reconcile_keeps_owned_symbols_only(path):
+    exchange = StubExchange()
+    orphan = exchange.create_order(OTHER, 'limit', 'sell', 1.0, 150.0, {'clientOrderId': 'tbETHUSDTT9'})
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    positions, closed = reconcile_positions({}, exchange, executor, [SYMBOL], owned_symbols={SYMBOL})
+
+    assert positions == {} and closed == {}
+    assert exchange.orders[orphan['id']]['status'] == 'open'
+
+
+def test_crash_before_record_open_recovers_position(path):
+    exchange = StubExchange(has={'createOrders': True})
+    journal = TradeJournal(path)
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    # Вход и защитные ордера размещены, бот упал до record_open
+    bracket = executor.open_bracket(SYMBOL, 1.0, 0.05, 0.10, 100.0, nonce=1)
+    journal.close()
+
+    journal = TradeJournal(path)
+    positions = journal.load_state()
+    assert list(positions) == [SYMBOL]
+    position = positions[SYMBOL]
+    assert position['size'] == 1.0 and position['entry_price'] == pytest.approx(100.0)
+    assert position['stop_loss'] == pytest.approx(bracket['stop_loss'])
+    assert position['take_profit'] == pytest.approx(bracket['take_profit'])
+    assert position['nonce'] == 1
+
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    positions, closed = reconcile_positions(positions, exchange, executor, [SYMBOL], journal)
+
+    # Защитные ордера позиции не считаются осиротевшими
+    assert list(positions) == [SYMBOL] and closed == {}
+    assert {exchange.orders[bracket[key]['id']]['status'] for key in ('stop_order', 'limit_order')} == {'open'}
+    journal.close()
+
+
+def test_closed_or_unfilled_entries_are_not_recovered(path):
+    exchange = StubExchange()
+    journal = TradeJournal(path)
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    bracket = executor.open_bracket(SYMBOL, 1.0, 0.05, 0.10, 100.0, nonce=1)
+    executor.close_bracket(SYMBOL, bracket)
+    # Лимитный вход по OTHER еще не исполнен
+    executor.create_order(OTHER, 'limit', 'buy', 1.0, 90.0,
+                          client_id=OrderExecutor.client_order_id(OTHER, ROLE_ENTRY, 2))
+    journal.close()
+
+    assert TradeJournal(path).load_state() == {}
+
+
+def test_parse_client_order_id():
+    for symbol in (SYMBOL, 'VERYLONGTOKENNAME123/USDT'):
+        client_id = OrderExecutor.client_order_id(symbol, ROLE_STOP, 1700000000123)
+        assert OrderExecutor.parse_client_order_id(client_id) == (ROLE_STOP, 1700000000123)
+    assert OrderExecutor.parse_client_order_id('manual-1') is None
+    assert OrderExecutor.parse_client_order_id(None) is None
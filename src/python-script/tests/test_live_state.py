@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+
+from live_state import SECTION_POSITIONS, SECTION_SYMBOLS, LiveState, LiveStream, encode_event
+
+
+def parse(frame):
+    lines = frame.decode().strip().split('\n')
+    assert lines[0].startswith('id: ') and lines[1].startswith('event: ')
+    data = json.loads(lines[2][len('data: '):], parse_constant=reject_constant)
+    return lines[0][len('id: '):], lines[1][len('event: '):], data
+
+
+def decode(frame):
+    return parse(frame)[2]
+
+
+def reject_constant(name):
+    raise AssertionError(f"{name} в событии SSE")
+
+
+def test_non_finite_values_encode_as_null():
+    state = LiveState()
+    state.update(SECTION_SYMBOLS, 'BTC/USDT', {
+        'price': 100.0, 'rsi': float('nan'), 'macd': np.float64('inf'), 'bands': [1.0, float('-inf')],
+    })
+    version, changes = state.changes()
+
+    data = decode(encode_event('snapshot', state.epoch, version, changes))
+
+    assert data['version'] == version
+    assert data['set'][SECTION_SYMBOLS]['BTC/USDT'] == {'price': 100.0, 'rsi': None, 'macd': None, 'bands': [1.0, None]}
+
+
+def test_diff_with_removed_keys():
+    state = LiveState()
+    state.update(SECTION_SYMBOLS, 'BTC/USDT', {'price': 1.0})
+    since = state.version
+    state.remove(SECTION_SYMBOLS, 'BTC/USDT')
+    version, changes = state.changes(since)
+
+    data = decode(encode_event('diff', state.epoch, version, changes))
+
+    assert data['del'] == {SECTION_SYMBOLS: ['BTC/USDT']}
+    assert data['set'] == {}
+
+
+def first_event(stream, last_event_id=None):
+    """
+    Первое событие, которое сервер отправит клиенту с данным Last-Event-ID
+    """
+    frames = []
+
+    def write(data):
+        frames.append(data)
+        stream.stop()
+
+    stream.serve(write, last_event_id)
+    return parse(frames[0])
+
+
+def test_reconnect_resumes_within_process():
+    state = LiveState()
+    state.update(SECTION_SYMBOLS, 'BTC/USDT', {'price': 1.0})
+    last_id, event, _ = first_event(LiveStream(state, interval=0.01))
+    state.update(SECTION_SYMBOLS, 'ETH/USDT', {'price': 2.0})
+
+    _, event, data = first_event(LiveStream(state, interval=0.01), last_id)
+
+    assert event == 'diff'
+    assert data['set'] == {SECTION_SYMBOLS: {'ETH/USDT': {'price': 2.0}}}
+
+
+def test_reconnect_after_bot_restart_gets_snapshot():
+    old = LiveState()
+    old.update(SECTION_POSITIONS, 'BTC/USDT', {'amount': 1.0})
+    last_id, _, _ = first_event(LiveStream(old, interval=0.01))
+
+    # Новый процесс: версия снова с нуля и успела обогнать id клиента
+    new = LiveState()
+    for price in range(5):
+        new.update(SECTION_SYMBOLS, 'ETH/USDT', {'price': float(price)})
+    assert new.version > int(last_id.split(':')[1])
+
+    _, event, data = first_event(LiveStream(new, interval=0.01), last_id)
+
+    assert event == 'snapshot'
+    assert data['set'] == {SECTION_SYMBOLS: {'ETH/USDT': {'price': 4.0}}}
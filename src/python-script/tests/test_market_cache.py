@@ -0,0 +1,65 @@
+import os
+
+from market_cache import apply_cached_markets, load_markets
+
+MARKETS = {'BTC/USDT': {'symbol': 'BTC/USDT', 'spot': True, 'active': True}}
+CURRENCIES = {'BTC': {'code': 'BTC'}, 'USDT': {'code': 'USDT'}}
+
+
+class FakeExchange:
+    def __init__(self):
+        self.markets = {}
+        self.currencies = {}
+        self.network_loads = 0
+
+    def load_markets(self, reload=False):
+        self.network_loads += 1
+        self.set_markets(MARKETS, CURRENCIES)
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = dict(markets)
+        self.currencies = dict(currencies or {})
+
+
+def test_second_client_uses_cached_markets(tmp_path):
+    path = str(tmp_path / 'cache' / 'markets.json')
+    first = FakeExchange()
+    assert load_markets(first, path, ttl=3600) == MARKETS
+    assert first.network_loads == 1 and os.path.exists(path)
+
+    second = FakeExchange()
+    assert load_markets(second, path, ttl=3600) == MARKETS
+    assert second.network_loads == 0
+    assert second.currencies == CURRENCIES
+
+
+def test_stale_or_broken_cache_is_reloaded(tmp_path):
+    path = str(tmp_path / 'markets.json')
+    load_markets(FakeExchange(), path, ttl=3600)
+
+    old = os.path.getmtime(path) - 7200
+    os.utime(path, (old, old))
+    stale = FakeExchange()
+    load_markets(stale, path, ttl=3600)
+    assert stale.network_loads == 1
+
+    with open(path, 'w') as f:
+        f.write('{"markets": ')
+    broken = FakeExchange()
+    assert not apply_cached_markets(broken, path, ttl=3600)
+    load_markets(broken, path, ttl=3600)
+    assert broken.network_loads == 1
+
+
+def test_reload_and_empty_path_skip_cache(tmp_path):
+    path = str(tmp_path / 'markets.json')
+    load_markets(FakeExchange(), path, ttl=3600)
+
+    exchange = FakeExchange()
+    load_markets(exchange, path, ttl=3600, reload=True)
+    assert exchange.network_loads == 1
+
+    exchange = FakeExchange()
+    load_markets(exchange, '', ttl=3600)
+    assert exchange.network_loads == 1
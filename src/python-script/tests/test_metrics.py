@@ -0,0 +1,84 @@
+import asyncio
+from urllib.request import urlopen
+
+import pytest
+
+from metrics import Histogram, Metrics, instrument_exchange
+
+
+def test_histogram_quantile_uses_bucket_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_prometheus_text_and_summary():
+    registry = Metrics(prefix='test')
+    registry.inc('signals_total', symbol='BTC/USDT', signal='BUY')
+    registry.inc('signals_total', 2, signal='BUY', symbol='BTC/USDT')
+    registry.set_gauge('open_positions', 3)
+    registry.observe('stage_seconds', 0.003, stage='indicators')
+
+    lines = registry.render_prometheus().splitlines()
+    assert 'test_signals_total{signal="BUY",symbol="BTC/USDT"} 3' in lines
+    assert 'test_open_positions 3' in lines
+    assert 'test_stage_seconds_bucket{stage="indicators",le="0.0025"} 0' in lines
+    assert 'test_stage_seconds_bucket{stage="indicators",le="0.005"} 1' in lines
+    assert 'test_stage_seconds_count{stage="indicators"} 1' in lines
+    assert registry.summary().startswith('indicators: n=1 avg=3.0ms p95<=5ms')
+
+
+def test_timers_observe_stage_duration():
+    registry = Metrics()
+    with pytest.raises(ValueError):
+        with registry.timer('cycle'):
+            raise ValueError('ошибка этапа')
+
+    async def stage():
+        async with registry.async_timer('fetch', symbol='ETH/USDT'):
+            await asyncio.sleep(0)
+
+    asyncio.run(stage())
+    assert registry.histograms[('stage_seconds', (('stage', 'cycle'),))].count == 1
+    assert registry.histograms[('stage_seconds', (('stage', 'fetch'), ('symbol', 'ETH/USDT')))].count == 1
+
+
+class FakeCcxt:
+    def fetch2(self, path, api='public', method='GET', params=None):
+        if path == 'broken':
+            raise ConnectionError(path)
+        return {}
+
+    def throttle(self, cost=None):
+        return None
+
+
+def test_instrument_exchange_counts_requests_and_errors():
+    registry = Metrics()
+    exchange = instrument_exchange(FakeCcxt(), registry)
+
+    exchange.throttle()
+    exchange.fetch2('ticker')
+    with pytest.raises(ConnectionError):
+        exchange.fetch2('broken')
+
+    assert registry.counters[('exchange_requests_total', (('endpoint', 'ticker'),))] == 1
+    assert registry.counters[('exchange_errors_total', (('endpoint', 'broken'), ('error', 'ConnectionError')))] == 1
+    assert 'запросов к бирже=2' in registry.summary()
+
+
+def test_http_endpoint_serves_metrics():
+    registry = Metrics(prefix='test')
+    registry.inc('cycles_total')
+    server = registry.start_http_server(0)
+    try:
+        body = urlopen(f"http://127.0.0.1:{server.server_port}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'test_cycles_total 1' in body
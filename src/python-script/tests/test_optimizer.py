@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from backtest import ohlcv_to_arrays
+from conftest import MINUTE_MS, make_candles, random_walk
+from optimizer import (ParameterOptimizer, SharedCandles, attach_shared_candles, evaluate_params,
+                       grid_search_space, is_valid_combination, random_search_space)
+
+SPACE = {'ma_short': [5, 20], 'ma_medium': [10, 25], 'ma_long': [30], 'stop_loss_pct': [0.01, 0.03]}
+
+
+def history():
+    return {
+        symbol: ohlcv_to_arrays(make_candles(random_walk(400, seed=i, volatility=0.02), step=60 * MINUTE_MS))
+        for i, symbol in enumerate(['BTC/USDT', 'ETH/USDT'])
+    }
+
+
+def test_grid_skips_invalid_combinations():
+    combinations = list(grid_search_space(SPACE))
+
+    # ma_short=20 не меньше ma_medium=10 - отсеивается
+    assert len(combinations) == 3 * 2
+    assert all(is_valid_combination(params) for params in combinations)
+    assert {(p['ma_short'], p['ma_medium']) for p in combinations} == {(5, 10), (5, 25), (20, 25)}
+
+
+def test_random_search_is_reproducible_and_unique():
+    first = list(random_search_space(SPACE, 4, seed=1))
+
+    assert first == list(random_search_space(SPACE, 4, seed=1))
+    assert len({tuple(sorted(p.items())) for p in first}) == 4
+    # Выборка больше пространства ограничена числом допустимых комбинаций
+    assert len(list(random_search_space(SPACE, 100, seed=1))) == 6
+
+
+def test_shared_candles_round_trip():
+    data = history()
+    shared = SharedCandles(data)
+    try:
+        attached, blocks = attach_shared_candles(shared.descriptors)
+        for symbol, arrays in data.items():
+            for field, values in arrays.items():
+                np.testing.assert_array_equal(attached[symbol][field], values)
+        for block in blocks:
+            block.close()
+    finally:
+        shared.close()
+
+
+@pytest.mark.parametrize('sort_by, ascending', [('return_pct', False), ('max_drawdown_pct', True)])
+def test_parallel_run_matches_serial_backtests(sort_by, ascending):
+    data = history()
+    combinations = list(grid_search_space(SPACE))
+
+    table = ParameterOptimizer(data, workers=2).run(combinations, sort_by=sort_by)
+
+    expected = [evaluate_params(params, data, 10000, 0.001) for params in combinations]
+    expected.sort(key=lambda result: result[sort_by], reverse=not ascending)
+    assert table[sort_by].tolist() == pytest.approx([result[sort_by] for result in expected])
+    assert table['total_trades'].sum() == sum(result['total_trades'] for result in expected)
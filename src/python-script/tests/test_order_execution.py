@@ -0,0 +1,228 @@
+import json
+import sqlite3
+
+import ccxt
+import pytest
+
+from conftest import StubExchange
+from journal import TradeJournal
+from order_execution import (CLIENT_ID_MAX_LENGTH, ORDER_CANCEL, ORDER_CREATE, ORDER_FILL, ROLE_ENTRY, ROLE_STOP,
+                             ROLE_TAKE, OrderExecutor)
+
+SYMBOL = 'BTC/USDT'
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'journal.db'))
+    yield journal
+    journal.close()
+
+
+def order_events(journal):
+    journal.flush()
+    rows = sqlite3.connect(journal.path).execute(
+        "SELECT data FROM events WHERE event = 'order' ORDER BY seq"
+    ).fetchall()
+    return [(data['action'], data['order']['id']) for data in (json.loads(row[0]) for row in rows)]
+
+
+def test_journal_is_synchronous_full(journal):
+    assert journal._conn.execute('PRAGMA synchronous').fetchone()[0] == 2
+
+
+def test_order_events_are_journaled(journal):
+    exchange = StubExchange(has={'createOrders': True, 'cancelOrders': True})
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+
+    bracket = executor.open_bracket(SYMBOL, 1.0, 0.02, 0.04, 100.0, nonce=1)
+    executor.close_bracket(SYMBOL, bracket)
+
+    entry, stop, take = bracket['entry_order']['id'], bracket['stop_order']['id'], bracket['limit_order']['id']
+    assert order_events(journal) == [
+        (ORDER_CREATE, entry), (ORDER_FILL, entry),
+        (ORDER_CREATE, stop), (ORDER_CREATE, take),
+        (ORDER_CANCEL, stop), (ORDER_CANCEL, take),
+        (ORDER_CREATE, '4'),
+    ]
+
+
+def test_replayed_cancel_updates_position(journal):
+    exchange = StubExchange()
+    executor = OrderExecutor(exchange, poll_interval=0, journal=journal)
+    bracket = executor.open_bracket(SYMBOL, 1.0, 0.02, 0.04, 100.0, nonce=1)
+    journal.record_open(SYMBOL, bracket)
+
+    executor.cancel_orders(SYMBOL, [bracket['stop_order']])
+
+    position = journal.load_state()[SYMBOL]
+    assert position['stop_order']['status'] == 'canceled'
+    assert position['limit_order']['status'] == 'open'
+
+
+def test_client_order_id_keeps_role_and_nonce():
+    nonce = 1_700_000_000_000
+    assert OrderExecutor.client_order_id(SYMBOL, ROLE_ENTRY, nonce) == f"tbBTCUSDT{ROLE_ENTRY}{nonce}"
+
+    symbol = 'VERYLONGTOKENNAME/USDT:USDT'
+    ids = {role: OrderExecutor.client_order_id(symbol, role, nonce) for role in (ROLE_ENTRY, ROLE_STOP, ROLE_TAKE)}
+    for role, client_id in ids.items():
+        assert len(client_id) == CLIENT_ID_MAX_LENGTH
+        assert client_id.startswith('tb')
+        assert client_id.endswith(f"{role}{nonce}")
+    assert len(set(ids.values())) == 3
+    assert OrderExecutor.client_order_id(symbol, ROLE_STOP, nonce) == ids[ROLE_STOP]
+    assert OrderExecutor.client_order_id('OTHERLONGTOKENNAME/USDT', ROLE_STOP, nonce) != ids[ROLE_STOP]
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_protective_orders_batch_or_pool(batch):
+    exchange = StubExchange(has={'createOrders': batch})
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    stop, take = executor.place_protective_orders(SYMBOL, 1.0, 98.0, 104.0, nonce=1)
+
+    assert exchange.calls.count('create_orders') == (1 if batch else 0)
+    assert exchange.calls.count('create_order') == 2
+    assert stop['stopPrice'] == 98.0 and stop['clientOrderId'].endswith(f"{ROLE_STOP}1")
+    assert take['price'] == 104.0 and take['clientOrderId'].endswith(f"{ROLE_TAKE}1")
+
+
+def test_rejected_batch_entry_is_none():
+    exchange = StubExchange(has={'createOrders': True})
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    def create_orders(requests, params=None):
+        # Как ответ batchOrders MEXC: вместо второго ордера - ошибка без id
+        request = requests[0]
+        stop = exchange.create_order(request['symbol'], request['type'], request['side'], request['amount'],
+                                     request['price'], request['params'])
+        error = {'id': None, 'clientOrderId': requests[1]['params']['clientOrderId'],
+                 'info': {'code': 30004, 'msg': 'Insufficient position'}}
+        return [stop, error]
+
+    exchange.create_orders = create_orders
+    stop, take = executor.place_protective_orders(SYMBOL, 1.0, 98.0, 104.0, nonce=1)
+
+    assert stop['id'] == '1'
+    assert take is None
+    assert len(exchange.orders) == 1
+
+
+def test_failed_batch_falls_back_to_pool():
+    exchange = StubExchange(has={'createOrders': True})
+    exchange.failures['create_orders'] = [ccxt.ExchangeError('batch disabled')]
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    stop, take = executor.place_protective_orders(SYMBOL, 1.0, 98.0, 104.0, nonce=1)
+
+    assert stop and take
+    assert len(exchange.orders) == 2
+
+
+class GradualFillExchange(StubExchange):
+    """
+    Рыночный вход исполняется не сразу: каждый fetch_order добавляет
+    следующий объем из fills, пока ордер не исполнится полностью
+    """
+    def __init__(self, fills):
+        super().__init__()
+        self.fills = list(fills)
+
+    def fill(self, id, price, ts=None):
+        order = self.orders[id]
+        if order['type'] != 'market' or not order['clientOrderId'].endswith(f"{ROLE_ENTRY}1"):
+            return super().fill(id, price, ts)
+        return order
+
+    def fetch_order(self, id, symbol=None, params=None):
+        order = self.orders[id]
+        if order['status'] == 'open' and self.fills:
+            order.update(filled=order['filled'] + self.fills.pop(0), average=self.price)
+            if order['filled'] >= order['amount']:
+                order['status'] = 'closed'
+        return super().fetch_order(id, symbol, params)
+
+
+def protected_amounts(exchange):
+    return [order['amount'] for order in exchange.orders.values() if order['side'] == 'sell']
+
+
+def test_partial_fill_waits_for_final_status():
+    exchange = GradualFillExchange([0.4, 0.6])
+    bracket = OrderExecutor(exchange, poll_interval=0).open_bracket(SYMBOL, 1.0, 0.02, 0.04, 100.0, nonce=1)
+
+    assert bracket['size'] == 1.0
+    assert protected_amounts(exchange) == [1.0, 1.0]
+
+
+def test_unfinished_entry_protects_confirmed_amount():
+    exchange = GradualFillExchange([0.4])
+    executor = OrderExecutor(exchange, fill_timeout=0.05, poll_interval=0.01)
+    bracket = executor.open_bracket(SYMBOL, 1.0, 0.02, 0.04, 100.0, nonce=1)
+
+    # Остаток входа отменен, защищена только исполненная часть
+    assert bracket['entry_order']['status'] == 'canceled'
+    assert bracket['size'] == 0.4
+    assert protected_amounts(exchange) == [0.4, 0.4]
+
+
+def test_unconfirmed_entry_is_not_protected():
+    exchange = GradualFillExchange([])
+    bracket = OrderExecutor(exchange, fill_timeout=0, poll_interval=0).open_bracket(
+        SYMBOL, 1.0, 0.02, 0.04, 100.0, nonce=1
+    )
+
+    assert bracket['size'] == 0.0
+    assert bracket['stop_order'] is None and bracket['limit_order'] is None
+    assert protected_amounts(exchange) == []
+
+
+def test_lost_response_is_not_duplicated():
+    exchange = StubExchange(has={'fetchClosedOrders': True})
+    exchange.lost_responses = 1
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    order = executor.create_order(SYMBOL, 'market', 'buy', 1.0, client_id='tbBTCUSDTE1')
+
+    assert len(exchange.orders) == 1
+    assert order['clientOrderId'] == 'tbBTCUSDTE1'
+    assert 'fetch_closed_orders' in exchange.calls
+
+
+def test_network_error_is_retried():
+    exchange = StubExchange(has={'fetchClosedOrders': True})
+    exchange.failures['create_order'] = [ccxt.RequestTimeout('timeout')]
+    executor = OrderExecutor(exchange, poll_interval=0)
+
+    order = executor.create_order(SYMBOL, 'limit', 'sell', 1.0, 104.0, client_id='tbBTCUSDTT1')
+
+    assert exchange.calls.count('create_order') == 2
+    assert order['status'] == 'open'
+    assert len(exchange.orders) == 1
+
+
+def test_retries_exhausted():
+    exchange = StubExchange()
+    exchange.failures['create_order'] = [ccxt.NetworkError('down')] * 3
+    executor = OrderExecutor(exchange, poll_interval=0, retries=2)
+
+    with pytest.raises(ccxt.NetworkError):
+        executor.create_order(SYMBOL, 'market', 'buy', 1.0, client_id='tbBTCUSDTE1')
+    assert not exchange.orders
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_cancel_orders_batch_or_pool(batch):
+    exchange = StubExchange(has={'cancelOrders': batch})
+    executor = OrderExecutor(exchange, poll_interval=0)
+    stop, take = executor.place_protective_orders(SYMBOL, 1.0, 98.0, 104.0, nonce=1)
+    # Уже исполненный ордер: ошибка отмены не прерывает остальные
+    exchange.fill(take['id'], 104.0)
+
+    executor.cancel_orders(SYMBOL, [stop, take, None])
+
+    assert exchange.calls.count('cancel_orders') == (1 if batch else 0)
+    assert exchange.calls.count('cancel_order') == (0 if batch else 2)
+    assert exchange.orders[stop['id']]['status'] == 'canceled'
+    assert exchange.orders[take['id']]['status'] == 'closed'
@@ -0,0 +1,92 @@
+import numpy as np
+
+from candle_series import CandleSeries
+from candle_store import to_records
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+from mexc_trading_bot import MexcTrendBot
+from portfolio_risk import (ALLOWED, REJECT_CORRELATION, REJECT_CORRELATION_UNKNOWN, REJECT_MAX_POSITIONS,
+                            REJECT_TOTAL_RISK, PortfolioRiskEngine)
+from simulator import SimulatedExchange
+from utils import RiskManager
+
+WINDOW = 20
+HOUR_MS = 60 * MINUTE_MS
+
+
+def series(closes):
+    candles = CandleSeries(len(closes))
+    candles.extend(make_candles(closes))
+    return candles
+
+
+def make_engine(max_positions=5, max_correlation=0.8):
+    return PortfolioRiskEngine(RiskManager(0.02, 0.10), max_positions, max_correlation, WINDOW)
+
+
+def check(engine, symbol, positions, size=1.0):
+    # Риск позиции 1 * (100 - 95) / 1000 = 0.005
+    return engine.check(symbol, size, 100.0, 95.0, 1000.0, positions)[:2]
+
+
+def test_position_limits():
+    engine = make_engine(max_positions=2)
+    held = {'ETH/USDT': {'risk': 0.05}, 'SOL/USDT': {'risk': 0.05}}
+
+    assert check(engine, 'ETH/USDT', {'ETH/USDT': {'risk': 0.0}})[1] == 'ALREADY_OPEN'
+    assert check(engine, 'BTC/USDT', held) == (False, REJECT_MAX_POSITIONS)
+    assert check(engine, 'BTC/USDT', {'ETH/USDT': {'risk': 0.099}}) == (False, REJECT_TOTAL_RISK)
+    assert check(engine, 'BTC/USDT', {'ETH/USDT': {'risk': 0.05}}) == (True, ALLOWED)
+
+
+def test_correlated_entry_is_rejected():
+    engine = make_engine()
+    closes = random_walk(WINDOW + 2, seed=1)
+    engine.update_returns('ETH/USDT', series(closes))
+    engine.update_returns('BTC/USDT', series(closes * 2))
+    engine.update_returns('XRP/USDT', series(random_walk(WINDOW + 2, seed=2)))
+
+    correlations = engine.returns.correlations('BTC/USDT', ['ETH/USDT', 'XRP/USDT'])
+    assert np.isclose(correlations['ETH/USDT'], 1.0)
+    assert check(engine, 'BTC/USDT', {'ETH/USDT': {'risk': 0.0}}) == (False, REJECT_CORRELATION)
+    assert check(engine, 'XRP/USDT', {'ETH/USDT': {'risk': 0.0}}) == (True, ALLOWED)
+
+
+def test_held_position_without_current_returns_blocks_entry():
+    engine = make_engine()
+    closes = random_walk(WINDOW + 3, seed=1)
+    engine.update_returns('ETH/USDT', series(closes[:-1]))
+    engine.update_returns('BTC/USDT', series(random_walk(WINDOW + 3, seed=2)))
+    positions = {'ETH/USDT': {'risk': 0.0}}
+
+    # Доходности позиции отстают на свечу - корреляция неизвестна
+    assert check(engine, 'BTC/USDT', positions) == (False, REJECT_CORRELATION_UNKNOWN)
+    assert check(engine, 'BTC/USDT', dict(positions, **{'SOL/USDT': {'risk': 0.0}}))[1] == REJECT_CORRELATION_UNKNOWN
+
+    engine.update_returns('ETH/USDT', series(closes))
+    assert check(engine, 'BTC/USDT', positions) == (True, ALLOWED)
+
+
+def test_candidate_without_history_skips_correlation():
+    engine = make_engine()
+    engine.update_returns('ETH/USDT', series(random_walk(WINDOW + 2, seed=1)))
+    engine.update_returns('BTC/USDT', series(random_walk(5, seed=2)))
+
+    assert check(engine, 'BTC/USDT', {'ETH/USDT': {'risk': 0.0}}) == (True, ALLOWED)
+
+
+def test_bot_analyzes_held_positions_first():
+    data = {
+        symbol: to_records(make_candles(random_walk(120, seed=i), step=HOUR_MS))
+        for i, symbol in enumerate(['BTC/USDT', 'ETH/USDT'])
+    }
+    exchange = SimulatedExchange(data, base_timeframe='1h', slippage=0.0)
+    exchange.advance(START_MS + 100 * HOUR_MS)
+    bot = exchange.attach(MexcTrendBot(exchange=exchange, persist=False))
+    bot.symbols = ['BTC/USDT']
+    bot.positions['ETH/USDT'] = {'risk': 0.0}
+
+    assert bot.strategy_symbols() == ['ETH/USDT', 'BTC/USDT']
+    bot.check_and_execute_strategy()
+    # Доходности позиции вне списка пар обновлены, сигналы по ней не исполняются
+    assert bot.risk_engine.returns.comparable('BTC/USDT', 'ETH/USDT')
+    assert bot.positions['ETH/USDT'] == {'risk': 0.0}
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from candle_series import CandleSeries
+from candle_store import to_records
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+from mexc_trading_bot import MexcTrendBot
+from resample import Resampler, base_history_limit, resample
+from simulator import SimulatedExchange
+
+FIVE_MS = 5 * MINUTE_MS
+# Начало на границе 5-минутной свечи
+ORIGIN = START_MS // FIVE_MS * FIVE_MS
+
+
+def base_candles(count=60, start=ORIGIN):
+    return to_records(make_candles(random_walk(count, seed=3), start=start))
+
+
+def full_resample(records):
+    return resample(records['timestamp'], records['open'], records['high'], records['low'],
+                    records['close'], records['volume'], FIVE_MS)
+
+
+def test_resample_aggregates_ohlcv():
+    records = base_candles(10)
+    result = full_resample(records)
+
+    assert list(result['timestamp']) == [ORIGIN, ORIGIN + FIVE_MS]
+    first = records[:5]
+    assert result[0]['open'] == first['open'][0]
+    assert result[0]['high'] == first['high'].max()
+    assert result[0]['low'] == first['low'].min()
+    assert result[0]['close'] == first['close'][-1]
+    assert result[0]['volume'] == first['volume'].sum()
+
+
+def test_incremental_update_matches_full_resample():
+    records = base_candles(60, start=ORIGIN + 2 * MINUTE_MS)
+    series = CandleSeries(30)
+    resampler = Resampler('5m', 100)
+
+    for start in range(0, 60, 7):
+        series.extend(records[start:start + 7])
+        resampler.update(series)
+
+    # Без начальной истории неполная первая свеча отбрасывается,
+    # последняя (текущая) пересобирается при каждом обновлении
+    expected = full_resample(records[3:])
+    np.testing.assert_array_equal(resampler.series.to_records(), expected)
+
+
+def test_gap_in_base_data_needs_seed():
+    records = base_candles(60)
+    resampler = Resampler('5m', 100)
+    assert resampler.needs_seed(records[:10])
+
+    resampler.seed(full_resample(records[:20]))
+    series = CandleSeries(30)
+    series.extend(records[15:25])
+    assert not resampler.needs_seed(series)
+    resampler.update(series)
+    np.testing.assert_array_equal(resampler.series.to_records(), full_resample(records[:25]))
+
+    gap = CandleSeries(30)
+    gap.extend(records[40:50])
+    assert resampler.needs_seed(gap)
+
+
+def test_base_history_covers_higher_timeframe_candle():
+    assert base_history_limit('5m', ['1h', '4h'], 100) == 100
+    assert base_history_limit('5m', ['1d'], 100) == 289
+
+
+@pytest.mark.parametrize('signal, trends, expected', [
+    ('BUY', ['UPTREND', 'DOWNTREND'], 'HOLD'),
+    ('BUY', ['UPTREND', 'SIDEWAYS'], 'BUY'),
+    ('SELL', ['UPTREND'], 'HOLD'),
+    ('SELL', ['DOWNTREND'], 'SELL'),
+])
+def test_higher_timeframes_confirm_signal(signal, trends, expected):
+    exchange = SimulatedExchange({'BTC/USDT': base_candles()}, base_timeframe='1m')
+    bot = exchange.attach(MexcTrendBot(exchange=exchange, persist=False))
+    timeframes = {'1m': {'trend': 'UPTREND'}}
+    timeframes.update({f'tf{i}': {'trend': trend} for i, trend in enumerate(trends)})
+
+    assert bot.apply_confirmation({'signal': signal, 'timeframes': timeframes})['signal'] == expected
@@ -0,0 +1,104 @@
+from conftest import START_MS
+from scanner import MarketScanner
+
+
+def ticker(last, high, low, quote_volume=None, base_volume=None):
+    return {'last': last, 'high': high, 'low': low, 'quoteVolume': quote_volume, 'baseVolume': base_volume}
+
+
+TICKERS = {
+    'BTC/USDT': ticker(100.0, 105.0, 95.0, quote_volume=5e7),       # 10%
+    'ETH/USDT': ticker(10.0, 10.3, 9.9, quote_volume=2e7),          # 4%
+    'DOGE/USDT': ticker(1.0, 1.3, 0.9, base_volume=3e7),            # 40%, объем по базовой валюте
+    'TINY/USDT': ticker(1.0, 2.0, 0.5, quote_volume=1e3),           # мал объем
+    'FLAT/USDT': ticker(1.0, 1.001, 0.999, quote_volume=1e8),       # мала волатильность
+    'BTC3L/USDT': ticker(1.0, 2.0, 0.5, quote_volume=1e8),          # токен с плечом
+    'ETH/BTC': ticker(0.05, 0.06, 0.04, quote_volume=1e8),          # другая котировка
+    'OLD/USDT': ticker(1.0, 2.0, 0.5, quote_volume=1e8),            # неактивный рынок
+}
+
+
+class FakeExchange:
+    def __init__(self):
+        self.markets = {'OLD/USDT': {'spot': True, 'active': False}}
+        self.now = START_MS
+        self.ticker_requests = 0
+
+    def milliseconds(self):
+        return self.now
+
+    def fetch_tickers(self):
+        self.ticker_requests += 1
+        return TICKERS
+
+
+class FakeBot:
+    def __init__(self, analyses):
+        self.exchange = FakeExchange()
+        self.analyses = analyses
+        self.analyzed = []
+        self.symbols = ['BTC/USDT']
+        self.positions = {}
+        self.candle_series = {('BTC/USDT', '1h'): object(), ('XRP/USDT', '1h'): object()}
+        self.indicator_states = {'BTC/USDT': object(), 'XRP/USDT': object()}
+
+    def analyze_trend(self, symbol):
+        self.analyzed.append(symbol)
+        return self.analyses.get(symbol)
+
+
+def analysis(signal, trend, buy, sell):
+    return {'signal': signal, 'trend': trend, 'buy_score': buy, 'sell_score': sell}
+
+
+def make_scanner(analyses, **kwargs):
+    settings = dict(quote='USDT', min_volume=1e6, min_volatility=2.0, shortlist_size=10, max_symbols=2, interval=60)
+    settings.update(kwargs)
+    return MarketScanner(FakeBot(analyses), **settings)
+
+
+def test_prefilter_by_volume_and_volatility():
+    shortlist = make_scanner({}).prefilter(TICKERS)
+
+    assert [symbol for symbol, _, _ in shortlist] == ['DOGE/USDT', 'BTC/USDT', 'ETH/USDT']
+    assert shortlist[0][1] == 3e7
+    assert make_scanner({}, shortlist_size=1).prefilter(TICKERS)[0][0] == 'DOGE/USDT'
+
+
+def test_scan_ranks_shortlist_and_keeps_held_positions():
+    scanner = make_scanner({
+        'DOGE/USDT': analysis('HOLD', 'SIDEWAYS', 2, 1),
+        'BTC/USDT': analysis('BUY', 'UPTREND', 4, 0),
+        'ETH/USDT': analysis('HOLD', 'DOWNTREND', 0, 3),
+    })
+    scanner.bot.positions['XRP/USDT'] = {}
+
+    symbols = scanner.scan()
+
+    # Свечи загружаются только для короткого списка; нисходящий тренд не выбирается
+    assert scanner.bot.analyzed == ['DOGE/USDT', 'BTC/USDT', 'ETH/USDT']
+    assert [row['symbol'] for row in scanner.last_ranking] == ['BTC/USDT', 'DOGE/USDT', 'ETH/USDT']
+    assert symbols == ['BTC/USDT', 'DOGE/USDT', 'XRP/USDT']
+
+
+def test_refresh_drops_state_of_removed_pairs_and_waits_interval():
+    scanner = make_scanner({'DOGE/USDT': analysis('BUY', 'UPTREND', 3, 0)})
+    bot = scanner.bot
+
+    assert scanner.maybe_refresh() == ['DOGE/USDT']
+    assert list(bot.candle_series) == [] and list(bot.indicator_states) == []
+
+    bot.exchange.now += 30_000
+    scanner.maybe_refresh()
+    assert bot.exchange.ticker_requests == 1
+    bot.exchange.now += 30_000
+    scanner.maybe_refresh()
+    assert bot.exchange.ticker_requests == 2
+
+
+def test_failed_scan_keeps_symbols():
+    scanner = make_scanner({})
+    scanner.bot.exchange.fetch_tickers = lambda: (_ for _ in ()).throw(ConnectionError('down'))
+
+    assert scanner.refresh() == ['BTC/USDT']
+    assert scanner.last_scan == START_MS / 1000
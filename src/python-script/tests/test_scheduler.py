@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from scheduler import (LANE_MARKET, LANE_ORDER, LANE_POSITION, RequestScheduler, install_scheduler, lane,
+                       request_weight)
+
+
+class RecordingScheduler(RequestScheduler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquired = []
+
+    def acquire(self, cost=1, lane_index=None):
+        self.acquired.append((cost, self._lane(lane_index)))
+
+
+class Client:
+    """
+    fetch2 как в ccxt: throttle со статическим cost эндпоинта до запроса
+    """
+    def __init__(self, costs):
+        self.costs = costs
+
+    def fetch2(self, path, api='public', method='GET', params={}, headers=None, body=None, config={}):
+        self.throttle(self.costs.get(path, 1))
+        return {}
+
+
+def test_request_weight():
+    assert request_weight('ticker/24hr', {'symbol': 'BTCUSDT'}, 25) == 1
+    assert request_weight('ticker/24hr', {}, 25) == 40
+    assert request_weight('klines', {'symbol': 'BTCUSDT'}, 1) == 1
+    assert request_weight('account', None, 10) == 10
+    assert request_weight('unknown', None) == 1
+
+
+def test_installed_scheduler_uses_endpoint_weights():
+    scheduler = RecordingScheduler(20.0, capacity=100)
+    client = install_scheduler(Client({'ticker/24hr': 25, 'order': 2}), scheduler)
+
+    client.fetch2('ticker/24hr', 'public', 'GET', {'symbol': 'BTCUSDT'})
+    client.fetch2('ticker/24hr', 'public', 'GET', {})
+    client.fetch2('order', 'private', 'POST', {'symbol': 'BTCUSDT'})
+    with lane(LANE_POSITION):
+        client.fetch2('ticker/24hr', 'public', 'GET', params={'symbol': 'BTCUSDT'})
+
+    assert scheduler.acquired == [(1, LANE_MARKET), (40, LANE_MARKET), (2, LANE_ORDER), (1, LANE_POSITION)]
+
+
+def test_backoff_and_recovery():
+    scheduler = RequestScheduler(20.0, capacity=20, max_backoff=60)
+    scheduler.on_rate_limited()
+    assert scheduler.factor == pytest.approx(0.5)
+
+    threads = [threading.Thread(target=lambda: [scheduler.on_success() for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert scheduler.failures == 0
+    assert scheduler.factor == 1.0
+
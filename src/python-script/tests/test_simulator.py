@@ -0,0 +1,72 @@
+import ccxt
+import pytest
+
+from candle_store import to_records
+from conftest import MINUTE_MS, START_MS, make_candles
+from simulator import SimulatedExchange
+
+SYMBOL = 'BTC/USDT'
+
+
+def make_exchange(closes):
+    exchange = SimulatedExchange({SYMBOL: to_records(make_candles(closes))}, base_timeframe='1m',
+                                 slippage=0.0, taker_fee=0.0, initial_balance=1000.0)
+    exchange.advance(START_MS + MINUTE_MS)
+    return exchange
+
+
+def brackets(amount, stop=90.0, take=110.0):
+    return [
+        {'symbol': SYMBOL, 'type': 'market', 'side': 'sell', 'amount': amount, 'params': {'stopPrice': stop}},
+        {'symbol': SYMBOL, 'type': 'limit', 'side': 'sell', 'amount': amount, 'price': take},
+    ]
+
+
+def test_open_order_reserves_balance():
+    exchange = make_exchange([100.0] * 10)
+    order = exchange.create_order(SYMBOL, 'limit', 'buy', 2.0, 90.0)
+
+    assert exchange.fetch_balance()['USDT'] == {'free': 820.0, 'used': 180.0, 'total': 1000.0}
+    with pytest.raises(ccxt.InsufficientFunds):
+        exchange.create_order(SYMBOL, 'limit', 'buy', 10.0, 90.0)
+
+    exchange.cancel_order(order['id'])
+    assert exchange.fetch_balance()['USDT'] == {'free': 1000.0, 'used': 0.0, 'total': 1000.0}
+
+
+def test_second_sell_of_same_amount_is_rejected():
+    exchange = make_exchange([100.0] * 10)
+    exchange.create_order(SYMBOL, 'market', 'buy', 1.0)
+    exchange.create_order(SYMBOL, 'market', 'sell', 1.0, params={'stopPrice': 90.0})
+
+    assert exchange.fetch_balance()['BTC'] == {'free': 0.0, 'used': 1.0, 'total': 1.0}
+    with pytest.raises(ccxt.InsufficientFunds):
+        exchange.create_order(SYMBOL, 'limit', 'sell', 1.0, 110.0)
+    with pytest.raises(ccxt.InsufficientFunds):
+        exchange.create_order(SYMBOL, 'market', 'sell', 1.0)
+
+
+def test_bracket_batch_rejects_over_committed_sell():
+    # Как batchOrders MEXC: stop-loss резервирует всю позицию, take-profit на тот же объем отклоняется
+    exchange = make_exchange([100.0] * 10)
+    exchange.create_order(SYMBOL, 'market', 'buy', 1.0)
+    stop, take = exchange.create_orders(brackets(1.0))
+
+    assert stop['status'] == 'open'
+    assert take['id'] is None and take['status'] == 'rejected'
+    assert 'Недостаточно средств' in take['info']['msg']
+    assert [order['id'] for order in exchange.fetch_open_orders()] == [stop['id']]
+    assert exchange.fetch_balance()['BTC'] == {'free': 0.0, 'used': 1.0, 'total': 1.0}
+
+
+def test_reserved_order_fills_and_releases():
+    exchange = make_exchange([100.0] * 5 + [80.0] * 5)
+    exchange.create_order(SYMBOL, 'market', 'buy', 2.0)
+    stop, take = exchange.create_orders(brackets(1.0))
+
+    assert exchange.fetch_balance()['BTC'] == {'free': 0.0, 'used': 2.0, 'total': 2.0}
+    exchange.advance(START_MS + 9 * MINUTE_MS)
+
+    assert exchange.fetch_order(stop['id'])['status'] == 'closed'
+    assert exchange.fetch_order(take['id'])['status'] == 'open'
+    assert exchange.fetch_balance()['BTC'] == {'free': 0.0, 'used': 1.0, 'total': 1.0}
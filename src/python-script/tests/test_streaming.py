@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from conftest import MINUTE_MS, START_MS, make_candles, random_walk
+from candle_series import CandleSeries
+from streaming import FakeStreamServer, ReplayStreamSource, StreamRunner
+
+SYMBOL = 'BTC/USDT'
+HISTORY = 50
+
+
+class StubExchange:
+    def __init__(self, now):
+        self.now = now
+
+    def milliseconds(self):
+        return self.now
+
+
+class StubBot:
+    """
+    Минимальный бот для StreamRunner: история из списка свечей, анализ записывается
+    """
+    def __init__(self, history, now):
+        self.history = history
+        self.exchange = StubExchange(now)
+        self.candle_store = None
+        self.positions = {}
+        self.analyzed = []
+        self.bracket_checks = 0
+        self.saves = 0
+
+    def base_history_limit(self):
+        return 200
+
+    def fetch_candles(self, symbol, timeframe, limit, since=None):
+        return self.history[-limit:]
+
+    def analyze_candles(self, symbol, candles):
+        assert isinstance(candles, CandleSeries)
+        self.analyzed.append((symbol, len(candles), candles.last_timestamp))
+        return None
+
+    def execute_signal(self, symbol, analysis):
+        pass
+
+    def check_brackets(self):
+        self.bracket_checks += 1
+        return {}
+
+    def save_state(self, snapshot=False):
+        self.saves += 1
+
+    def publish_position(self, symbol, price=None):
+        pass
+
+    def log_position(self, symbol, position, price):
+        pass
+
+
+async def replay(bot, candles, disconnect_after=None):
+    server = FakeStreamServer({SYMBOL: candles}, '1m', speed=3000.0, disconnect_after=disconnect_after)
+    await server.start()
+    try:
+        source = ReplayStreamSource(server.url, [SYMBOL], reconnect_delay=0.01)
+        runner = StreamRunner(bot, source, '1m', check_interval=0.01)
+        await asyncio.wait_for(runner.run(), 30)
+    finally:
+        await server.stop()
+    return runner
+
+
+@pytest.mark.parametrize('disconnect_after', [None, 7])
+def test_analysis_once_per_closed_candle(disconnect_after):
+    candles = make_candles(random_walk(HISTORY + 10))
+    history, stream = candles[:HISTORY], candles[HISTORY:]
+    # История только из закрытых свечей (как из хранилища свечей)
+    bot = StubBot(history, now=stream[0][0])
+
+    runner = asyncio.run(replay(bot, stream, disconnect_after))
+
+    assert [ts for _, _, ts in bot.analyzed] == [candle[0] for candle in stream]
+    assert [size for _, size, _ in bot.analyzed] == list(range(HISTORY + 1, HISTORY + len(stream) + 1))
+    window = runner.windows[SYMBOL]
+    assert window.timestamp[0] == candles[0][0]
+    assert window.close[-1] == stream[-1][4]
+    assert bot.bracket_checks > 0
+    assert bot.saves > 0
+
+
+def test_unclosed_history_candle_comes_from_stream():
+    candles = make_candles(random_walk(HISTORY + 5))
+    # REST отдает и текущую незакрытую свечу - она заменяется свечой из потока
+    history, stream = candles[:HISTORY], candles[HISTORY - 1:]
+    bot = StubBot(history, now=history[-1][0] + MINUTE_MS // 2)
+
+    runner = asyncio.run(replay(bot, stream))
+
+    assert [ts for _, _, ts in bot.analyzed] == [candle[0] for candle in stream]
+    assert len(runner.windows[SYMBOL]) == len(candles)
+    assert runner.windows[SYMBOL].timestamp[0] == START_MS
@@ -0,0 +1,44 @@
+import pytest
+
+from config import TradingConfig
+from scheduler import RequestScheduler
+from supervisor import plan_workers, share_rate_limit
+
+
+@pytest.fixture
+def paths(monkeypatch):
+    monkeypatch.setattr(TradingConfig, 'JOURNAL_PATH', 'state/journal.db')
+    monkeypatch.setattr(TradingConfig, 'TRADE_STORE_PATH', 'state/trades.db')
+    monkeypatch.setattr(TradingConfig, 'LOG_FILE', 'trading_bot.log')
+    monkeypatch.setattr(TradingConfig, 'SUPERVISOR_FEED_RATE_SHARE', 0.2)
+
+
+def test_workers_get_own_files(paths):
+    accounts = [{'name': 'main', 'pairs': ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']}, {'name': 'fast', 'pairs': ['XRP/USDT']}]
+
+    specs = plan_workers(accounts, workers=2)
+
+    assert [spec['name'] for spec in specs] == ['main-0', 'main-1', 'fast-0']
+    for key in ('JOURNAL_PATH', 'TRADE_STORE_PATH', 'LOG_FILE'):
+        assert len({spec['config'][key] for spec in specs}) == len(specs)
+    assert specs[1]['config']['TRADE_STORE_PATH'] == 'state/trades-main-1.db'
+    assert specs[2]['config']['LOG_FILE'] == 'trading_bot-fast-0.log'
+
+
+def test_rate_shared_with_feed(paths):
+    specs = plan_workers([{'name': 'main', 'pairs': ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT']}], workers=4)
+
+    assert sum(spec['rate_share'] for spec in specs) + TradingConfig.SUPERVISOR_FEED_RATE_SHARE == pytest.approx(1.0)
+
+
+def test_share_rate_limit():
+    scheduler = RequestScheduler(20.0)
+    share_rate_limit(None, scheduler, 0.25)
+    assert scheduler.rate == pytest.approx(5.0)
+
+    class Exchange:
+        rateLimit = 50
+
+    exchange = Exchange()
+    share_rate_limit(exchange, None, 0.25)
+    assert exchange.rateLimit == pytest.approx(200)
@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import START_MS
+from trade_store import DAY_MS, HOUR_MS, TradeStore
+
+DAY_START = START_MS // DAY_MS * DAY_MS
+
+
+def trade(symbol, exit_time, pnl, regime='uptrend', entry_time=None):
+    return {
+        'symbol': symbol,
+        'entry_time': exit_time - HOUR_MS if entry_time is None else entry_time,
+        'exit_time': exit_time,
+        'entry_price': 100.0,
+        'exit_price': 100.0 + pnl,
+        'size': 1.0,
+        'pnl': pnl,
+        'regime': regime,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TradeStore(str(tmp_path / 'trades.db'))
+    yield store
+    store.close()
+
+
+def test_aggregates(store):
+    store.record_trades([
+        trade('BTC/USDT', DAY_START + 3 * HOUR_MS, 10.0),
+        trade('BTC/USDT', DAY_START + 1 * HOUR_MS, -4.0, regime='downtrend'),
+        trade('ETH/USDT', DAY_START + DAY_MS, 6.0),
+    ])
+    # Загрузка из базы, затем дозапись не по порядку времени
+    assert store.summary()['trades'] == 3
+    store.record_trade(trade('ETH/USDT', DAY_START + 2 * HOUR_MS, -2.0))
+
+    summary = store.summary()
+    assert summary['trades'] == 4
+    assert summary['wins'] == 2
+    assert summary['pnl'] == pytest.approx(10.0)
+    assert summary['gross_profit'] == pytest.approx(16.0)
+    assert summary['gross_loss'] == pytest.approx(6.0)
+    assert summary['profit_factor'] == pytest.approx(16.0 / 6.0)
+
+    by_symbol = {row['symbol']: row for row in store.pnl_by_symbol()}
+    assert by_symbol['BTC/USDT']['pnl'] == pytest.approx(6.0)
+    assert by_symbol['ETH/USDT']['pnl'] == pytest.approx(4.0)
+    assert by_symbol['ETH/USDT']['win_rate'] == pytest.approx(50.0)
+
+    by_regime = {row['regime']: row['trades'] for row in store.win_rate_by_regime()}
+    assert by_regime == {'uptrend': 3, 'downtrend': 1}
+
+    window = store.summary(since=DAY_START + 2 * HOUR_MS, until=DAY_START + DAY_MS)
+    assert window['trades'] == 2
+    assert window['pnl'] == pytest.approx(8.0)
+
+    curve = store.equity_curve(1000.0)
+    assert [point['equity'] for point in curve] == pytest.approx([1004.0, 1010.0])
+    assert curve[0]['time'] == DAY_START
+
+
+def test_win_rate_by_hour(store):
+    store.record_trades([
+        trade('BTC/USDT', START_MS + DAY_MS, 1.0, entry_time=5 * HOUR_MS),
+        trade('BTC/USDT', START_MS + DAY_MS, -1.0, entry_time=DAY_MS + 5 * HOUR_MS),
+        trade('BTC/USDT', START_MS + DAY_MS, 1.0, entry_time=7 * HOUR_MS),
+    ])
+    by_hour = {row['hour']: row for row in store.win_rate_by_hour()}
+    assert set(by_hour) == {5, 7}
+    assert by_hour[5]['trades'] == 2
+    assert by_hour[5]['win_rate'] == pytest.approx(50.0)
+
+
+def test_snapshot_is_immutable(store):
+    store.record_trade(trade('BTC/USDT', START_MS, 1.0))
+    snapshot = store.columns()
+    store.record_trade(trade('ETH/USDT', START_MS - HOUR_MS, 2.0))
+
+    assert len(snapshot) == 1
+    assert snapshot.labels['symbol'] == ('BTC/USDT',)
+    with pytest.raises(ValueError):
+        snapshot.pnl[0] = 0.0
+    assert len(store.columns()) == 2
+
+
+def test_concurrent_append_and_queries(store):
+    store.record_trade(trade('BTC/USDT', START_MS, 1.0))
+    errors = []
+
+    def writer():
+        for i in range(300):
+            store.record_trade(trade(f'S{i % 7}/USDT', START_MS + (i * 7919 % 500) * HOUR_MS, 1.0))
+
+    def reader():
+        try:
+            for _ in range(300):
+                columns = store.columns()
+                assert np.all(np.diff(columns.exit_time) >= 0)
+                assert len({len(getattr(columns, name)) for name in ('exit_time', 'symbol', 'pnl')}) == 1
+                store.pnl_by_symbol()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert store.summary()['trades'] == 301
+    assert sum(row['trades'] for row in store.pnl_by_symbol()) == 301
+
+
+def test_recent_trades_and_fills(store):
+    store.record_trades([trade('BTC/USDT', START_MS + i * HOUR_MS, float(i)) for i in range(5)], source='live')
+    store.record_fill('BTC/USDT', 'entry', {'id': '1', 'side': 'buy', 'average': 100.0, 'filled': 2.0,
+                                            'fee': {'cost': 0.2}}, ts=START_MS)
+    store.record_fill('ETH/USDT', 'stop', {'id': '2', 'side': 'sell', 'price': 50.0, 'amount': 1.0}, ts=START_MS + 1)
+
+    page = store.recent_trades(limit=2)
+    assert [t['pnl'] for t in page] == [4.0, 3.0]
+    assert [t['pnl'] for t in store.recent_trades(limit=2, before=page[-1]['exit_time'])] == [2.0, 1.0]
+    assert page[0]['source'] == 'live'
+
+    fills = store.recent_fills()
+    assert [(f['symbol'], f['role'], f['price'], f['amount']) for f in fills] == [
+        ('ETH/USDT', 'stop', 50.0, 1.0), ('BTC/USDT', 'entry', 100.0, 2.0)
+    ]
+    assert fills[1]['fee'] == pytest.approx(0.2)
+    assert len(store.recent_fills(symbol='BTC/USDT')) == 1
+
+
+def test_equity_curve_by_day(store):
+    store.record_trades([
+        trade('BTC/USDT', DAY_START + HOUR_MS, 5.0),
+        trade('BTC/USDT', DAY_START + 2 * HOUR_MS, -2.0),
+        trade('BTC/USDT', DAY_START + 2 * DAY_MS, 4.0),
+    ])
+
+    assert store.equity_curve(100.0) == [
+        {'time': DAY_START, 'pnl': 3.0, 'equity': 103.0},
+        {'time': DAY_START + 2 * DAY_MS, 'pnl': 4.0, 'equity': 107.0},
+    ]
+    assert store.equity_curve(100.0, since=DAY_START + DAY_MS)[0]['equity'] == 104.0
@@ -0,0 +1,381 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Хранилище исполнений и закрытых сделок (SQLite, режим WAL, индексы по паре и времени).
+# Для агрегатов (прибыль по парам, кривая капитала, win rate по часам и режимам)
+# сделки один раз загружаются в столбцы NumPy, отсортированные по времени закрытия,
+# и дальше только дописываются. Интервал времени - бинарный поиск, группировка -
+# np.bincount, поэтому запрос по годам сделок занимает миллисекунды.
+
+DAY_MS = 24 * 60 * 60 * 1000
+HOUR_MS = 60 * 60 * 1000
+
+_TRADE_FIELDS = ('symbol', 'entry_time', 'exit_time', 'entry_price', 'exit_price', 'size',
+                 'pnl', 'pnl_pct', 'fees', 'reason', 'regime', 'source')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    role TEXT NOT NULL,
+    order_id TEXT,
+    price REAL,
+    amount REAL,
+    fee REAL
+);
+CREATE INDEX IF NOT EXISTS fills_symbol_ts ON fills (symbol, ts);
+CREATE INDEX IF NOT EXISTS fills_ts ON fills (ts);
+
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    entry_time INTEGER NOT NULL,
+    exit_time INTEGER NOT NULL,
+    entry_price REAL NOT NULL,
+    exit_price REAL NOT NULL,
+    size REAL NOT NULL,
+    pnl REAL NOT NULL,
+    pnl_pct REAL,
+    fees REAL,
+    reason TEXT,
+    regime TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_exit ON trades (symbol, exit_time);
+CREATE INDEX IF NOT EXISTS trades_exit ON trades (exit_time);
+"""
+
+
+def to_ms(value):
+    """
+    Время в миллисекундах из datetime или числа
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def order_price(order):
+    return order.get('average') or order.get('price')
+
+
+def order_time(order):
+    """
+    Время исполнения ордера (мс): последняя сделка по ордеру, иначе время создания
+    """
+    return order.get('lastTradeTimestamp') or order.get('timestamp')
+
+
+def order_fee(order):
+    fee = order.get('fee') or {}
+    return fee.get('cost') or 0.0
+
+
+def position_trade(symbol, position, order, reason, exit_time, source='live'):
+    """
+    Закрытая сделка по позиции бота и ордеру, которым она закрыта
+    """
+    entry_price = position['entry_price']
+    exit_price = order_price(order) or entry_price
+    size = position['size']
+    fees = order_fee(position.get('entry_order') or {}) + order_fee(order)
+    return {
+        'symbol': symbol,
+        'entry_time': to_ms(position.get('timestamp')) or to_ms(exit_time),
+        'exit_time': to_ms(exit_time),
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'size': size,
+        'pnl': size * (exit_price - entry_price) - fees,
+        'pnl_pct': (exit_price - entry_price) / entry_price * 100,
+        'fees': fees,
+        'reason': reason,
+        'regime': position.get('regime'),
+        'source': source,
+    }
+
+
+_COLUMNS = ('exit_time', 'hour', 'symbol', 'regime', 'pnl', 'win', 'profit')
+
+
+class TradeColumnsSnapshot:
+    """
+    Неизменяемый снимок столбцов сделок для запросов.
+    Массивы только для чтения: merge не меняет их, а создает новые.
+    """
+    def __init__(self, columns):
+        for name in _COLUMNS:
+            array = getattr(columns, name)
+            array.flags.writeable = False
+            setattr(self, name, array)
+        self.labels = {kind: tuple(values) for kind, values in columns.labels.items()}
+
+    def __len__(self):
+        return len(self.exit_time)
+
+    def window(self, since=None, until=None):
+        """
+        Срез сделок с временем закрытия в [since, until)
+        """
+        lo = np.searchsorted(self.exit_time, since) if since is not None else 0
+        hi = np.searchsorted(self.exit_time, until) if until is not None else len(self.exit_time)
+        return slice(lo, hi)
+
+
+class TradeColumns:
+    """
+    Столбцы сделок для агрегатов: время закрытия (по возрастанию), час входа (UTC),
+    коды пары и режима, прибыль, признак прибыльной сделки и прибыль прибыльных сделок.
+    Строки - справочники кодов. Не потокобезопасен: append и merge вызываются
+    под блокировкой TradeStore, запросы читают snapshot().
+    """
+    def __init__(self):
+        self.exit_time = np.empty(0, dtype=np.int64)
+        self.hour = np.empty(0, dtype=np.int64)
+        self.symbol = np.empty(0, dtype=np.int64)
+        self.regime = np.empty(0, dtype=np.int64)
+        self.pnl = np.empty(0, dtype=np.float64)
+        self.win = np.empty(0, dtype=np.float64)
+        self.profit = np.empty(0, dtype=np.float64)
+        self.labels = {'symbol': [], 'regime': []}
+        self._codes = {'symbol': {}, 'regime': {}}
+        self._pending = []
+
+    def _code(self, kind, value):
+        codes = self._codes[kind]
+        if value not in codes:
+            codes[value] = len(codes)
+            self.labels[kind].append(value)
+        return codes[value]
+
+    def append(self, rows):
+        """
+        rows - кортежи (exit_time, entry_time, symbol, regime, pnl)
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        exit_time, entry_time, symbols, regimes, pnl = zip(*rows)
+        self._pending.append((
+            np.asarray(exit_time, dtype=np.int64),
+            np.asarray(entry_time, dtype=np.int64) // HOUR_MS % 24,
+            self._encode('symbol', symbols),
+            self._encode('regime', [regime or '' for regime in regimes]),
+            np.asarray(pnl, dtype=np.float64),
+        ))
+
+    def _encode(self, kind, values):
+        codes = self._codes[kind]
+        return np.array([codes[value] if value in codes else self._code(kind, value) for value in values],
+                        dtype=np.int64)
+
+    def merge(self):
+        """
+        Добавление накопленных строк; порядок восстанавливается, только если он нарушен
+        """
+        if not self._pending:
+            return
+        exit_time, hour, symbol, regime, pnl = (np.concatenate(column) for column in zip(*self._pending))
+        self._pending = []
+        ordered = (len(self.exit_time) == 0 or exit_time[0] >= self.exit_time[-1]) and np.all(np.diff(exit_time) >= 0)
+        self.exit_time = np.concatenate([self.exit_time, exit_time])
+        self.hour = np.concatenate([self.hour, hour])
+        self.symbol = np.concatenate([self.symbol, symbol])
+        self.regime = np.concatenate([self.regime, regime])
+        self.pnl = np.concatenate([self.pnl, pnl])
+        self.win = np.concatenate([self.win, (pnl > 0).astype(np.float64)])
+        self.profit = np.concatenate([self.profit, np.maximum(pnl, 0.0)])
+        if not ordered:
+            order = np.argsort(self.exit_time, kind='stable')
+            for name in _COLUMNS:
+                setattr(self, name, getattr(self, name)[order])
+
+    def snapshot(self):
+        """
+        Снимок столбцов с учетом накопленных строк
+        """
+        self.merge()
+        return TradeColumnsSnapshot(self)
+
+
+def _aggregate(keys, columns, window, size):
+    """
+    Количество сделок, прибыльных сделок, прибыль, суммарные прибыль и убыток по кодам группы
+    """
+    trades = np.bincount(keys, minlength=size)
+    wins = np.bincount(keys, weights=columns.win[window], minlength=size)
+    pnl = np.bincount(keys, weights=columns.pnl[window], minlength=size)
+    gross_profit = np.bincount(keys, weights=columns.profit[window], minlength=size)
+    return trades, wins, pnl, gross_profit, gross_profit - pnl
+
+
+def _stats_row(trades, wins, pnl, gross_profit, gross_loss):
+    return {
+        'trades': int(trades),
+        'wins': int(wins),
+        'pnl': float(pnl),
+        'gross_profit': float(gross_profit),
+        'gross_loss': float(gross_loss),
+        'win_rate': float(wins / trades * 100) if trades else 0.0,
+        'profit_factor': float(gross_profit / gross_loss) if gross_loss else None,
+    }
+
+
+class TradeStore:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._columns = None
+
+    # --- Запись ---
+
+    def record_fill(self, symbol, role, order, ts=None):
+        """
+        Исполнение ордера (role: entry, exit, stop, take)
+        """
+        if not order:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO fills (ts, symbol, side, role, order_id, price, amount, fee) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (to_ms(ts) or order.get('timestamp') or 0, symbol, order.get('side') or '', role,
+                 order.get('id'), order_price(order), order.get('filled') or order.get('amount'), order_fee(order))
+            )
+
+    def record_trades(self, trades, source=None):
+        """
+        Закрытые сделки (формат бэктеста или position_trade) одной транзакцией
+        """
+        rows = []
+        for trade in trades:
+            row = {field: trade.get(field) for field in _TRADE_FIELDS}
+            row['source'] = source or row['source'] or 'backtest'
+            rows.append(tuple(row[field] for field in _TRADE_FIELDS))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO trades ({', '.join(_TRADE_FIELDS)}) VALUES ({', '.join('?' * len(_TRADE_FIELDS))})", rows
+            )
+            if self._columns is not None:
+                self._columns.append((row[2], row[1], row[0], row[10], row[6]) for row in rows)
+        return len(rows)
+
+    def record_trade(self, trade):
+        self.record_trades([trade])
+
+    def close(self):
+        self._conn.close()
+
+    # --- Запросы ---
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, args).fetchall()]
+
+    def recent_trades(self, limit=50, symbol=None, before=None):
+        """
+        Последние закрытые сделки (постранично: before - exit_time последней полученной)
+        """
+        clauses, args = [], []
+        if symbol:
+            clauses.append('symbol = ?')
+            args.append(symbol)
+        if before is not None:
+            clauses.append('exit_time < ?')
+            args.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._query(
+            f"SELECT id, {', '.join(_TRADE_FIELDS)} FROM trades {where} ORDER BY exit_time DESC LIMIT ?",
+            args + [limit]
+        )
+
+    def recent_fills(self, limit=50, symbol=None):
+        if symbol:
+            return self._query('SELECT * FROM fills WHERE symbol = ? ORDER BY ts DESC LIMIT ?', (symbol, limit))
+        return self._query('SELECT * FROM fills ORDER BY ts DESC LIMIT ?', (limit,))
+
+    def columns(self):
+        """
+        Неизменяемый снимок столбцов сделок (при первом обращении загружаются из базы).
+        Слияние новых строк и снимок делаются под блокировкой записи.
+        """
+        with self._lock:
+            if self._columns is None:
+                columns = TradeColumns()
+                # Кортежи вместо sqlite3.Row: загрузка всей таблицы в несколько раз быстрее
+                cursor = self._conn.cursor()
+                cursor.row_factory = None
+                columns.append(cursor.execute(
+                    'SELECT exit_time, entry_time, symbol, regime, pnl FROM trades ORDER BY exit_time'
+                ).fetchall())
+                self._columns = columns
+            return self._columns.snapshot()
+
+    def _grouped(self, kind, since=None, until=None):
+        columns = self.columns()
+        window = columns.window(since, until)
+        if kind == 'hour':
+            keys, labels = columns.hour[window], list(range(24))
+        else:
+            keys, labels = getattr(columns, kind)[window], columns.labels[kind]
+        totals = _aggregate(keys, columns, window, len(labels))
+        return [
+            dict(_stats_row(*values), **{kind: label})
+            for label, *values in zip(labels, *totals) if values[0]
+        ]
+
+    def pnl_by_symbol(self, since=None, until=None):
+        return self._grouped('symbol', since, until)
+
+    def win_rate_by_hour(self, since=None, until=None):
+        """
+        Сделки по часу входа (UTC)
+        """
+        return self._grouped('hour', since, until)
+
+    def win_rate_by_regime(self, since=None, until=None):
+        """
+        Сделки по состоянию рынка при входе (тренд из анализа)
+        """
+        return self._grouped('regime', since, until)
+
+    def summary(self, since=None, until=None):
+        columns = self.columns()
+        window = columns.window(since, until)
+        pnl = columns.pnl[window].sum()
+        gross_profit = columns.profit[window].sum()
+        return _stats_row(window.stop - window.start, columns.win[window].sum(), pnl, gross_profit, gross_profit - pnl)
+
+    def equity_curve(self, initial_capital=0.0, since=None, until=None):
+        """
+        Капитал на конец каждого дня с закрытыми сделками
+        """
+        columns = self.columns()
+        window = columns.window(since, until)
+        days = columns.exit_time[window] // DAY_MS
+        if not len(days):
+            return []
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        pnl = np.add.reduceat(columns.pnl[window], starts)
+        equity = initial_capital + np.cumsum(pnl)
+        return [
+            {'time': int(day) * DAY_MS, 'pnl': float(value), 'equity': float(total)}
+            for day, value, total in zip(days[starts], pnl, equity)
+        ]
@@ -20,6 +20,12 @@ class TradingUtils:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         logging.info(f"[TRADE] {timestamp} - {action} {amount} {symbol} @ {price} | Причина: {reason}")
     
+    @staticmethod
+    def timeframe_to_ms(timeframe):
+        """Длительность таймфрейма ('1m', '4h', '1d') в миллисекундах"""
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+        return int(timeframe[:-1]) * units[timeframe[-1]] * 1000
+    
     @staticmethod
     def validate_signal_strength(buy_score, sell_score, min_threshold=3):
         """Валидация силы сигнала"""
@@ -47,7 +53,11 @@ class RiskManager:
         return (total_current_risk + new_risk) <= self.max_total_risk
 
 class PerformanceTracker:
-    def __init__(self):
+    # Миллисекунд в году для годовой нормировки коэффициента Шарпа
+    YEAR_MS = 365 * 24 * 60 * 60 * 1000
+    
+    def __init__(self, initial_capital=10000):
+        self.initial_capital = initial_capital
         self.trades_history = []
         self.daily_pnl = 0
         self.total_trades = 0
@@ -61,17 +71,63 @@ class PerformanceTracker:
         if trade_data.get('pnl', 0) > 0:
             self.winning_trades += 1
     
+    def add_trades(self, trades):
+        """Добавление списка сделок"""
+        for trade in trades:
+            self.add_trade(trade)
+    
     def get_win_rate(self):
         """Расчет процента прибыльных сделок"""
         if self.total_trades == 0:
             return 0
         return (self.winning_trades / self.total_trades) * 100
     
+    def _pnl(self):
+        """Прибыль сделок в порядке закрытия"""
+        trades = sorted(self.trades_history, key=lambda t: t.get('exit_time', 0))
+        return np.array([t.get('pnl', 0) for t in trades], dtype=np.float64)
+    
+    def get_returns(self):
+        """Доходность каждой сделки относительно капитала перед ней"""
+        pnl = self._pnl()
+        capital = self.initial_capital + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+        return pnl / capital
+    
+    def get_sharpe_ratio(self):
+        """Коэффициент Шарпа по доходностям сделок (годовой, если известно время сделок)"""
+        returns = self.get_returns()
+        if len(returns) < 2 or returns.std(ddof=1) == 0:
+            return 0.0
+        sharpe = returns.mean() / returns.std(ddof=1)
+        times = [t['exit_time'] for t in self.trades_history if 'exit_time' in t]
+        span = (max(times) - min(times)) if len(times) == len(returns) else 0
+        if span > 0:
+            sharpe *= np.sqrt(len(returns) * self.YEAR_MS / span)
+        return float(sharpe)
+    
+    def get_max_drawdown(self):
+        """Максимальная просадка капитала в процентах"""
+        equity = self.initial_capital + np.concatenate(([0.0], np.cumsum(self._pnl())))
+        peaks = np.maximum.accumulate(equity)
+        return float(((peaks - equity) / peaks).max() * 100)
+    
+    def get_profit_factor(self):
+        """Отношение суммарной прибыли к суммарному убытку (None без убыточных сделок, как в TradeStore)"""
+        pnl = self._pnl()
+        profit, loss = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+        if loss == 0:
+            return None
+        return float(profit / loss)
+    
     def get_statistics(self):
         """Получение статистики торговли"""
         return {
             'total_trades': self.total_trades,
             'winning_trades': self.winning_trades,
             'win_rate': self.get_win_rate(),
-            'daily_pnl': self.daily_pnl
-        }
\ No newline at end of file
+            'daily_pnl': self.daily_pnl,
+            'total_pnl': float(self._pnl().sum()),
+            'sharpe_ratio': self.get_sharpe_ratio(),
+            'max_drawdown_pct': self.get_max_drawdown(),
+            'profit_factor': self.get_profit_factor(),
+        }